@@ -0,0 +1,59 @@
+# announcements/correo.py
+"""
+Correo de los avisos: destinatarios, campos por familia y enlace de baja.
+
+El cuerpo se renderiza una vez con PlantillaMasiva; por destinatario solo
+cambian CAMPOS, que viajan como sustituciones en la misma petición a SendGrid.
+El enlace de baja lleva el id del usuario firmado: no caduca y no necesita
+sesión.
+"""
+from django.conf import settings
+from django.core import signing
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+
+from core.models import CustomUser
+from notifications.models import NotificationChannel, UserNotificationPreference
+from schoolcomms.dashboard.models import NotificationPreference
+
+CAMPOS = ("nombre", "baja_url")
+SAL_BAJA = "announcements.baja_correo"
+
+
+def enlace_baja(user_id):
+    token = signing.dumps(user_id, salt=SAL_BAJA, compress=False)
+    return settings.SITE_URL + reverse("announcements:baja_correo", args=[token])
+
+
+def usuario_de_baja(token):
+    """Id del usuario del enlace de baja, o None si el token no es válido."""
+    try:
+        return signing.loads(token, salt=SAL_BAJA)
+    except signing.BadSignature:
+        return None
+
+
+def dar_de_baja(user_id):
+    if not NotificationPreference.objects.filter(user_id=user_id).update(email_enabled=False):
+        NotificationPreference.objects.create(user_id=user_id, email_enabled=False)
+    UserNotificationPreference.objects.filter(user_id=user_id, channel=NotificationChannel.EMAIL).update(enabled=False)
+
+
+def destinatarios_correo(user_ids):
+    """
+    (email, campos) de `user_ids` que no han desactivado el correo (sin
+    preferencias, sí lo reciben; ver notifications/entrega.py). Una consulta.
+    """
+    desactivado = NotificationPreference.objects.filter(user=OuterRef("pk"), email_enabled=False)
+    # La preferencia por canal (notifications) manda sobre la general, como en la entrega
+    por_canal = UserNotificationPreference.objects.filter(user=OuterRef("pk"), channel=NotificationChannel.EMAIL)
+    filas = (
+        CustomUser.objects.filter(pk__in=user_ids).exclude(email="")
+        .exclude(Exists(por_canal.filter(enabled=False)))
+        .exclude(Exists(desactivado) & ~Exists(por_canal.filter(enabled=True)))
+        .values_list("id", "email", "first_name", "username")
+    )
+    return [
+        (email, {"nombre": nombre or usuario, "baja_url": enlace_baja(uid)})
+        for uid, email, nombre, usuario in filas
+    ]
@@ -0,0 +1,49 @@
+from time import perf_counter
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from announcements.correo import CAMPOS
+from schoolcomms.utils.plantilla_masiva import PlantillaMasiva
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark: render_to_string por familia vs. PlantillaMasiva (un render y format_map)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--destinatarios", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        n = options["destinatarios"]
+        aviso = SimpleNamespace(
+            titulo="Reunión general de familias",
+            contenido="Estimadas familias:\n\nOs esperamos el jueves a las 18:00 en el salón de actos.",
+            fecha_publicacion=timezone.now(),
+        )
+        destinatarios = [
+            {"nombre": f"Familia <{i}> & co", "baja_url": f"https://colegio.example/baja/{i}/?a=1&b=2"}
+            for i in range(n)
+        ]
+
+        inicio = perf_counter()
+        antiguos = [render_to_string("emails/aviso.html", {"aviso": aviso, "destinatario": d}) for d in destinatarios]
+        t_antiguo = perf_counter() - inicio
+
+        inicio = perf_counter()
+        plantilla = PlantillaMasiva("emails/aviso.html", {"aviso": aviso}, CAMPOS)
+        t_compilar = perf_counter() - inicio
+        inicio = perf_counter()
+        nuevos = [plantilla.render(**d) for d in destinatarios]
+        t_nuevo = perf_counter() - inicio
+
+        if antiguos != nuevos:
+            self.stderr.write(self.style.ERROR("Resultados distintos entre los dos renders"))
+            return
+
+        self.stdout.write(f"{n} correos")
+        self.stdout.write(f"render_to_string por familia: {t_antiguo * 1e3:10.1f} ms")
+        self.stdout.write(f"PlantillaMasiva (compilar):   {t_compilar * 1e3:10.1f} ms")
+        self.stdout.write(f"PlantillaMasiva ({n}):      {t_nuevo * 1e3:10.1f} ms")
+        self.stdout.write(self.style.SUCCESS(f"Aceleración: x{t_antiguo / (t_compilar + t_nuevo):.0f}"))
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('announcements', '0007_alter_announcementread_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classgroup',
+            name='members',
+            field=models.ManyToManyField(blank=True, related_name='class_groups', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -38,6 +38,7 @@ class ReadReceipt(models.Model):
 class ClassGroup(models.Model):
     name = models.CharField(max_length=80)  # "2º ESO A"
     stage = models.CharField(max_length=40, blank=True)
+    members = models.ManyToManyField(CustomUser, related_name="class_groups", blank=True)
 
     def __str__(self):
         return self.name
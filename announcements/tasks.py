@@ -0,0 +1,19 @@
+from celery import shared_task
+
+from schoolcomms.dashboard.models import Aviso
+from schoolcomms.utils.email import enviar_correos
+from schoolcomms.utils.plantilla_masiva import PlantillaMasiva
+
+from .correo import CAMPOS, destinatarios_correo
+
+
+@shared_task
+def enviar_aviso_por_correo(aviso_id, user_ids):
+    """Envía el aviso por correo a `user_ids` en bloque. Devuelve cuántas peticiones a SendGrid."""
+    aviso = Aviso.objects.filter(pk=aviso_id).first()
+    if aviso is None:
+        return 0
+    # Un solo render; nombre y enlace de baja los sustituye SendGrid por destinatario
+    plantilla = PlantillaMasiva("emails/aviso.html", {"aviso": aviso}, CAMPOS)
+    destinatarios = [(email, plantilla.sustituciones(**campos)) for email, campos in destinatarios_correo(user_ids)]
+    return enviar_correos(f"📢 Nuevo aviso: {aviso.titulo}", plantilla.con_etiquetas(), destinatarios)
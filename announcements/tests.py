@@ -1,3 +1,218 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.models import CustomUser
+from notifications import entrega
+from notifications.models import NotificationChannel, UserNotificationPreference
+from schoolcomms.dashboard.models import Aviso, Notification, NotificationPreference
+from schoolcomms.utils import email
+from schoolcomms.utils.email import BackendMemoria, ErrorCorreo, enviar_correos, peticiones
+from schoolcomms.utils.plantilla_masiva import PlantillaMasiva
+
+from .correo import CAMPOS, destinatarios_correo, enlace_baja
+
+# Sin Redis ni SendGrid: caché, Channels y correo en memoria; Celery en el proceso
+EN_MEMORIA = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_TASK_EAGER_PROPAGATES=True,
+    CORREO_BACKEND="memoria",
+    CORREO_ESPERA_INICIAL=0,
+)
+
+
+def usuario(nombre, **campos):
+    return CustomUser.objects.create_user(nombre, password="x", email=f"{nombre}@familias.es", **campos)
+
+
+class CorreoMemoriaMixin:
+    def setUp(self):
+        super().setUp()
+        BackendMemoria.enviados.clear()
+        self.addCleanup(BackendMemoria.enviados.clear)
+
+    def destinatarios_enviados(self):
+        return [p["to"][0]["email"] for cuerpo in BackendMemoria.enviados for p in cuerpo["personalizations"]]
+
+
+# ---------------------- ENVÍO EN BLOQUE ----------------------
+
+
+@EN_MEMORIA
+class EnvioEnBloqueTests(CorreoMemoriaMixin, TestCase):
+    def test_reparte_en_peticiones_de_como_mucho_el_limite(self):
+        destinatarios = [f"f{i}@familias.es" for i in range(5)] + [""]
+        cuerpos = list(peticiones("Asunto", "<p>Hola</p>", destinatarios, limite=2))
+        self.assertEqual([len(c["personalizations"]) for c in cuerpos], [2, 2, 1])
+        # Cada familia en su personalization: nadie ve a las demás
+        self.assertTrue(all(len(p["to"]) == 1 for c in cuerpos for p in c["personalizations"]))
+
+    def test_sustituciones_por_destinatario(self):
+        cuerpo, = peticiones("Asunto", "-dest_nombre-", [("ana@familias.es", {"-dest_nombre-": "Ana"})])
+        self.assertEqual(cuerpo["personalizations"][0]["substitutions"], {"-dest_nombre-": "Ana"})
+
+    @override_settings(CORREO_DESTINATARIOS_POR_LLAMADA=1000)
+    def test_cinco_mil_familias_son_cinco_peticiones(self):
+        total = enviar_correos("Asunto", "<p>Hola</p>", [f"f{i}@familias.es" for i in range(5000)])
+        self.assertEqual(total, 5)
+        self.assertEqual(len(self.destinatarios_enviados()), 5000)
+
+    @override_settings(CORREO_REINTENTOS=2)
+    def test_reintenta_429_y_errores_de_red(self):
+        respuestas = [requests.ConnectionError("caída"), (429, "0", "lento"), (202, None, "")]
+
+        def enviar(cuerpo):
+            respuesta = respuestas.pop(0)
+            if isinstance(respuesta, Exception):
+                raise respuesta
+            return respuesta
+
+        with mock.patch.object(BackendMemoria, "enviar", side_effect=enviar), mock.patch.object(email.time, "sleep"):
+            self.assertEqual(enviar_correos("Asunto", "x", ["ana@familias.es"]), 1)
+        self.assertEqual(respuestas, [])
+
+    @override_settings(CORREO_REINTENTOS=3)
+    def test_un_400_no_se_reintenta(self):
+        with mock.patch.object(BackendMemoria, "enviar", return_value=(400, None, "mal")) as enviar:
+            with self.assertRaises(ErrorCorreo):
+                enviar_correos("Asunto", "x", ["ana@familias.es"])
+        self.assertEqual(enviar.call_count, 1)
+
+    @override_settings(CORREO_REINTENTOS=1)
+    def test_sin_respuesta_valida_tras_los_reintentos(self):
+        with mock.patch.object(BackendMemoria, "enviar", return_value=(503, None, "")), \
+                mock.patch.object(email.time, "sleep"):
+            with self.assertRaises(ErrorCorreo):
+                enviar_correos("Asunto", "x", ["ana@familias.es"])
+
+
+# ---------------------- AVISOS DEL DASHBOARD ----------------------
+
+
+@EN_MEMORIA
+class CorreoDeAvisosTests(CorreoMemoriaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.autor = usuario("tutora")
+        self.familias = [usuario(f"familia{i}") for i in range(3)]
+
+    def publicar(self, destinatarios):
+        aviso = Aviso.objects.create(titulo="Excursión", contenido="Salimos a las 9", autor=self.autor)
+        with self.captureOnCommitCallbacks(execute=True):
+            aviso.destinatarios.add(*destinatarios)
+        return aviso
+
+    def test_un_aviso_sale_en_una_peticion(self):
+        self.publicar(self.familias)
+        self.assertEqual(len(BackendMemoria.enviados), 1)
+        self.assertEqual(sorted(self.destinatarios_enviados()), sorted(f.email for f in self.familias))
+        self.assertEqual(BackendMemoria.enviados[0]["subject"], "📢 Nuevo aviso: Excursión")
+
+    def test_solo_a_los_nuevos_destinatarios(self):
+        aviso = self.publicar(self.familias[:2])
+        BackendMemoria.enviados.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            aviso.destinatarios.add(*self.familias)
+        self.assertEqual(self.destinatarios_enviados(), [self.familias[2].email])
+
+    def test_respeta_las_preferencias_de_correo(self):
+        NotificationPreference.objects.create(user=self.familias[0], email_enabled=False)
+        self.publicar(self.familias)
+        self.assertNotIn(self.familias[0].email, self.destinatarios_enviados())
+        self.assertEqual(len(self.destinatarios_enviados()), 2)
+
+    def test_la_entrega_por_canal_no_repite_el_correo(self):
+        self.publicar(self.familias)
+        ids = list(Notification.objects.values_list("id", flat=True))
+        with override_settings(NOTIFICACIONES_CANALES={"email": "notifications.canales.CanalFalso"}):
+            self.assertEqual(entrega.planificar(ids), [])
+
+    def test_si_el_broker_falla_el_aviso_se_guarda(self):
+        with mock.patch("announcements.tasks.enviar_aviso_por_correo.delay", side_effect=OSError("sin broker")):
+            aviso = self.publicar(self.familias)
+        self.assertTrue(Aviso.objects.filter(pk=aviso.pk).exists())
+        self.assertEqual(Notification.objects.filter(clave=f"aviso:{aviso.pk}").count(), 3)
+
+
+# ---------------------- PLANTILLA MASIVA ----------------------
+
+
+class PlantillaMasivaTests(TestCase):
+    def setUp(self):
+        self.aviso = Aviso(titulo="Excursión <al museo>", contenido="Salimos a las 9\n{con llaves}")
+        self.plantilla = PlantillaMasiva("emails/aviso.html", {"aviso": self.aviso}, CAMPOS)
+
+    def test_igual_que_renderizar_por_destinatario(self):
+        destinatario = {"nombre": "Ana & Luis", "baja_url": "https://colegio.es/baja/x/?a=1&b=2"}
+        esperado = render_to_string("emails/aviso.html", {"aviso": self.aviso, "destinatario": destinatario})
+        self.assertEqual(self.plantilla.render(**destinatario), esperado)
+
+    def test_escapa_los_valores_del_destinatario(self):
+        html = self.plantilla.render(nombre="<script>", baja_url="#")
+        self.assertIn("&lt;script&gt;", html)
+        self.assertNotIn("<script>", html)
+
+    def test_etiquetas_y_sustituciones_de_sendgrid(self):
+        cuerpo = self.plantilla.con_etiquetas()
+        self.assertIn("Hola, -dest_nombre-:", cuerpo)
+        self.assertIn('href="-dest_baja_url-"', cuerpo)
+        # Las llaves del contenido no se confunden con los huecos del formato
+        self.assertIn("{con llaves}", cuerpo)
+        self.assertEqual(
+            self.plantilla.sustituciones(nombre="Ana & Luis", baja_url="/baja/"),
+            {"-dest_nombre-": "Ana &amp; Luis", "-dest_baja_url-": "/baja/"},
+        )
+
+
+# ---------------------- CORREO CON PLANTILLA DE LOS AVISOS ----------------------
+
+
+@EN_MEMORIA
+class CorreoConPlantillaTests(CorreoMemoriaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.autor = usuario("tutora")
+        self.familia = usuario("familia", first_name="Marta")
+        self.client.force_login(self.autor)
+
+    def test_el_aviso_creado_en_el_panel_sale_con_plantilla(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse("dashboard:crear_aviso"), {
+                "titulo": "Excursión", "contenido": "Salimos a las 9", "destinatarios": [self.familia.pk],
+            })
+        self.assertEqual(respuesta.status_code, 302)
+        cuerpo, = BackendMemoria.enviados
+        self.assertIn("-dest_nombre-", cuerpo["content"][0]["value"])
+        personalizacion, = cuerpo["personalizations"]
+        self.assertEqual(personalizacion["substitutions"], {
+            "-dest_nombre-": "Marta", "-dest_baja_url-": enlace_baja(self.familia.pk),
+        })
+
+    def test_sin_nombre_se_usa_el_usuario(self):
+        self.familia.first_name = ""
+        self.familia.save()
+        (_, campos), = destinatarios_correo([self.familia.pk])
+        self.assertEqual(campos["nombre"], "familia")
+
+    def test_la_baja_se_confirma_con_post(self):
+        url = enlace_baja(self.familia.pk).removeprefix(settings.SITE_URL)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(destinatarios_correo([self.familia.pk])), 1)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(destinatarios_correo([self.familia.pk]), [])
+
+    def test_la_baja_apaga_tambien_el_canal_de_correo(self):
+        UserNotificationPreference.objects.create(user=self.familia, channel=NotificationChannel.EMAIL, enabled=True)
+        self.client.post(enlace_baja(self.familia.pk).removeprefix(settings.SITE_URL))
+        self.assertEqual(destinatarios_correo([self.familia.pk]), [])
+
+    def test_token_manipulado_da_404(self):
+        respuesta = self.client.post(reverse("announcements:baja_correo", args=["no-es-un-token"]))
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertFalse(NotificationPreference.objects.filter(user=self.familia).exists())
@@ -7,4 +7,5 @@ app_name = "announcements"
 urlpatterns = [
     path("dashboard/", views.announcement_list, name="dashboard"),
     path("export/pdf/", export_announcements_pdf, name="export_pdf"),
+    path("baja/<str:token>/", views.baja_correo, name="baja_correo"),
 ]
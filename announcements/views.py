@@ -6,12 +6,8 @@ from django.template.loader import get_template
 from xhtml2pdf import pisa
 from .models import Announcement
 from .filters import AnnouncementFilter
-from schoolcomms.utils.email import send_announcement_email
-from schoolcomms.dashboard.models import NotificationPreference
-from django.template.loader import render_to_string
-from django.contrib.auth.models import User
-from django.contrib.auth import get_user_model
-from schoolcomms.dashboard.models import NotificationPreference
+from django.http import Http404
+from .correo import dar_de_baja, usuario_de_baja
 
 def announcement_list(request):
     """
@@ -79,16 +75,15 @@ def export_announcements_pdf(request):
     return response if not pisa_status.err else HttpResponse("Error al generar PDF", status=500)
 
 
-User = get_user_model()
-
-
-def crear_aviso(request):
-    aviso = Announcement.objects.create(...)  # tu lógica de creación
-
-    usuarios = User.objects.filter(groups__in=aviso.target_groups.all()).distinct()
-
-    for user in usuarios:
-        prefs = getattr(user, "notificationpreference", None)
-        if prefs and prefs.email_enabled and prefs.notify_on_announcement:
-            html = render_to_string("emails/aviso.html", {"aviso": aviso, "usuario": user})
-            send_announcement_email(user.email, f"📢 Nuevo aviso: {aviso.title}", html)
\ No newline at end of file
+def baja_correo(request, token):
+    """
+    Enlace de baja del pie de los correos de avisos (sin sesión). Se confirma
+    con un POST: un GET lo pueden lanzar los antivirus que abren los enlaces.
+    """
+    user_id = usuario_de_baja(token)
+    if user_id is None:
+        raise Http404
+    hecho = request.method == "POST"
+    if hecho:
+        dar_de_baja(user_id)
+    return render(request, "announcements/baja_correo.html", {"hecho": hecho})
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_customuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='group',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='student_groups', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
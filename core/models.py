@@ -26,3 +26,4 @@ class Group(models.Model):
     name = models.CharField(max_length=100)
     classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE)
     tutor = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, limit_choices_to={"role": "teacher"})
+    students = models.ManyToManyField(CustomUser, related_name="student_groups", blank=True)
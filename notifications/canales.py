@@ -0,0 +1,88 @@
+# notifications/canales.py
+"""
+Backends de los canales de entrega (NOTIFICACIONES_CANALES en settings).
+
+Un backend se crea con el nombre de su canal y expone enviar(notificaciones):
+recibe una tanda de Notification (con `user` cargado) y devuelve los ids de
+las que no ha podido entregar. Si lanza una excepción es que no ha salido
+ninguna y la tanda entera se reintenta (ver tasks.enviar_tanda); si se cae a
+media tanda lanza TandaInterrumpida y solo se reintentan las que faltan.
+"""
+import logging
+import smtplib
+from collections import defaultdict
+
+from django.core.mail import EmailMessage, get_connection
+
+logger = logging.getLogger(__name__)
+
+
+class TandaInterrumpida(Exception):
+    """El canal se ha caído a media tanda: `pendientes` no han salido y `fallidas` no saldrán."""
+
+    def __init__(self, pendientes, fallidas=()):
+        super().__init__(f"{len(pendientes)} notificaciones sin enviar")
+        self.pendientes = list(pendientes)
+        self.fallidas = set(fallidas)
+
+
+class CanalCorreo:
+    """
+    Email por el EMAIL_BACKEND de Django: una conexión por tanda y un envío por
+    correo, para saber cuáles han salido. Un destinatario rechazado cuenta como
+    fallida; solo los errores de conexión cortan la tanda.
+    """
+
+    def __init__(self, canal):
+        self.canal = canal
+
+    def _correo(self, notificacion):
+        cuerpo = "\n\n".join(filter(None, [notificacion.contenido, notificacion.url]))
+        return EmailMessage(notificacion.titulo, cuerpo, to=[notificacion.user.email])
+
+    def _interrumpida(self, restantes, fallidas):
+        return TandaInterrumpida([n.pk for n in restantes if n.pk not in fallidas], fallidas)
+
+    def enviar(self, notificaciones):
+        fallidas = {n.pk for n in notificaciones if not n.user.email}
+        conexion = get_connection()
+        # Si no conecta, lanza antes de enviar nada y se reintenta la tanda
+        conexion.open()
+        try:
+            for i, notificacion in enumerate(notificaciones):
+                if notificacion.pk in fallidas:
+                    continue
+                try:
+                    conexion.send_messages([self._correo(notificacion)])
+                except smtplib.SMTPServerDisconnected as exc:
+                    raise self._interrumpida(notificaciones[i:], fallidas) from exc
+                except smtplib.SMTPException:
+                    # Destinatario, remitente o contenido rechazados (SMTPException es un OSError)
+                    logger.warning("Correo de la notificación %s rechazado", notificacion.pk, exc_info=True)
+                    fallidas.add(notificacion.pk)
+                except OSError as exc:
+                    raise self._interrumpida(notificaciones[i:], fallidas) from exc
+        finally:
+            conexion.close()
+        return fallidas
+
+
+class CanalFalso:
+    """
+    Desarrollo y tests: no envía nada. Apunta lo que habría enviado en
+    CanalFalso.enviados[canal] como (user_id, notificacion_id).
+    """
+
+    enviados = defaultdict(list)
+
+    def __init__(self, canal):
+        self.canal = canal
+
+    def enviar(self, notificaciones):
+        self.enviados[self.canal] += [(n.user_id, n.pk) for n in notificaciones]
+        logger.info("Canal falso %s: %d notificaciones", self.canal, len(notificaciones))
+        return set()
+
+    @classmethod
+    def vaciar(cls):
+        cls.enviados.clear()
@@ -0,0 +1,225 @@
+# notifications/entrega.py
+"""
+Entrega de las notificaciones del dashboard por email, SMS y push.
+
+Las notificaciones nacen con envio_pendiente=True. reclamar() toma un lote de
+pendientes y les pone la hora en envio_reclamado en la misma transacción
+(SKIP LOCKED en PostgreSQL: dos workers nunca reclaman la misma). Siguen
+pendientes hasta que cada canal que les toca queda apuntado en NotificationLog
+(cerrar()): si el worker muere a medias, el reclamo caduca a los
+NOTIFICACIONES_RECLAMO_CADUCA segundos y otra pasada envía solo los canales que
+aún no están en el log.
+
+planificar() resuelve las preferencias de todos los destinatarios del lote con
+dos consultas y agrupa los envíos por canal en tandas de NOTIFICACIONES_TANDA;
+cada tanda va en una sola llamada al backend del canal (canales.py) y su
+resultado se apunta en NotificationLog con un bulk_create. Los canales sin
+backend en NOTIFICACIONES_CANALES (SMS y push mientras no haya proveedor) se
+saltan: nunca se apuntan como enviados.
+
+Preferencias: NotificationPreference (dashboard) activa o desactiva cada
+canal; UserNotificationPreference, si la hay para ese canal, manda sobre ella
+y añade horas de silencio. En silencio no salen SMS ni push (el email sí): la
+notificación sigue pendiente con envio_no_antes en el fin del silencio y no se
+vuelve a reclamar hasta entonces.
+"""
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from schoolcomms.dashboard.models import Notification, NotificationPreference
+from schoolcomms.dashboard.notificaciones import TAMANO_LOTE, lotes
+
+from .canales import TandaInterrumpida
+from .models import NotificationChannel, NotificationLog, UserNotificationPreference
+
+CANALES = NotificationChannel.values
+SILENCIABLES = {NotificationChannel.SMS, NotificationChannel.PUSH}
+
+ENVIADA = "enviada"
+ERROR = "error"
+# Estados del log que dan el canal por resuelto para esa notificación
+RESUELTAS = (ENVIADA, ERROR)
+
+# Su correo sale en bloque al crearlas (avisos: announcements.tasks), no por aquí
+CORREO_EN_BLOQUE = {"aviso"}
+
+# Sin fila de preferencias, lo mismo que tendría una recién creada
+POR_DEFECTO = {canal: NotificationPreference._meta.get_field(f"{canal}_enabled").default for canal in CANALES}
+
+
+def referencia(notificacion_id):
+    return f"notificacion:{notificacion_id}"
+
+
+def _registro(user_id, canal, notificacion_id, estado):
+    return NotificationLog(user_id=user_id, channel=canal, status=estado, reference=referencia(notificacion_id))
+
+
+# ---------------------- PREFERENCIAS ----------------------
+
+
+def preferencias(user_ids):
+    """{user_id: {canal: (activo, silencio)}} con `silencio` = (inicio, fin) o None."""
+    resultado = {uid: {canal: (POR_DEFECTO[canal], None) for canal in CANALES} for uid in user_ids}
+    campos = [f"{canal}_enabled" for canal in CANALES]
+    for fila in NotificationPreference.objects.filter(user_id__in=user_ids).values("user_id", *campos):
+        for canal in CANALES:
+            resultado[fila["user_id"]][canal] = (fila[f"{canal}_enabled"], None)
+    filas = UserNotificationPreference.objects.filter(user_id__in=user_ids).values_list(
+        "user_id", "channel", "enabled", "quiet_hours_start", "quiet_hours_end",
+    )
+    for uid, canal, activo, inicio, fin in filas:
+        resultado[uid][canal] = (activo, (inicio, fin) if inicio and fin else None)
+    return resultado
+
+
+def en_silencio(silencio, hora):
+    if not silencio:
+        return False
+    inicio, fin = silencio
+    if inicio <= fin:
+        return inicio <= hora < fin
+    # Cruza la medianoche (22:00-07:00)
+    return hora >= inicio or hora < fin
+
+
+def fin_silencio(silencio, ahora):
+    """Primer momento después de `ahora` (hora local) en que termina el silencio."""
+    fin = timezone.make_aware(datetime.combine(ahora.date(), silencio[1]), ahora.tzinfo)
+    return fin if fin > ahora else fin + timedelta(days=1)
+
+
+# ---------------------- PIPELINE ----------------------
+
+
+def reclamar(lote=None, ahora=None):
+    """
+    Ids de hasta `lote` notificaciones pendientes que ya toca entregar, marcadas
+    como reclamadas (las de un reclamo caducado se vuelven a tomar).
+    """
+    lote = lote or settings.NOTIFICACIONES_LOTE
+    ahora = ahora or timezone.now()
+    caducado = ahora - timedelta(seconds=settings.NOTIFICACIONES_RECLAMO_CADUCA)
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(envio_pendiente=True)
+            .filter(Q(envio_reclamado__isnull=True) | Q(envio_reclamado__lt=caducado))
+            .filter(Q(envio_no_antes__isnull=True) | Q(envio_no_antes__lte=ahora))
+            .order_by("id").values_list("id", flat=True)[:lote]
+        )
+        if ids:
+            Notification.objects.filter(pk__in=ids).update(envio_reclamado=ahora)
+    return ids
+
+
+def _por_entregar(ids):
+    """
+    (preferencias, {id: (user_id, [canales])}) con los canales que aún le faltan
+    a cada notificación: activos, con backend y sin resultado en el log.
+    """
+    filas = list(Notification.objects.filter(pk__in=ids).order_by("id").values_list("id", "user_id", "tipo"))
+    prefs = preferencias({uid for _, uid, _ in filas})
+    resueltos = set(
+        NotificationLog.objects.filter(reference__in=[referencia(pk) for pk, _, _ in filas], status__in=RESUELTAS)
+        .values_list("reference", "channel")
+    )
+    canales = [canal for canal in CANALES if canal in settings.NOTIFICACIONES_CANALES]
+    faltan = {}
+    for pk, uid, tipo in filas:
+        faltan[pk] = (uid, [
+            canal for canal in canales
+            if prefs[uid][canal][0]
+            and not (canal == NotificationChannel.EMAIL and tipo in CORREO_EN_BLOQUE)
+            and (referencia(pk), canal) not in resueltos
+        ])
+    return prefs, faltan
+
+
+def cerrar(ids):
+    """Deja de tener pendientes las notificaciones `ids` a las que ya no les falta ningún canal."""
+    _, faltan = _por_entregar(ids)
+    hechas = [pk for pk, (_, canales) in faltan.items() if not canales]
+    if hechas:
+        Notification.objects.filter(pk__in=hechas).update(envio_pendiente=False, envio_no_antes=None)
+    return len(hechas)
+
+
+def planificar(ids, ahora=None):
+    """
+    Reparte las notificaciones `ids` según las preferencias de sus destinatarios.
+    Devuelve las tandas [(canal, [ids])] a enviar ya. Lo que cae en horas de
+    silencio se aplaza (envio_no_antes) y las que no tienen nada que enviar se cierran.
+    """
+    ahora = timezone.localtime(ahora)
+    prefs, faltan = _por_entregar(ids)
+    por_canal = {canal: [] for canal in CANALES if canal in settings.NOTIFICACIONES_CANALES}
+    aplazadas, cerradas = {}, []
+    for pk, (uid, canales) in faltan.items():
+        if not canales:
+            cerradas.append(pk)
+        for canal in canales:
+            silencio = prefs[uid][canal][1]
+            if canal in SILENCIABLES and en_silencio(silencio, ahora.time()):
+                fin = fin_silencio(silencio, ahora)
+                aplazadas[pk] = min(aplazadas.get(pk, fin), fin)
+            else:
+                por_canal[canal].append(pk)
+
+    if cerradas:
+        Notification.objects.filter(pk__in=cerradas).update(envio_pendiente=False, envio_no_antes=None)
+    salen = {pk for pendientes in por_canal.values() for pk in pendientes}
+    grupos = {}
+    for pk, fecha in aplazadas.items():
+        # Las que no envían nada ahora sueltan el reclamo: ninguna tanda las va a cerrar
+        grupos.setdefault((fecha, pk in salen), []).append(pk)
+    for (fecha, sale), pks in grupos.items():
+        # Un UPDATE por hora de fin (casi siempre una o dos)
+        cambios = {"envio_no_antes": fecha} if sale else {"envio_no_antes": fecha, "envio_reclamado": None}
+        Notification.objects.filter(pk__in=pks).update(**cambios)
+    return [
+        (canal, tanda)
+        for canal, pendientes in por_canal.items()
+        for tanda in lotes(pendientes, settings.NOTIFICACIONES_TANDA)
+    ]
+
+
+def backend(canal):
+    return import_string(settings.NOTIFICACIONES_CANALES[canal])(canal)
+
+
+def enviar_tanda(canal, ids):
+    """
+    Entrega una tanda por `canal` y la apunta en el log. Devuelve cuántas han
+    salido. Si el canal se cae a media tanda, apunta las ya resueltas y relanza
+    TandaInterrumpida con las pendientes.
+    """
+    notificaciones = list(Notification.objects.filter(pk__in=ids).select_related("user").order_by("id"))
+    interrumpida = None
+    try:
+        fallidas = backend(canal).enviar(notificaciones) or set()
+        pendientes = set()
+    except TandaInterrumpida as exc:
+        interrumpida, fallidas, pendientes = exc, exc.fallidas, set(exc.pendientes)
+    resueltas = [n for n in notificaciones if n.pk not in pendientes]
+    NotificationLog.objects.bulk_create(
+        [_registro(n.user_id, canal, n.pk, ERROR if n.pk in fallidas else ENVIADA) for n in resueltas],
+        batch_size=TAMANO_LOTE,
+    )
+    cerrar([n.pk for n in resueltas])
+    if interrumpida:
+        raise interrumpida
+    return len(resueltas) - len(fallidas)
+
+
+def registrar_fallo(canal, ids):
+    """Apunta como error una tanda que no se ha podido entregar tras los reintentos."""
+    filas = Notification.objects.filter(pk__in=ids).values_list("id", "user_id")
+    NotificationLog.objects.bulk_create([_registro(uid, canal, pk, ERROR) for pk, uid in filas], batch_size=TAMANO_LOTE)
+    cerrar(ids)
+    return 0
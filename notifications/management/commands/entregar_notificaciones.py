@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from notifications import entrega
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrega ahora, en este proceso y sin Celery, las notificaciones pendientes "
+        "por email/SMS/push según las preferencias de cada usuario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-lotes", type=int, default=10, help="Lotes de NOTIFICACIONES_LOTE como máximo.")
+
+    def handle(self, *args, **options):
+        repartidas = enviadas = 0
+        for _ in range(options["max_lotes"]):
+            ids = entrega.reclamar()
+            if not ids:
+                break
+            for canal, tanda in entrega.planificar(ids):
+                enviadas += entrega.enviar_tanda(canal, tanda)
+            repartidas += len(ids)
+        self.stdout.write(self.style.SUCCESS(f"{repartidas} notificaciones repartidas, {enviadas} envíos."))
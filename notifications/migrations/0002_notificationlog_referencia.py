@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['reference', 'channel'], name='notificatio_referen_673309_idx'),
+        ),
+    ]
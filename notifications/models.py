@@ -27,3 +27,7 @@ class NotificationLog(models.Model):
     status = models.CharField(max_length=50)
     reference = models.CharField(max_length=255, blank=True)
 
+    class Meta:
+        # La entrega busca por notificación qué canales ya tienen resultado
+        indexes = [models.Index(fields=["reference", "channel"])]
+
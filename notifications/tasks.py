@@ -3,6 +3,9 @@ from django.utils import timezone
 from announcements.models import Announcement
 from django.core.mail import send_mail
 
+from . import entrega
+from .canales import TandaInterrumpida
+
 @shared_task
 def send_daily_summary():
     today = timezone.now().date()
@@ -26,3 +29,34 @@ def send_daily_summary():
 @shared_task(bind=True)
 def tarea_que_falla(self):
     raise Exception("Simulación de error")
+
+
+@shared_task
+def entregar_notificaciones(max_lotes=10):
+    """
+    Reclama las notificaciones pendientes por lotes y lanza una tarea por
+    canal y tanda de destinatarios (ver entrega.py). Devuelve cuántas ha repartido.
+    """
+    total = 0
+    for _ in range(max_lotes):
+        ids = entrega.reclamar()
+        if not ids:
+            break
+        for canal, tanda in entrega.planificar(ids):
+            enviar_tanda.delay(canal, tanda)
+        total += len(ids)
+    return total
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+def enviar_tanda(self, canal, ids):
+    try:
+        return entrega.enviar_tanda(canal, ids)
+    except Exception as exc:
+        # Proveedor caído o conexión rota: se reintenta lo que no ha salido (en
+        # modo eager no hay worker que lo reintente: se apunta el fallo sin más)
+        if isinstance(exc, TandaInterrumpida):
+            ids = exc.pendientes
+        if not self.request.is_eager and self.request.retries < self.max_retries:
+            raise self.retry(args=(canal, ids), exc=exc)
+        return entrega.registrar_fallo(canal, ids)
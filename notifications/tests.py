@@ -1,3 +1,178 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import CustomUser
+from schoolcomms.dashboard.models import Notification, NotificationPreference
+from schoolcomms.dashboard.notificaciones import notificar
+
+from . import entrega
+from .canales import CanalFalso
+from .models import NotificationLog, UserNotificationPreference
+from .tasks import entregar_notificaciones
+
+FALSO = "notifications.canales.CanalFalso"
+
+# Sin Redis ni proveedores: caché y Channels en memoria, Celery en el proceso, canales falsos
+EN_MEMORIA = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    CELERY_TASK_ALWAYS_EAGER=True,
+    CELERY_TASK_EAGER_PROPAGATES=True,
+    NOTIFICACIONES_CANALES={"email": FALSO, "sms": FALSO, "push": FALSO},
+)
+
+
+def usuario(nombre, **campos):
+    return CustomUser.objects.create_user(nombre, password="x", **campos)
+
+
+class CanalFalsoMixin:
+    def setUp(self):
+        super().setUp()
+        CanalFalso.vaciar()
+        self.addCleanup(CanalFalso.vaciar)
+
+    def entregados(self):
+        return {canal: {uid for uid, _ in envios} for canal, envios in CanalFalso.enviados.items()}
+
+    def registros(self, estado):
+        return set(NotificationLog.objects.filter(status=estado).values_list("user__username", "channel"))
+
+
+# ---------------------- PLANIFICACIÓN POR CANAL ----------------------
+
+
+@EN_MEMORIA
+class PlanificarTests(CanalFalsoMixin, TestCase):
+    def test_preferencias_por_defecto(self):
+        ana = usuario("ana")
+        notificar([ana.pk], "aviso:1", titulo="Hola")
+        self.assertEqual(entregar_notificaciones.delay().get(), 1)
+        esperados = {c for c, activo in entrega.POR_DEFECTO.items() if activo}
+        self.assertEqual({c for c, uids in self.entregados().items() if ana.pk in uids}, esperados)
+        self.assertFalse(Notification.objects.filter(envio_pendiente=True).exists())
+
+    def test_preferencias_de_canal(self):
+        ana, bob = usuario("ana"), usuario("bob")
+        NotificationPreference.objects.create(user=ana, email_enabled=False, sms_enabled=True, push_enabled=False)
+        # La preferencia por canal manda sobre la general
+        NotificationPreference.objects.create(user=bob, email_enabled=True, sms_enabled=True, push_enabled=True)
+        UserNotificationPreference.objects.create(user=bob, channel="email", enabled=False)
+        notificar([ana.pk, bob.pk], "aviso:1", titulo="Hola")
+        entregar_notificaciones.delay().get()
+
+        entregados = self.entregados()
+        self.assertIn(ana.pk, entregados["sms"])
+        self.assertNotIn(ana.pk, entregados.get("email", set()))
+        self.assertNotIn(ana.pk, entregados.get("push", set()))
+        self.assertNotIn(bob.pk, entregados.get("email", set()))
+        self.assertIn(bob.pk, entregados["sms"])
+        self.assertNotIn(("ana", "email"), self.registros(entrega.ENVIADA))
+
+    def test_una_pasada_no_repite_envios(self):
+        ana = usuario("ana")
+        notificar([ana.pk], "aviso:1", titulo="Hola")
+        entregar_notificaciones.delay().get()
+        antes = NotificationLog.objects.count()
+        self.assertEqual(entregar_notificaciones.delay().get(), 0)
+        self.assertEqual(NotificationLog.objects.count(), antes)
+
+    @override_settings(NOTIFICACIONES_CANALES={"email": FALSO})
+    def test_canal_sin_backend_no_se_apunta(self):
+        ana = usuario("ana")
+        NotificationPreference.objects.create(user=ana, email_enabled=True, sms_enabled=True, push_enabled=True)
+        notificar([ana.pk], "aviso:1", titulo="Hola")
+        entregar_notificaciones.delay().get()
+        self.assertEqual(set(NotificationLog.objects.values_list("channel", flat=True)), {"email"})
+        self.assertEqual(set(self.entregados()), {"email"})
+
+
+# ---------------------- HORAS DE SILENCIO ----------------------
+
+
+@EN_MEMORIA
+class SilencioTests(CanalFalsoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.eva = usuario("eva")
+        NotificationPreference.objects.create(user=self.eva, email_enabled=True, sms_enabled=False, push_enabled=True)
+        UserNotificationPreference.objects.create(
+            user=self.eva, channel="push", enabled=True,
+            quiet_hours_start=datetime.time(22, 0), quiet_hours_end=datetime.time(7, 0),
+        )
+        notificar([self.eva.pk], "aviso:1", titulo="Hola")
+        self.noche = timezone.make_aware(datetime.datetime(2026, 3, 2, 23, 30))
+        self.manana = timezone.make_aware(datetime.datetime(2026, 3, 3, 7, 0))
+
+    def pasada(self, ahora):
+        for canal, tanda in entrega.planificar(entrega.reclamar(ahora=ahora), ahora=ahora):
+            entrega.enviar_tanda(canal, tanda)
+
+    def test_el_fin_del_silencio_cruza_la_medianoche(self):
+        silencio = (datetime.time(22, 0), datetime.time(7, 0))
+        self.assertEqual(entrega.fin_silencio(silencio, timezone.localtime(self.noche)), self.manana)
+        temprano = timezone.make_aware(datetime.datetime(2026, 3, 3, 6, 0))
+        self.assertEqual(entrega.fin_silencio(silencio, timezone.localtime(temprano)), self.manana)
+
+    def test_el_push_se_aplaza_y_el_correo_sale(self):
+        self.pasada(self.noche)
+        self.assertEqual(self.entregados(), {"email": {self.eva.pk}})
+        notificacion = Notification.objects.get()
+        self.assertTrue(notificacion.envio_pendiente)
+        self.assertEqual(notificacion.envio_no_antes, self.manana)
+
+    def test_no_se_reclama_hasta_el_fin_del_silencio(self):
+        self.pasada(self.noche)
+        self.assertEqual(entrega.reclamar(ahora=self.noche + datetime.timedelta(hours=1)), [])
+        self.pasada(self.manana)
+        # Sale el push y no se repite el correo
+        self.assertEqual(self.entregados(), {"email": {self.eva.pk}, "push": {self.eva.pk}})
+        self.assertEqual(len(CanalFalso.enviados["email"]), 1)
+        self.assertFalse(Notification.objects.get().envio_pendiente)
+
+
+# ---------------------- RECLAMO ----------------------
+
+
+@EN_MEMORIA
+class ReclamoTests(CanalFalsoMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ana = usuario("ana")
+        notificar([self.ana.pk], "aviso:1", titulo="Hola")
+        self.ahora = timezone.now()
+
+    def test_reclamada_sigue_pendiente_hasta_enviarse(self):
+        ids = entrega.reclamar(ahora=self.ahora)
+        self.assertTrue(Notification.objects.get(pk=ids[0]).envio_pendiente)
+        # Otro worker no la toma mientras el reclamo está vivo
+        self.assertEqual(entrega.reclamar(ahora=self.ahora), [])
+
+    def test_un_fallo_al_enviar_no_pierde_la_notificacion(self):
+        ids = entrega.reclamar(ahora=self.ahora)
+        tandas = entrega.planificar(ids, ahora=self.ahora)
+        with mock.patch.object(CanalFalso, "enviar", side_effect=ConnectionError("caída")):
+            with self.assertRaises(ConnectionError):
+                entrega.enviar_tanda(*tandas[0])
+        self.assertTrue(Notification.objects.get().envio_pendiente)
+        self.assertFalse(NotificationLog.objects.exists())
+
+    @override_settings(NOTIFICACIONES_RECLAMO_CADUCA=60)
+    def test_un_reclamo_caducado_se_vuelve_a_tomar_sin_repetir_canales(self):
+        ids = entrega.reclamar(ahora=self.ahora)
+        canal, tanda = entrega.planificar(ids, ahora=self.ahora)[0]
+        entrega.enviar_tanda(canal, tanda)
+        # El worker muere antes de enviar el resto de canales
+        despues = self.ahora + datetime.timedelta(seconds=61)
+        self.assertEqual(entrega.reclamar(ahora=despues), ids)
+        self.assertNotIn(canal, {c for c, _ in entrega.planificar(ids, ahora=despues)})
+
+    def test_se_cierra_cuando_no_le_falta_ningun_canal(self):
+        ids = entrega.reclamar(ahora=self.ahora)
+        for canal, tanda in entrega.planificar(ids, ahora=self.ahora):
+            self.assertTrue(Notification.objects.get().envio_pendiente)
+            entrega.enviar_tanda(canal, tanda)
+        self.assertFalse(Notification.objects.get().envio_pendiente)
@@ -13,5 +13,13 @@ app.conf.beat_schedule = {
         "task": "notifications.tasks.send_daily_summary",
         "schedule": crontab(hour=18, minute=0),  # cada día a las 18:00
     },
+    "entregar-notificaciones": {
+        "task": "notifications.tasks.entregar_notificaciones",
+        "schedule": 60.0,  # cada minuto
+    },
+    "archivar-historico": {
+        "task": "schoolcomms.dashboard.tasks.archivar_historico",
+        "schedule": crontab(hour=3, minute=30, day_of_week=0),  # domingos de madrugada
+    },
 }
 
@@ -0,0 +1,226 @@
+# dashboard/adjuntos.py
+"""
+Adjuntos de mensajes privados y avisos.
+
+Subida: las vistas que aceptan adjuntos van con @subida_de_adjuntos, que
+cambia los handlers de esa petición (el resto del sitio, admin incluido,
+sigue con los de Django): cada fichero se escribe a disco por trozos mientras
+llega (nunca entero en memoria) y LimiteAdjuntosUploadHandler descarta el que
+pase del máximo en cuanto lo supera, sin esperar a que termine. Al guardar,
+el temporal se mueve (rename) a ADJUNTOS_ROOT: no se vuelve a copiar.
+
+Descarga: siempre por descargar_adjunto, que comprueba que el usuario es
+parte del mensaje o puede ver el aviso. El envío del fichero se delega en el
+servidor web si está configurado (X-Accel-Redirect / X-Sendfile); si no,
+FileResponse (sendfile del servidor WSGI cuando lo hay) con soporte de Range,
+para que un PDF de 20 MB se pueda reanudar o abrir por páginas.
+"""
+import mimetypes
+import re
+from functools import wraps
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig, ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, TemporaryFileUploadHandler
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.template.defaultfilters import filesizeformat
+from django.utils.http import content_disposition_header
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+from .audiencias import avisos_visibles
+from .models import Adjunto
+
+# Se muestran en el navegador; el resto (html, svg, office…) siempre como descarga
+TIPOS_EN_LINEA = {"application/pdf", "image/jpeg", "image/png", "image/gif", "image/webp", "text/plain"}
+TROZO = 64 * 1024
+
+_RANGO = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# ---------------------- SUBIDA ----------------------
+
+
+class LimiteAdjuntosUploadHandler(FileUploadHandler):
+    """
+    Corta cada fichero al pasar de ADJUNTO_TAMANO_MAXIMO (el resto de la subida
+    sigue) y apunta su nombre en request.adjuntos_rechazados para el formulario.
+    Una petición que ya anuncia más de lo que cabe en un envío se rechaza entera
+    con un 400 (RequestDataTooBig, como el límite de Django para los campos).
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        limite = settings.ADJUNTO_TAMANO_MAXIMO * settings.ADJUNTOS_POR_ENVIO
+        if content_length > limite + settings.DATA_UPLOAD_MAX_MEMORY_SIZE:
+            # Aquí no vale StopUpload: MultiPartParser no la captura fuera de la lectura
+            raise RequestDataTooBig("La subida supera el tamaño máximo de los adjuntos.")
+        self.request.adjuntos_rechazados = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.recibido = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.recibido += len(raw_data)
+        if self.recibido > settings.ADJUNTO_TAMANO_MAXIMO:
+            self.request.adjuntos_rechazados.append(self.file_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def subida_de_adjuntos(vista):
+    """
+    Decorador de las vistas con adjuntos: pone los handlers de arriba antes de
+    que nadie lea request.POST. El CSRF se comprueba dentro, después (el
+    middleware leería el POST con los handlers globales).
+    """
+
+    @csrf_exempt
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        request.upload_handlers = [LimiteAdjuntosUploadHandler(request), TemporaryFileUploadHandler(request)]
+        return csrf_protect(vista)(request, *args, **kwargs)
+
+    return envoltura
+
+
+def rechazados(request):
+    """Nombres de los ficheros que el handler descartó por tamaño en esta petición."""
+    return getattr(request, "adjuntos_rechazados", [])
+
+
+def validar_tamano(archivo):
+    if archivo.size > settings.ADJUNTO_TAMANO_MAXIMO:
+        raise ValidationError(
+            f"«{archivo.name}» supera el tamaño máximo ({filesizeformat(settings.ADJUNTO_TAMANO_MAXIMO)})."
+        )
+
+
+def guardar_adjuntos(archivos, usuario, mensaje=None, aviso=None):
+    """Crea un Adjunto por fichero subido, colgado de `mensaje` o de `aviso`."""
+    creados = []
+    for archivo in archivos:
+        tipo = mimetypes.guess_type(archivo.name)[0] or "application/octet-stream"
+        creados.append(Adjunto.objects.create(
+            archivo=archivo, nombre=archivo.name[:255], tipo=tipo, tamano=archivo.size,
+            mensaje=mensaje, aviso=aviso, subido_por=usuario,
+        ))
+    return creados
+
+
+def borrar_ficheros(nombres):
+    """Borra del disco los ficheros `nombres` cuando se confirme la transacción."""
+    nombres = [n for n in nombres if n]
+    if not nombres:
+        return
+    almacen = Adjunto._meta.get_field("archivo").storage
+
+    def borrar():
+        for nombre in nombres:
+            almacen.delete(nombre)
+
+    transaction.on_commit(borrar)
+
+
+def borrar_adjuntos(qs):
+    """
+    Borra los adjuntos de `qs` y sus ficheros. Un SELECT y un DELETE: cada
+    fichero lo quita el post_delete de Adjunto al confirmar la transacción.
+    """
+    total, _ = qs.delete()
+    return total
+
+
+# ---------------------- DESCARGA ----------------------
+
+
+def puede_ver(user, adjunto):
+    if adjunto.mensaje_id:
+        return user.id in (adjunto.mensaje.sender_id, adjunto.mensaje.receiver_id)
+    if user.is_staff or adjunto.aviso.autor_id == user.id:
+        return True
+    return avisos_visibles(user).filter(pk=adjunto.aviso_id).exists()
+
+
+def _rango(cabecera, tamano):
+    """
+    (inicio, fin) del Range pedido; None si no hay o no se entiende (se envía
+    todo); False si no se puede satisfacer (416). Solo un rango por petición.
+    """
+    coincide = _RANGO.match((cabecera or "").strip())
+    if not coincide:
+        return None
+    inicio, fin = coincide.groups()
+    if not inicio:
+        if not fin:
+            return None
+        # bytes=-N: los N últimos
+        inicio, fin = max(tamano - int(fin), 0), tamano - 1
+    else:
+        inicio = int(inicio)
+        fin = min(int(fin), tamano - 1) if fin else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def _trozos(fichero, pendiente):
+    try:
+        while pendiente > 0:
+            datos = fichero.read(min(TROZO, pendiente))
+            if not datos:
+                break
+            pendiente -= len(datos)
+            yield datos
+    finally:
+        fichero.close()
+
+
+def _cabeceras(respuesta, adjunto, descargar):
+    en_linea = adjunto.tipo in TIPOS_EN_LINEA and not descargar
+    respuesta["Content-Type"] = adjunto.tipo
+    respuesta["Content-Disposition"] = content_disposition_header(not en_linea, adjunto.nombre)
+    respuesta["X-Content-Type-Options"] = "nosniff"
+    respuesta["Cache-Control"] = "private, max-age=3600"
+    respuesta["ETag"] = f'"adjunto-{adjunto.pk}-{adjunto.tamano}"'
+    return respuesta
+
+
+def respuesta_descarga(request, adjunto, descargar=False):
+    """Respuesta que envía `adjunto` (ya comprobados los permisos)."""
+    servidor = settings.ADJUNTOS_SERVIDOR
+    if servidor == "nginx":
+        # nginx lee el fichero (y atiende los Range) sin ocupar al worker
+        respuesta = HttpResponse()
+        respuesta["X-Accel-Redirect"] = quote(settings.ADJUNTOS_URL_INTERNA + adjunto.archivo.name)
+        return _cabeceras(respuesta, adjunto, descargar)
+    if servidor == "apache":
+        respuesta = HttpResponse()
+        respuesta["X-Sendfile"] = adjunto.archivo.path
+        return _cabeceras(respuesta, adjunto, descargar)
+
+    tamano = adjunto.tamano
+    rango = _rango(request.headers.get("Range"), tamano)
+    if_range = request.headers.get("If-Range")
+    if rango and if_range and if_range != f'"adjunto-{adjunto.pk}-{tamano}"':
+        rango = None
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta["Content-Range"] = f"bytes */{tamano}"
+        return respuesta
+
+    fichero = adjunto.archivo.open("rb")
+    if rango is None:
+        respuesta = FileResponse(fichero)
+    else:
+        inicio, fin = rango
+        fichero.seek(inicio)
+        respuesta = StreamingHttpResponse(_trozos(fichero, fin - inicio + 1), status=206)
+        respuesta["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+        respuesta["Content-Length"] = fin - inicio + 1
+    respuesta["Accept-Ranges"] = "bytes"
+    return _cabeceras(respuesta, adjunto, descargar)
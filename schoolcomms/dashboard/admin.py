@@ -0,0 +1,34 @@
+from django.contrib import admin
+
+from .models import (
+    CalendarioCentro, CursoEscolar, PeriodoNoLectivo,
+    ResumenAsistenciaAlumno, ResumenAsistenciaGrupo,
+)
+
+
+class PeriodoNoLectivoInline(admin.TabularInline):
+    model = PeriodoNoLectivo
+    extra = 1
+
+
+class CalendarioCentroInline(admin.TabularInline):
+    model = CalendarioCentro
+    extra = 0
+
+
+@admin.register(CursoEscolar)
+class CursoEscolarAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "inicio", "fin", "fin_primer_trimestre", "fin_segundo_trimestre")
+    inlines = [PeriodoNoLectivoInline, CalendarioCentroInline]
+
+
+@admin.register(ResumenAsistenciaAlumno)
+class ResumenAsistenciaAlumnoAdmin(admin.ModelAdmin):
+    list_display = ("alumno", "curso", "trimestre", "presentes", "ausentes")
+    list_filter = ("curso", "trimestre")
+
+
+@admin.register(ResumenAsistenciaGrupo)
+class ResumenAsistenciaGrupoAdmin(admin.ModelAdmin):
+    list_display = ("grupo", "curso", "trimestre", "presentes", "ausentes")
+    list_filter = ("curso", "trimestre")
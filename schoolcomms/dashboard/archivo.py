@@ -0,0 +1,141 @@
+# dashboard/archivo.py
+"""
+Archivo de mensajes privados y notificaciones antiguos (datos fríos).
+
+archivar() mueve por lotes a MensajeArchivado / NotificacionArchivada (mismo
+id, mismas columnas) lo anterior a una fecha de corte: una antigüedad en días
+(ARCHIVO_ANTIGUEDAD_DIAS) o el final del último curso escolar cerrado. Cada
+lote es un INSERT en el archivo y un DELETE en la tabla caliente, en la misma
+transacción, así que las bandejas y contadores recorren tablas pequeñas.
+
+Solo se archiva lo ya leído: los contadores de no leídos no cambian. Se quedan
+en caliente el último mensaje de cada conversación (la bandeja lo enseña) y
+los mensajes con adjuntos.
+
+Las vistas leen las dos tablas: detalle con fallback (obtener_mensaje),
+historiales con paginación por cursor sobre ambas (ver paginacion.py) y la
+búsqueda con un UNION ALL (ver busqueda.py).
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.http import Http404
+from django.utils import timezone
+
+from .cache import invalidar_dashboard_global
+from .models import (
+    Adjunto, Conversacion, CursoEscolar, MensajeArchivado, NotificacionArchivada,
+    Notification, PrivateMessage,
+)
+from .notificaciones import TAMANO_LOTE
+
+CAMPOS_MENSAJE = ["id", "sender_id", "receiver_id", "subject", "content", "created_at", "is_read", "archivado"]
+CAMPOS_NOTIFICACION = ["id", "user_id", "tipo", "titulo", "contenido", "url", "creado", "leida", "mensaje_id"]
+
+
+# ---------------------- CORTE ----------------------
+
+
+def fecha_corte(dias=None, cursos_cerrados=False, hoy=None):
+    """
+    Fecha antes de la cual se archiva: el día siguiente al fin del último curso
+    cerrado, o hace `dias` días (ARCHIVO_ANTIGUEDAD_DIAS por defecto). None si
+    no hay curso cerrado.
+    """
+    hoy = hoy or timezone.localdate()
+    if cursos_cerrados:
+        fin = CursoEscolar.objects.filter(fin__lt=hoy).order_by("-fin").values_list("fin", flat=True).first()
+        if fin is None:
+            return None
+        return timezone.make_aware(datetime.combine(fin + timedelta(days=1), time.min))
+    dias = settings.ARCHIVO_ANTIGUEDAD_DIAS if dias is None else dias
+    return timezone.now() - timedelta(days=dias)
+
+
+# ---------------------- ARCHIVADO ----------------------
+
+
+def mensajes_archivables(corte):
+    ultimos = Conversacion.objects.filter(ultimo_mensaje__isnull=False).values("ultimo_mensaje")
+    return (
+        PrivateMessage.objects.filter(created_at__lt=corte, is_read=True)
+        .exclude(pk__in=ultimos)
+        .exclude(Exists(Adjunto.objects.filter(mensaje=OuterRef("pk"))))
+    )
+
+
+def notificaciones_archivables(corte):
+    # Las que aún esperan su email/SMS/push se quedan hasta que salgan
+    return Notification.objects.filter(creado__lt=corte, leida=True, envio_pendiente=False)
+
+
+def _mover(origen, destino, campos, antes_de_borrar=None, lote=TAMANO_LOTE):
+    """Copia y borra `origen` por lotes de ids. Devuelve cuántas filas ha movido."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            filas = list(origen.order_by("id").values(*campos)[:lote])
+            if not filas:
+                return total
+            ids = [f["id"] for f in filas]
+            destino.objects.bulk_create([destino(**f) for f in filas], ignore_conflicts=True)
+            if antes_de_borrar:
+                antes_de_borrar(ids)
+            # Sin Collector: nada más apunta a estas filas (o ya se ha soltado arriba).
+            # _raw_delete es privado de Django, pero delete() lanzaría los post_delete
+            # de mensajes y notificaciones (recalcular la conversación, restar del
+            # contador), y estas filas no se borran: se mudan al archivo tal cual
+            borrar = origen.model.objects.filter(pk__in=ids)
+            borrar._raw_delete(borrar.db)
+        total += len(ids)
+
+
+def _soltar_notificaciones(ids_mensajes):
+    # Las notificaciones que siguen en caliente dejan de apuntar al mensaje (conservan la url)
+    Notification.objects.filter(mensaje_id__in=ids_mensajes).update(mensaje=None)
+
+
+def archivar(corte, lote=TAMANO_LOTE):
+    """Mueve al archivo lo archivable anterior a `corte`. Devuelve (mensajes, notificaciones)."""
+    # Primero las notificaciones: así las que se archivan guardan el id de su mensaje
+    notificaciones = _mover(notificaciones_archivables(corte), NotificacionArchivada, CAMPOS_NOTIFICACION, lote=lote)
+    mensajes = _mover(
+        mensajes_archivables(corte), MensajeArchivado, CAMPOS_MENSAJE,
+        antes_de_borrar=_soltar_notificaciones, lote=lote,
+    )
+    if mensajes or notificaciones:
+        invalidar_dashboard_global()
+    return mensajes, notificaciones
+
+
+# ---------------------- LECTURA ----------------------
+
+
+def obtener_mensaje(**filtros):
+    """El mensaje que cumple `filtros`, de la tabla caliente o del archivo; si no, 404."""
+    for modelo in (PrivateMessage, MensajeArchivado):
+        mensaje = modelo.objects.select_related("sender", "receiver").filter(**filtros).first()
+        if mensaje is not None:
+            return mensaje
+    raise Http404
+
+
+def conversacion(user, otro):
+    """Querysets (caliente, archivo) de los mensajes entre `user` y `otro`."""
+    filtro = Q(sender=user, receiver=otro) | Q(sender=otro, receiver=user)
+    return [modelo.objects.filter(filtro).select_related("sender") for modelo in (PrivateMessage, MensajeArchivado)]
+
+
+def enviados(user):
+    return [modelo.objects.filter(sender=user).select_related("receiver") for modelo in (PrivateMessage, MensajeArchivado)]
+
+
+def ultimas_notificaciones(user, n=20):
+    """Las `n` notificaciones más recientes de `user`, mezclando las calientes y las archivadas."""
+    recientes = []
+    for modelo in (Notification, NotificacionArchivada):
+        recientes += list(modelo.objects.filter(user=user).order_by("-creado")[:n])
+    recientes.sort(key=lambda x: (x.creado, x.pk), reverse=True)
+    return recientes[:n]
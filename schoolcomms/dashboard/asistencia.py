@@ -0,0 +1,141 @@
+# dashboard/asistencia.py
+"""
+Resúmenes de asistencia mantenidos de forma incremental.
+
+Cada alta, cambio o borrado de Asistencia suma/resta 1 en:
+- ResumenAsistenciaAlumno (alumno, curso, trimestre)
+- ResumenAsistenciaGrupo (grupo, curso, trimestre) de cada grupo del alumno
+- AsistenciaDiariaGrupo (grupo, fecha)
+
+Solo cuentan los días lectivos del calendario. Así el dashboard y los informes
+leen como mucho tres filas por alumno o grupo en lugar de recorrer el curso.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+
+from core.models import Group
+from .calendario import obtener_calendario
+from .models import (
+    Asistencia, AsistenciaDiariaGrupo, ResumenAsistenciaAlumno, ResumenAsistenciaGrupo,
+)
+
+
+def _incrementar(modelo, claves, campo, delta):
+    filas = modelo.objects.filter(**claves)
+    if delta < 0:
+        # Nunca por debajo de 0 aunque el resumen estuviera desfasado
+        filas.filter(**{f"{campo}__gte": -delta}).update(**{campo: F(campo) + delta})
+        return
+    if filas.update(**{campo: F(campo) + delta}):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**claves, **{campo: delta})
+    except IntegrityError:
+        # Otra petición creó la fila a la vez: basta con sumar
+        modelo.objects.filter(**claves).update(**{campo: F(campo) + delta})
+
+
+def aplicar_asistencia(alumno_id, fecha, estado, delta):
+    """Suma (delta=1) o resta (delta=-1) un registro de asistencia a los resúmenes."""
+    calendario = obtener_calendario(fecha)
+    if calendario.curso_id is None or not calendario.es_lectivo(fecha):
+        return
+    trimestre = calendario.trimestre(fecha)
+    campo = "presentes" if estado == "presente" else "ausentes"
+    grupos = Group.students.through.objects.filter(customuser_id=alumno_id).values_list("group_id", flat=True)
+
+    with transaction.atomic():
+        _incrementar(
+            ResumenAsistenciaAlumno,
+            {"alumno_id": alumno_id, "curso_id": calendario.curso_id, "trimestre": trimestre},
+            campo, delta,
+        )
+        for grupo_id in grupos:
+            _incrementar(
+                ResumenAsistenciaGrupo,
+                {"grupo_id": grupo_id, "curso_id": calendario.curso_id, "trimestre": trimestre},
+                campo, delta,
+            )
+            _incrementar(AsistenciaDiariaGrupo, {"grupo_id": grupo_id, "fecha": fecha}, campo, delta)
+
+
+def _totales(qs, calendario, hasta):
+    totales = qs.aggregate(presentes=Sum("presentes"), ausentes=Sum("ausentes"))
+    return {
+        "dias_lectivos": calendario.contar_lectivos(calendario.inicio, hasta),
+        "presentes": totales["presentes"] or 0,
+        "ausentes": totales["ausentes"] or 0,
+    }
+
+
+def totales_alumno(alumno, hasta, trimestre=None):
+    """Totales del curso (o de un trimestre) de un alumno leyendo los resúmenes."""
+    calendario = obtener_calendario(hasta)
+    qs = ResumenAsistenciaAlumno.objects.filter(alumno=alumno, curso_id=calendario.curso_id)
+    if trimestre:
+        qs = qs.filter(trimestre=trimestre)
+    return _totales(qs, calendario, hasta)
+
+
+def totales_grupo(grupo, hasta, trimestre=None):
+    """Totales del curso (o de un trimestre) de un grupo leyendo los resúmenes."""
+    calendario = obtener_calendario(hasta)
+    qs = ResumenAsistenciaGrupo.objects.filter(grupo=grupo, curso_id=calendario.curso_id)
+    if trimestre:
+        qs = qs.filter(trimestre=trimestre)
+    return _totales(qs, calendario, hasta)
+
+
+def _acumular(destino, clave, presentes, ausentes):
+    acumulado = destino.setdefault(clave, [0, 0])
+    acumulado[0] += presentes
+    acumulado[1] += ausentes
+
+
+def reconstruir_resumenes():
+    """
+    Recalcula todos los resúmenes desde Asistencia (para cargas masivas hechas
+    con update()/bulk_create, que no emiten señales). Agrupa en la base de
+    datos por alumno y fecha; el reparto en trimestres se hace en memoria.
+    """
+    alumnos, grupos, diarios = {}, {}, {}
+    miembros = {}
+    for grupo_id, alumno_id in Group.students.through.objects.values_list("group_id", "customuser_id"):
+        miembros.setdefault(alumno_id, []).append(grupo_id)
+
+    filas = (
+        Asistencia.objects.values_list("alumno_id", "fecha")
+        .annotate(
+            presentes=Count("id", filter=Q(estado="presente")),
+            ausentes=Count("id", filter=Q(estado="ausente")),
+        )
+        .order_by()
+    )
+    for alumno_id, fecha, presentes, ausentes in filas.iterator():
+        calendario = obtener_calendario(fecha)
+        if calendario.curso_id is None or not calendario.es_lectivo(fecha):
+            continue
+        periodo = (calendario.curso_id, calendario.trimestre(fecha))
+        _acumular(alumnos, (alumno_id, *periodo), presentes, ausentes)
+        for grupo_id in miembros.get(alumno_id, []):
+            _acumular(grupos, (grupo_id, *periodo), presentes, ausentes)
+            _acumular(diarios, (grupo_id, fecha), presentes, ausentes)
+
+    with transaction.atomic():
+        ResumenAsistenciaAlumno.objects.all().delete()
+        ResumenAsistenciaGrupo.objects.all().delete()
+        AsistenciaDiariaGrupo.objects.all().delete()
+        ResumenAsistenciaAlumno.objects.bulk_create([
+            ResumenAsistenciaAlumno(alumno_id=a, curso_id=c, trimestre=t, presentes=p, ausentes=au)
+            for (a, c, t), (p, au) in alumnos.items()
+        ], batch_size=1000)
+        ResumenAsistenciaGrupo.objects.bulk_create([
+            ResumenAsistenciaGrupo(grupo_id=g, curso_id=c, trimestre=t, presentes=p, ausentes=au)
+            for (g, c, t), (p, au) in grupos.items()
+        ], batch_size=1000)
+        AsistenciaDiariaGrupo.objects.bulk_create([
+            AsistenciaDiariaGrupo(grupo_id=g, fecha=f, presentes=p, ausentes=au)
+            for (g, f), (p, au) in diarios.items()
+        ], batch_size=1000)
+    return len(alumnos), len(grupos), len(diarios)
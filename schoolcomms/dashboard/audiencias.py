@@ -0,0 +1,145 @@
+# dashboard/audiencias.py
+"""
+Avisos dirigidos a grupos, aulas, centros o clases.
+
+En lugar de una fila por familia en Aviso.destinatarios, el aviso guarda sus
+audiencias (AudienciaAviso) y cada usuario tiene un índice pequeño con todo
+aquello a lo que pertenece (MiembroAudiencia). "Avisos recibidos" se resuelve
+al leer cruzando ambos por (tipo, objeto_id).
+
+El índice se calcula a partir de Group.students (que da grupo, aula y centro)
+y ClassGroup.members, y se recalcula por usuario desde signals.py.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from announcements.models import ClassGroup
+from core.models import Classroom, Group, School
+
+from .cache import invalidar_dashboard
+from .models import AudienciaAviso, Aviso, MiembroAudiencia
+from .notificaciones import TAMANO_LOTE, lotes, notificar_aviso
+
+MODELOS_AUDIENCIA = {
+    "grupo": Group,
+    "aula": Classroom,
+    "centro": School,
+    "clase": ClassGroup,
+}
+
+
+def _filtro(objetivos):
+    q = Q()
+    for tipo, objeto_id in objetivos:
+        q |= Q(tipo=tipo, objeto_id=objeto_id)
+    return q
+
+
+# ---------------------- ÍNDICE DE PERTENENCIA ----------------------
+
+def pertenencias(user_ids):
+    """Conjunto de (user_id, tipo, objeto_id) calculado desde las tablas de origen."""
+    filas = set()
+    grupos = Group.students.through.objects.filter(customuser_id__in=user_ids).values_list(
+        "customuser_id", "group_id", "group__classroom_id", "group__classroom__school_id",
+    )
+    for user_id, grupo_id, aula_id, centro_id in grupos:
+        filas.update({(user_id, "grupo", grupo_id), (user_id, "aula", aula_id), (user_id, "centro", centro_id)})
+    clases = ClassGroup.members.through.objects.filter(customuser_id__in=user_ids).values_list(
+        "customuser_id", "classgroup_id",
+    )
+    filas.update((user_id, "clase", clase_id) for user_id, clase_id in clases)
+    return filas
+
+
+def reindexar_usuarios(user_ids):
+    """Recalcula el índice de pertenencias de los usuarios indicados."""
+    ids = sorted({uid for uid in user_ids if uid})
+    for lote in lotes(ids, TAMANO_LOTE):
+        with transaction.atomic():
+            MiembroAudiencia.objects.filter(user_id__in=lote).delete()
+            MiembroAudiencia.objects.bulk_create(
+                [MiembroAudiencia(user_id=u, tipo=t, objeto_id=o) for u, t, o in pertenencias(lote)],
+                batch_size=TAMANO_LOTE,
+            )
+
+
+def reconstruir_indice():
+    """Recalcula el índice completo (p. ej. tras cargas masivas sin señales). Devuelve cuántas filas hay."""
+    ids = set(Group.students.through.objects.values_list("customuser_id", flat=True))
+    ids.update(ClassGroup.members.through.objects.values_list("customuser_id", flat=True))
+    ids.update(MiembroAudiencia.objects.values_list("user_id", flat=True))
+    reindexar_usuarios(ids)
+    return MiembroAudiencia.objects.count()
+
+
+def alumnos_de(tipo, objeto_id):
+    """Ids de los alumnos que hoy pertenecen a un grupo/aula/centro (según Group.students)."""
+    campo = {"grupo": "group_id", "aula": "group__classroom_id", "centro": "group__classroom__school_id"}[tipo]
+    return list(
+        Group.students.through.objects.filter(**{campo: objeto_id})
+        .values_list("customuser_id", flat=True).distinct()
+    )
+
+
+def olvidar_objeto(tipo, objeto_id):
+    """Quita del índice y de los avisos un grupo/aula/centro/clase que se ha borrado."""
+    MiembroAudiencia.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+    AudienciaAviso.objects.filter(tipo=tipo, objeto_id=objeto_id).delete()
+
+
+# ---------------------- AVISOS ----------------------
+
+def miembros(objetivos):
+    """Ids de usuario (sin repetir) que pertenecen a alguna de las audiencias `objetivos`."""
+    if not objetivos:
+        return MiembroAudiencia.objects.none().values_list("user_id", flat=True)
+    return MiembroAudiencia.objects.filter(_filtro(objetivos)).values_list("user_id", flat=True).distinct()
+
+
+def _filtro_recibidos(user):
+    directos = Aviso.destinatarios.through.objects.filter(customuser_id=user.pk).values("aviso_id")
+    filtro = Q(pk__in=directos)
+    mias = list(MiembroAudiencia.objects.filter(user=user).values_list("tipo", "objeto_id"))
+    if mias:
+        filtro |= Q(pk__in=AudienciaAviso.objects.filter(_filtro(mias)).values("aviso_id"))
+    return filtro
+
+
+def avisos_recibidos(user):
+    """
+    Avisos dirigidos a `user`, directamente o a alguna de sus audiencias. Se
+    leen primero sus pertenencias (pocas filas) y con ellas se busca en el
+    índice (tipo, objeto_id) de AudienciaAviso.
+    """
+    return Aviso.objects.filter(_filtro_recibidos(user))
+
+
+def avisos_visibles(user):
+    """Avisos creados por `user` o recibidos por él, sin JOIN ni DISTINCT (semijoins IN)."""
+    return Aviso.objects.filter(Q(autor=user) | _filtro_recibidos(user))
+
+
+def asignar_audiencias(aviso, objetivos):
+    """
+    Sustituye las audiencias de `aviso` por `objetivos` ((tipo, objeto_id)) y
+    notifica a los miembros de las nuevas que aún no estaban avisados.
+    """
+    objetivos = set(objetivos)
+    actuales = set(aviso.audiencias.values_list("tipo", "objeto_id"))
+    nuevas, quitadas = objetivos - actuales, actuales - objetivos
+    with transaction.atomic():
+        if quitadas:
+            aviso.audiencias.filter(_filtro(quitadas)).delete()
+        AudienciaAviso.objects.bulk_create(
+            [AudienciaAviso(aviso=aviso, tipo=t, objeto_id=o) for t, o in nuevas]
+        )
+        if not nuevas:
+            return 0
+        # Los destinatarios directos ya recibieron su notificación al añadirlos
+        avisados = set(miembros(actuales & objetivos))
+        avisados.update(aviso.destinatarios.values_list("pk", flat=True))
+        ids = [uid for uid in miembros(nuevas).iterator() if uid not in avisados]
+        notificar_aviso(aviso, ids)
+    invalidar_dashboard(*ids)
+    return len(ids)
@@ -0,0 +1,269 @@
+# dashboard/busqueda.py
+"""
+Búsqueda de texto completo en los mensajes privados.
+
+El índice invertido lo mantiene la propia base de datos, así que cualquier
+escritura (save, update o bulk_create) queda indexada sin pasar por Python:
+
+- SQLite: tabla virtual FTS5 de contenido externo (rowid = id del mensaje)
+  sincronizada con triggers de INSERT/UPDATE/DELETE.
+- PostgreSQL: columna tsvector generada (asunto con peso A, contenido con
+  peso B) con índice GIN.
+
+Se indexan la tabla caliente y la del archivo (MensajeArchivado), y cada
+búsqueda las consulta juntas con un UNION ALL: lo archivado se sigue
+encontrando. La columna y las tablas del índice no están en los modelos: las
+crea la migración 0018 con asegurar_indice() (la del archivo, 0021, lleva su
+propio SQL), y reponer_triggers() vuelve a poner los triggers tras cada
+migrate (SQLite los borra al rehacer una tabla). 0018 ya está publicada: el
+SQL de asegurar_indice() y eliminar_indice() no se toca, y cualquier cambio
+del índice va en una migración nueva con su propio SQL.
+Las consultas siempre se acotan a los mensajes que el usuario envió o
+recibió, y salen ordenadas por relevancia.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import MensajeArchivado, PrivateMessage
+
+MODELOS = (PrivateMessage, MensajeArchivado)
+TABLAS = tuple(m._meta.db_table for m in MODELOS)
+# La misma configuración que la columna generada en la migración 0021
+CONFIG_PG = "spanish"
+
+RESULTADOS_POR_PAGINA = 20
+# Páginas de búsqueda van por OFFSET (el orden es la relevancia): se limita la profundidad
+MAX_PAGINAS = 50
+MAX_TERMINOS = 8
+
+# Marcas de resaltado: no aparecen en el texto y se cambian por <mark> tras escapar
+_INICIO, _FIN = "\x02", "\x03"
+
+_TERMINO = re.compile(r"\w+", re.UNICODE)
+
+
+def tabla_fts(tabla):
+    return f"{tabla}_fts"
+
+
+def _tabla_sqlite(tabla):
+    return f"""CREATE VIRTUAL TABLE IF NOT EXISTS {tabla_fts(tabla)} USING fts5(
+        subject, content, content='{tabla}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )"""
+
+
+def _triggers_sqlite(tabla):
+    # Los mismos que crea la migración 0021
+    fts = tabla_fts(tabla)
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {fts}(rowid, subject, content) VALUES (new.id, new.subject, new.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, content)
+            VALUES ('delete', old.id, old.subject, old.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF subject, content ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, content)
+            VALUES ('delete', old.id, old.subject, old.content);
+            INSERT INTO {fts}(rowid, subject, content) VALUES (new.id, new.subject, new.content);
+        END""",
+    ]
+
+
+def _sql_postgres(tabla):
+    return [
+        f"""ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS busqueda tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('{CONFIG_PG}', coalesce(subject, '')), 'A') ||
+            setweight(to_tsvector('{CONFIG_PG}', coalesce(content, '')), 'B')
+        ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {tabla}_busqueda_gin ON {tabla} USING gin (busqueda)",
+    ]
+
+
+# ---------------------- ÍNDICE ----------------------
+
+
+def _existe_tabla_fts(cursor, tabla):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [tabla_fts(tabla)])
+    return cursor.fetchone() is not None
+
+
+def _tablas_existentes(conexion, tablas):
+    # Desde 0018 se llama cuando el archivo aún no existe: solo las tablas que ya están
+    existentes = set(conexion.introspection.table_names())
+    return [t for t in (tablas or TABLAS) if t in existentes]
+
+
+def asegurar_indice(conexion=None, tablas=None):
+    """Crea (si faltan) la tabla/columna del índice de `tablas` y sus triggers. Idempotente."""
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        for tabla in _tablas_existentes(conexion, tablas):
+            if conexion.vendor == "sqlite":
+                nueva = not _existe_tabla_fts(cursor, tabla)
+                for sql in [_tabla_sqlite(tabla), *_triggers_sqlite(tabla)]:
+                    cursor.execute(sql)
+                if nueva:
+                    cursor.execute(f"INSERT INTO {tabla_fts(tabla)}({tabla_fts(tabla)}) VALUES ('rebuild')")
+            elif conexion.vendor == "postgresql":
+                for sql in _sql_postgres(tabla):
+                    cursor.execute(sql)
+
+
+def eliminar_indice(conexion=None, tablas=None):
+    conexion = conexion or connection
+    with conexion.cursor() as cursor:
+        for tabla in _tablas_existentes(conexion, tablas):
+            if conexion.vendor == "sqlite":
+                for sufijo in ("ai", "ad", "au"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS {tabla_fts(tabla)}_{sufijo}")
+                cursor.execute(f"DROP TABLE IF EXISTS {tabla_fts(tabla)}")
+            elif conexion.vendor == "postgresql":
+                cursor.execute(f"DROP INDEX IF EXISTS {tabla}_busqueda_gin")
+                cursor.execute(f"ALTER TABLE {tabla} DROP COLUMN IF EXISTS busqueda")
+
+
+def reponer_triggers(conexion=None):
+    """Tras un migrate: SQLite pierde los triggers si rehace una tabla de mensajes."""
+    conexion = conexion or connection
+    if conexion.vendor != "sqlite":
+        return
+    with conexion.cursor() as cursor:
+        for tabla in TABLAS:
+            if _existe_tabla_fts(cursor, tabla):
+                for sql in _triggers_sqlite(tabla):
+                    cursor.execute(sql)
+
+
+def reconstruir_indice(conexion=None):
+    """Rehace el índice desde las tablas de mensajes (la columna de PostgreSQL no lo necesita)."""
+    conexion = conexion or connection
+    if conexion.vendor != "sqlite":
+        return
+    reponer_triggers(conexion)
+    with conexion.cursor() as cursor:
+        for tabla in TABLAS:
+            if _existe_tabla_fts(cursor, tabla):
+                cursor.execute(f"INSERT INTO {tabla_fts(tabla)}({tabla_fts(tabla)}) VALUES ('rebuild')")
+
+
+# ---------------------- CONSULTA ----------------------
+
+
+def terminos(consulta):
+    """Palabras de la consulta del usuario (sin operadores: todo se busca como texto)."""
+    return _TERMINO.findall(consulta or "")[:MAX_TERMINOS]
+
+
+def _consulta_sqlite(palabras):
+    # "palabra"* por término: prefijo y AND implícito, sin sintaxis FTS5 del usuario
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+def _consulta_postgres(palabras):
+    return " & ".join(f"{p}:*" for p in palabras)
+
+
+def _buscar_sqlite(user_id, palabras, limite, desplazamiento):
+    partes, params = [], []
+    for fuente, tabla in enumerate(TABLAS):
+        fts = tabla_fts(tabla)
+        partes.append(f"""
+            SELECT {fuente} AS fuente, m.id AS id,
+                   snippet({fts}, 0, %s, %s, '…', 12) AS asunto,
+                   snippet({fts}, 1, %s, %s, '…', 24) AS fragmento,
+                   bm25({fts}, 4.0, 1.0) AS rango
+            FROM {fts} f JOIN {tabla} m ON m.id = f.rowid
+            WHERE {fts} MATCH %s AND (m.sender_id = %s OR m.receiver_id = %s)
+        """)
+        params += [_INICIO, _FIN, _INICIO, _FIN, _consulta_sqlite(palabras), user_id, user_id]
+    sql = " UNION ALL ".join(partes) + " ORDER BY rango, id DESC LIMIT %s OFFSET %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limite, desplazamiento])
+        return [fila[:4] for fila in cursor.fetchall()]
+
+
+def _buscar_postgres(user_id, palabras, limite, desplazamiento):
+    opciones = f"StartSel={_INICIO}, StopSel={_FIN}, MaxWords=24, MinWords=8"
+    partes, params = [], []
+    for fuente, tabla in enumerate(TABLAS):
+        partes.append(f"""
+            SELECT {fuente} AS fuente, m.id AS id,
+                   ts_headline(%s, m.subject, q, %s) AS asunto,
+                   ts_headline(%s, m.content, q, %s) AS fragmento,
+                   ts_rank(m.busqueda, q) AS rango
+            FROM {tabla} m, to_tsquery(%s, %s) q
+            WHERE m.busqueda @@ q AND (m.sender_id = %s OR m.receiver_id = %s)
+        """)
+        params += [
+            CONFIG_PG, opciones, CONFIG_PG, opciones, CONFIG_PG, _consulta_postgres(palabras),
+            user_id, user_id,
+        ]
+    sql = " UNION ALL ".join(partes) + " ORDER BY rango DESC, id DESC LIMIT %s OFFSET %s"
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [limite, desplazamiento])
+        return [fila[:4] for fila in cursor.fetchall()]
+
+
+def _buscar_generico(user_id, palabras, limite, desplazamiento):
+    # Otros motores: sin índice ni relevancia, solo coincidencia y más recientes primero
+    filas = []
+    for fuente, modelo in enumerate(MODELOS):
+        qs = modelo.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id))
+        for palabra in palabras:
+            qs = qs.filter(Q(subject__icontains=palabra) | Q(content__icontains=palabra))
+        qs = qs.order_by("-created_at", "-id").values_list("created_at", "id", "subject", "content")
+        filas += [(fecha, fuente, pk, asunto, contenido[:200]) for fecha, pk, asunto, contenido in qs[:desplazamiento + limite]]
+    filas.sort(key=lambda f: (f[0], f[2]), reverse=True)
+    return [f[1:] for f in filas[desplazamiento:desplazamiento + limite]]
+
+
+_BUSCADORES = {
+    "sqlite": _buscar_sqlite,
+    "postgresql": _buscar_postgres,
+}
+
+
+def resaltar(texto):
+    """Escapa el fragmento y convierte las marcas del motor en <mark>."""
+    texto = escape(texto or "")
+    return mark_safe(texto.replace(_INICIO, "<mark>").replace(_FIN, "</mark>"))
+
+
+def buscar_mensajes(user, consulta, pagina=1, tamano=RESULTADOS_POR_PAGINA):
+    """
+    Mensajes de `user` (enviados o recibidos, también los archivados) que
+    contienen todas las palabras de `consulta`, por relevancia. Devuelve
+    (mensajes, hay_siguiente); cada mensaje trae `asunto_resaltado` y
+    `fragmento` listos para la plantilla.
+    """
+    palabras = terminos(consulta)
+    pagina = min(max(pagina, 1), MAX_PAGINAS)
+    if not palabras:
+        return [], False
+
+    buscar = _BUSCADORES.get(connection.vendor, _buscar_generico)
+    # Una fila de más para saber si hay otra página sin hacer COUNT
+    filas = buscar(user.id, palabras, tamano + 1, (pagina - 1) * tamano)
+    hay_siguiente = len(filas) > tamano and pagina < MAX_PAGINAS
+    filas = filas[:tamano]
+
+    mensajes = {
+        fuente: modelo.objects.select_related("sender", "receiver").in_bulk([f[1] for f in filas if f[0] == fuente])
+        for fuente, modelo in enumerate(MODELOS)
+    }
+    resultados = []
+    for fuente, pk, asunto, fragmento in filas:
+        mensaje = mensajes[fuente].get(pk)
+        if mensaje is None:
+            continue
+        mensaje.asunto_resaltado = resaltar(asunto)
+        mensaje.fragmento = resaltar(fragmento)
+        resultados.append(mensaje)
+    return resultados, hay_siguiente
@@ -0,0 +1,132 @@
+# dashboard/cache.py
+"""
+Snapshot cacheado del dashboard por usuario.
+
+Cada usuario tiene un token de versión en la caché; el snapshot se guarda junto
+a la versión con la que se calculó. Invalidar = escribir un token nuevo, así que
+se pueden invalidar miles de usuarios con un solo set_many y un snapshot que se
+estaba calculando durante la invalidación nunca se da por bueno.
+"""
+import uuid
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_HITS = "dashboard:snapshot:hits"
+CLAVE_MISSES = "dashboard:snapshot:misses"
+CLAVE_VERSION_GLOBAL = "dashboard:version:global"
+
+
+def _clave_version(user_id):
+    return f"dashboard:version:{user_id}"
+
+
+def _clave_snapshot(user_id, parte=None):
+    if parte:
+        return f"dashboard:snapshot:{user_id}:{parte}"
+    return f"dashboard:snapshot:{user_id}"
+
+
+def _nueva_version():
+    return uuid.uuid4().hex
+
+
+def _contar(clave):
+    # incr falla si la clave no existe (o fue expulsada): se crea y se reintenta
+    try:
+        cache.incr(clave)
+    except ValueError:
+        if not cache.add(clave, 1, timeout=None):
+            cache.incr(clave)
+
+
+def _leer_version(clave):
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, _nueva_version(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def version_usuario(user_id):
+    """Token de versión actual de los datos del dashboard del usuario."""
+    return _leer_version(_clave_version(user_id))
+
+
+def _version_global():
+    return _leer_version(CLAVE_VERSION_GLOBAL)
+
+
+def version_datos(user_id):
+    """Versión combinada (usuario + global) para claves de caché y ETags."""
+    return f"{version_usuario(user_id)}-{_version_global()}"
+
+
+def obtener_snapshot(user, construir, parte=None):
+    """
+    Devuelve el snapshot del dashboard de `user` (o de una de sus tarjetas si
+    se indica `parte`). Si no está en caché (o es de otro día u otra versión)
+    lo calcula con `construir()` y lo guarda.
+    """
+    hoy = date.today()
+    clave_version = _clave_version(user.pk)
+    clave_snapshot = _clave_snapshot(user.pk, parte)
+    guardado = cache.get_many([clave_version, CLAVE_VERSION_GLOBAL, clave_snapshot])
+    version = (guardado.get(clave_version), guardado.get(CLAVE_VERSION_GLOBAL))
+    snapshot = guardado.get(clave_snapshot)
+
+    if (
+        None not in version
+        and snapshot is not None
+        and snapshot["version"] == version
+        and snapshot["fecha"] == hoy
+    ):
+        _contar(CLAVE_HITS)
+        return snapshot["datos"]
+
+    _contar(CLAVE_MISSES)
+    if None in version:
+        version = (version_usuario(user.pk), _version_global())
+    datos = construir()
+    cache.set(
+        clave_snapshot,
+        {"version": version, "fecha": hoy, "datos": datos},
+        timeout=settings.DASHBOARD_CACHE_TIMEOUT,
+    )
+    return datos
+
+
+def invalidar_dashboard(*user_ids):
+    """
+    Invalida el snapshot de los usuarios indicados cuando la transacción en
+    curso se confirma (en autocommit, inmediatamente).
+    """
+    ids = {uid for uid in user_ids if uid}
+    if not ids:
+        return
+
+    def _invalidar():
+        cache.set_many({_clave_version(uid): _nueva_version() for uid in ids}, timeout=None)
+
+    transaction.on_commit(_invalidar)
+
+
+def invalidar_dashboard_global():
+    """Invalida el snapshot de todos los usuarios (p. ej. al cambiar el calendario)."""
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION_GLOBAL, _nueva_version(), timeout=None))
+
+
+def estadisticas_cache():
+    """Contadores de aciertos/fallos del snapshot (para medir el hit ratio)."""
+    valores = cache.get_many([CLAVE_HITS, CLAVE_MISSES])
+    hits = valores.get(CLAVE_HITS, 0)
+    misses = valores.get(CLAVE_MISSES, 0)
+    total = hits + misses
+    return {
+        "backend": settings.CACHE_BACKEND,
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / total, 4) if total else None,
+    }
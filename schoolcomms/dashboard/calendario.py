@@ -0,0 +1,184 @@
+# dashboard/calendario.py
+"""
+Calendario escolar precompilado.
+
+El curso se compila una sola vez en un array ordenado con los ordinales de los
+días lectivos; a partir de ahí todas las preguntas ("¿es lectivo?", "¿cuántos
+lectivos hay entre dos fechas?", "últimos N lectivos") son búsquedas bisect en
+O(log n) en lugar de recorrer el calendario día a día.
+
+Los cursos se definen en base de datos (CursoEscolar, PeriodoNoLectivo,
+CalendarioCentro). Cada combinación curso/centro se compila la primera vez que
+se pide y se guarda en memoria del proceso; al editar el calendario se publica
+una versión nueva en la caché compartida y cada proceso descarta lo compilado.
+"""
+import time
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_VERSION = "calendario:version"
+
+
+class SchoolCalendar:
+    def __init__(self, inicio: date, fin: date, festivos=(), vacaciones=(), nombre="",
+                 curso_id=None, fines_trimestre=()):
+        self.nombre = nombre
+        self.curso_id = curso_id
+        self.inicio = inicio
+        self.fin = fin
+        self.fines_trimestre = sorted(f for f in fines_trimestre if f)
+        self.festivos = frozenset(festivos)
+        self.vacaciones = frozenset(vacaciones)
+
+        lectivos = array("l")
+        for ordinal in range(inicio.toordinal(), fin.toordinal() + 1):
+            dia = date.fromordinal(ordinal)
+            if dia.weekday() < 5 and dia not in self.festivos and dia not in self.vacaciones:
+                lectivos.append(ordinal)
+        self._lectivos = lectivos
+
+    def __len__(self):
+        return len(self._lectivos)
+
+    def __contains__(self, fecha: date):
+        return self.es_lectivo(fecha)
+
+    def es_lectivo(self, fecha: date) -> bool:
+        ordinal = fecha.toordinal()
+        i = bisect_left(self._lectivos, ordinal)
+        return i < len(self._lectivos) and self._lectivos[i] == ordinal
+
+    def motivo(self, fecha: date):
+        """Devuelve (bool, motivo_str), con el mismo formato que es_dia_lectivo."""
+        if fecha < self.inicio or fecha > self.fin:
+            return False, "Fuera del calendario escolar"
+        if fecha.weekday() >= 5:
+            return False, "Fin de semana"
+        if fecha in self.festivos:
+            return False, "Festivo oficial"
+        if fecha in self.vacaciones:
+            return False, "Vacaciones escolares"
+        return True, "Día lectivo"
+
+    def contar_lectivos(self, desde: date, hasta: date) -> int:
+        """Número de días lectivos en [desde, hasta], ambos incluidos."""
+        if hasta < desde:
+            return 0
+        return bisect_right(self._lectivos, hasta.toordinal()) - bisect_left(self._lectivos, desde.toordinal())
+
+    def lectivos_entre(self, desde: date, hasta: date):
+        """Lista ordenada de los días lectivos en [desde, hasta]."""
+        i = bisect_left(self._lectivos, desde.toordinal())
+        j = bisect_right(self._lectivos, hasta.toordinal())
+        return [date.fromordinal(o) for o in self._lectivos[i:j]]
+
+    def trimestre(self, fecha: date) -> int:
+        """Trimestre (1, 2, 3...) al que pertenece `fecha` dentro del curso."""
+        return bisect_left(self.fines_trimestre, fecha) + 1
+
+    def ultimos_lectivos(self, n: int, hasta: date):
+        """Los últimos `n` días lectivos <= `hasta`, en orden cronológico."""
+        j = bisect_right(self._lectivos, hasta.toordinal())
+        return [date.fromordinal(o) for o in self._lectivos[max(0, j - n):j]]
+
+
+# ---------------------- CALENDARIOS COMPILADOS (CACHÉ DE PROCESO) ----------------------
+
+_compilados = {}      # (curso_id, school_id) -> SchoolCalendar
+_cursos = None        # lista [(inicio, fin, curso_id)] ordenada por inicio
+_version = None       # versión compartida con la que se compiló lo anterior
+_comprobado = 0.0     # última vez (monotonic) que se miró la versión compartida
+
+
+def _dias(desde: date, hasta: date):
+    return (desde + timedelta(days=i) for i in range((hasta - desde).days + 1))
+
+
+def _comprobar_version():
+    global _cursos, _version, _comprobado
+    ahora = time.monotonic()
+    if ahora - _comprobado < settings.CALENDARIO_INTERVALO_VERSION:
+        return
+    _comprobado = ahora
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    if version != _version:
+        _compilados.clear()
+        _cursos = None
+        _version = version
+
+
+def _compilar(curso_id, school_id):
+    from .models import CalendarioCentro, CursoEscolar, PeriodoNoLectivo
+
+    curso = CursoEscolar.objects.get(pk=curso_id)
+    inicio, fin = curso.inicio, curso.fin
+    if school_id is not None:
+        ajuste = CalendarioCentro.objects.filter(curso_id=curso_id, school_id=school_id).first()
+        if ajuste:
+            inicio = ajuste.inicio or inicio
+            fin = ajuste.fin or fin
+
+    festivos, vacaciones = set(), set()
+    periodos = PeriodoNoLectivo.objects.filter(curso_id=curso_id, school__isnull=True)
+    if school_id is not None:
+        periodos = periodos | PeriodoNoLectivo.objects.filter(curso_id=curso_id, school_id=school_id)
+    for tipo, desde, hasta in periodos.values_list("tipo", "fecha_inicio", "fecha_fin"):
+        destino = festivos if tipo == "festivo" else vacaciones
+        destino.update(_dias(max(desde, inicio), min(hasta, fin)))
+
+    return SchoolCalendar(
+        inicio, fin, festivos, vacaciones,
+        nombre=curso.nombre,
+        curso_id=curso.pk,
+        fines_trimestre=(curso.fin_primer_trimestre, curso.fin_segundo_trimestre),
+    )
+
+
+def obtener_calendario(fecha: date = None, school=None) -> SchoolCalendar:
+    """
+    Calendario compilado del curso al que pertenece `fecha` (por defecto hoy).
+    Fuera de curso (p. ej. en verano) devuelve el último curso empezado; si no
+    hay ninguno configurado, un calendario vacío.
+    """
+    global _cursos
+    from .models import CursoEscolar
+
+    if fecha is None:
+        fecha = date.today()
+    school_id = getattr(school, "pk", school)
+
+    _comprobar_version()
+    if _cursos is None:
+        _cursos = sorted(CursoEscolar.objects.values_list("inicio", "fin", "id"))
+    if not _cursos:
+        return SchoolCalendar(fecha, fecha - timedelta(days=1))
+
+    i = bisect_right(_cursos, (fecha, date.max, float("inf"))) - 1
+    curso_id = _cursos[max(i, 0)][2]
+
+    clave = (curso_id, school_id)
+    calendario = _compilados.get(clave)
+    if calendario is None:
+        calendario = _compilados[clave] = _compilar(curso_id, school_id)
+    return calendario
+
+
+def invalidar_calendarios():
+    """Descarta los calendarios compilados en todos los procesos."""
+    def _invalidar():
+        global _cursos, _comprobado
+        _compilados.clear()
+        _cursos = None
+        _comprobado = 0.0
+        cache.set(CLAVE_VERSION, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(_invalidar)
@@ -0,0 +1,33 @@
+# dashboard/consumers.py
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .tiempo_real import grupo_usuario
+
+
+class EventosConsumer(AsyncJsonWebsocketConsumer):
+    """
+    /ws/eventos/: empuja al usuario sus mensajes y notificaciones nuevos
+    (ver tiempo_real.py). Solo envía; lo que escribe el cliente se ignora.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.grupo = grupo_usuario(user.id)
+        await self.channel_layer.group_add(self.grupo, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if getattr(self, "grupo", None):
+            await self.channel_layer.group_discard(self.grupo, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        pass
+
+    async def evento_mensaje(self, event):
+        await self.send_json({"tipo": "mensaje", "mensaje": event["mensaje"]})
+
+    async def evento_notificacion(self, event):
+        await self.send_json({"tipo": "notificacion", "notificacion": event["notificacion"]})
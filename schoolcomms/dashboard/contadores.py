@@ -0,0 +1,87 @@
+# dashboard/contadores.py
+"""
+Contadores de mensajes y notificaciones sin leer por usuario.
+
+Viven en la caché ("contadores:<campo>:<user_id>") y los mantienen los propios
+caminos de escritura: +1 al crear, -1 al leer, tras el commit. Si una clave
+no está (expulsada, usuario nuevo, o invalidada tras una operación masiva),
+se recalcula con un COUNT y se vuelve a guardar. Las páginas leen los dos
+contadores con un solo get_many, sin consultas.
+
+Un COUNT que corre entre el commit de una escritura y su on_commit ya ve la
+fila, y el +1 la contaría dos veces. Por eso quien recalcula deja antes una
+marca de VENTANA_RECUENTO segundos, y mientras está, la escritura borra la
+clave en vez de sumarle: el siguiente que lea vuelve a contar.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Notification, PrivateMessage
+
+CAMPOS = ("mensajes", "notificaciones")
+
+# Por si algún camino se salta los contadores: como mucho viven diez minutos
+TIMEOUT_CONTADORES = 10 * 60
+# Mucho más que lo que tarda un on_commit tras su commit
+VENTANA_RECUENTO = 10
+
+
+def _clave(campo, user_id):
+    return f"contadores:{campo}:{user_id}"
+
+
+def _marca(campo, user_id):
+    return f"contadores:recuento:{campo}:{user_id}"
+
+
+def _contar(campo, user_id):
+    if campo == "mensajes":
+        return PrivateMessage.objects.filter(receiver_id=user_id, is_read=False).count()
+    return Notification.objects.filter(user_id=user_id, leida=False).count()
+
+
+def obtener_contadores(user_id):
+    """{"mensajes": n, "notificaciones": m} sin leer de `user_id`."""
+    claves = {campo: _clave(campo, user_id) for campo in CAMPOS}
+    guardados = cache.get_many(claves.values())
+    faltan = [campo for campo, clave in claves.items() if guardados.get(clave) is None]
+    if faltan:
+        # La marca va antes del COUNT: cualquier escritura que este vea ya la encuentra
+        cache.set_many({_marca(campo, user_id): 1 for campo in faltan}, timeout=VENTANA_RECUENTO)
+    contadores = {}
+    for campo, clave in claves.items():
+        valor = guardados.get(clave)
+        if valor is None:
+            valor = _contar(campo, user_id)
+            # add: si otra petición ya lo ha guardado (y quizá sumado), se respeta
+            cache.add(clave, valor, timeout=TIMEOUT_CONTADORES)
+        contadores[campo] = valor
+    return contadores
+
+
+def _sumar(campo, user_id, delta):
+    clave = _clave(campo, user_id)
+    if cache.get(_marca(campo, user_id)) is not None:
+        # Recalculada hace nada: puede que ya cuente esta escritura
+        cache.delete(clave)
+        return
+    try:
+        if cache.incr(clave, delta) < 0:
+            cache.delete(clave)
+    except ValueError:
+        # No estaba: se recalculará al leerlo
+        pass
+
+
+def sumar(campo, user_id, delta=1):
+    """Suma `delta` al contador `campo` de `user_id` cuando se confirme la transacción."""
+    if user_id and delta:
+        transaction.on_commit(lambda: _sumar(campo, user_id, delta))
+
+
+def invalidar_contadores(user_ids, campo=None):
+    """Descarta los contadores (tras updates masivos): se recalculan al leerlos."""
+    campos = [campo] if campo else CAMPOS
+    claves = [_clave(c, uid) for uid in set(user_ids) if uid for c in campos]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
@@ -0,0 +1,15 @@
+# dashboard/context_processors.py
+from django.utils.functional import SimpleLazyObject
+
+from .contadores import obtener_contadores
+
+
+def contadores(request):
+    """
+    `contadores.mensajes` y `contadores.notificaciones` (sin leer) en todas
+    las plantillas. Perezoso: solo se lee la caché si la página los pinta.
+    """
+    user = getattr(request, "user", None)
+    if not user or not user.is_authenticated:
+        return {}
+    return {"contadores": SimpleLazyObject(lambda: obtener_contadores(user.id))}
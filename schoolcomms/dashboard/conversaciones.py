@@ -0,0 +1,147 @@
+# dashboard/conversaciones.py
+"""
+Conversaciones con el último mensaje y los no leídos ya calculados.
+
+Cada mensaje nuevo actualiza su Conversacion y los dos ParticipanteConversacion
+con UPDATE ... SET no_leidos = no_leidos + 1 dentro de una transacción, y al
+leer se resta igual; así la bandeja lista los hilos con su contador sin
+agregar PrivateMessage. recalcular_conversaciones() rehace todo desde los
+mensajes (borrados, cargas masivas o si algún contador se desvía).
+"""
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+
+from .cache import invalidar_dashboard
+from .contadores import sumar
+from .models import Conversacion, ParticipanteConversacion, PrivateMessage
+from .notificaciones import TAMANO_LOTE, lotes
+
+
+def _par(x, y):
+    return (x, y) if x <= y else (y, x)
+
+
+def _obtener(sender_id, receiver_id, fecha):
+    a, b = _par(sender_id, receiver_id)
+    conversacion, creada = Conversacion.objects.get_or_create(
+        usuario_a_id=a, usuario_b_id=b, defaults={"ultima_actividad": fecha},
+    )
+    if creada:
+        ParticipanteConversacion.objects.bulk_create([
+            ParticipanteConversacion(conversacion=conversacion, usuario_id=u, otro_id=o, ultima_actividad=fecha)
+            for u, o in {(a, b), (b, a)}
+        ])
+    return conversacion
+
+
+def registrar_mensaje(mensaje):
+    """Lleva `mensaje` (recién creado) a su conversación: último mensaje, actividad y no leídos."""
+    fecha = mensaje.created_at
+    with transaction.atomic():
+        conversacion = _obtener(mensaje.sender_id, mensaje.receiver_id, fecha)
+        Conversacion.objects.filter(pk=conversacion.pk, ultima_actividad__lte=fecha).update(
+            ultimo_mensaje=mensaje, ultima_actividad=fecha,
+        )
+        participantes = ParticipanteConversacion.objects.filter(conversacion=conversacion)
+        participantes.filter(ultima_actividad__lt=fecha).update(ultima_actividad=fecha)
+        if not mensaje.is_read:
+            participantes.filter(usuario_id=mensaje.receiver_id).update(no_leidos=F("no_leidos") + 1)
+            sumar("mensajes", mensaje.receiver_id)
+
+
+def _sumar_no_leidos(sender_id, receiver_id, delta):
+    a, b = _par(sender_id, receiver_id)
+    qs = ParticipanteConversacion.objects.filter(
+        conversacion__usuario_a_id=a, conversacion__usuario_b_id=b, usuario_id=receiver_id,
+    )
+    if delta < 0:
+        qs = qs.filter(no_leidos__gte=-delta)
+    qs.update(no_leidos=F("no_leidos") + delta)
+
+
+def marcar_leido(mensaje, leido=True):
+    """Marca `mensaje` como leído (o no) y ajusta el contador. Devuelve si ha cambiado."""
+    with transaction.atomic():
+        cambiado = PrivateMessage.objects.filter(pk=mensaje.pk, is_read=not leido).update(is_read=leido)
+        if cambiado:
+            _sumar_no_leidos(mensaje.sender_id, mensaje.receiver_id, -1 if leido else 1)
+            sumar("mensajes", mensaje.receiver_id, -1 if leido else 1)
+    mensaje.is_read = leido
+    if cambiado:
+        invalidar_dashboard(mensaje.receiver_id)
+    return bool(cambiado)
+
+
+def marcar_conversacion_leida(user, otro):
+    """Marca como leído todo lo que `otro` ha enviado a `user`. Devuelve cuántos mensajes."""
+    with transaction.atomic():
+        total = PrivateMessage.objects.filter(sender=otro, receiver=user, is_read=False).update(is_read=True)
+        if total:
+            ParticipanteConversacion.objects.filter(usuario=user, otro=otro).update(no_leidos=0)
+            sumar("mensajes", user.id, -total)
+    if total:
+        invalidar_dashboard(user.id)
+    return total
+
+
+def conversaciones_de(user):
+    """Hilos de `user`, el más reciente primero, con el otro usuario y el último mensaje."""
+    return (
+        ParticipanteConversacion.objects.filter(usuario=user)
+        .select_related("otro", "conversacion__ultimo_mensaje")
+        .order_by("-ultima_actividad")
+    )
+
+
+def recalcular_conversaciones(pares=None):
+    """
+    Rehace desde PrivateMessage las conversaciones de `pares` ((user_id, user_id))
+    o todas si es None. Devuelve cuántas quedan recalculadas.
+    """
+    mensajes = PrivateMessage.objects.all()
+    conversaciones = Conversacion.objects.all()
+    if pares is not None:
+        pares = {_par(x, y) for x, y in pares}
+        if not pares:
+            return 0
+        filtro_mensajes, filtro_conversaciones = Q(), Q()
+        for a, b in pares:
+            filtro_mensajes |= Q(sender_id=a, receiver_id=b) | Q(sender_id=b, receiver_id=a)
+            filtro_conversaciones |= Q(usuario_a_id=a, usuario_b_id=b)
+        mensajes = mensajes.filter(filtro_mensajes)
+        conversaciones = conversaciones.filter(filtro_conversaciones)
+
+    resumen = {}
+    filas = (
+        mensajes.order_by().values_list("sender_id", "receiver_id")
+        .annotate(ultimo=Max("id"), no_leidos=Count("id", filter=Q(is_read=False)))
+    )
+    for sender_id, receiver_id, ultimo, no_leidos in filas:
+        datos = resumen.setdefault(_par(sender_id, receiver_id), {"ultimo": 0, "no_leidos": {}})
+        datos["ultimo"] = max(datos["ultimo"], ultimo)
+        datos["no_leidos"][receiver_id] = datos["no_leidos"].get(receiver_id, 0) + no_leidos
+    fechas = {}
+    for lote in lotes([d["ultimo"] for d in resumen.values()], TAMANO_LOTE):
+        fechas.update(PrivateMessage.objects.filter(pk__in=lote).values_list("id", "created_at"))
+
+    with transaction.atomic():
+        conversaciones.delete()
+        nuevas = Conversacion.objects.bulk_create(
+            [
+                Conversacion(usuario_a_id=a, usuario_b_id=b, ultimo_mensaje_id=d["ultimo"], ultima_actividad=fechas[d["ultimo"]])
+                for (a, b), d in resumen.items()
+            ],
+            batch_size=TAMANO_LOTE,
+        )
+        ParticipanteConversacion.objects.bulk_create(
+            [
+                ParticipanteConversacion(
+                    conversacion=c, usuario_id=u, otro_id=o, ultima_actividad=c.ultima_actividad,
+                    no_leidos=resumen[(c.usuario_a_id, c.usuario_b_id)]["no_leidos"].get(u, 0),
+                )
+                for c in nuevas
+                for u, o in {(c.usuario_a_id, c.usuario_b_id), (c.usuario_b_id, c.usuario_a_id)}
+            ],
+            batch_size=TAMANO_LOTE,
+        )
+    return len(nuevas)
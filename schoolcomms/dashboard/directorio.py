@@ -0,0 +1,120 @@
+# dashboard/directorio.py
+"""
+Directorio de contactos con búsqueda por prefijo.
+
+Se construye una vez por proceso una lista ordenada de (término, id) con el
+usuario, nombre, apellidos y rol de cada usuario activo (en minúsculas y sin
+tildes). Buscar un prefijo es un bisect + recorrer solo las coincidencias, así
+que el coste no depende del tamaño del centro. Igual que el calendario, al
+cambiar un usuario se publica una versión nueva en la caché compartida y cada
+proceso reconstruye su índice la próxima vez que lo necesita.
+"""
+import time
+import unicodedata
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+CLAVE_VERSION = "directorio:version"
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes: 'Jose' encuentra a 'José'."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+class Directorio:
+    def __init__(self, usuarios):
+        """`usuarios`: iterable de (id, username, first_name, last_name, role)."""
+        roles = dict(get_user_model().ROLE_CHOICES)
+        self.contactos = {}
+        terminos = set()
+        for pk, username, nombre, apellidos, rol in usuarios:
+            completo = f"{nombre} {apellidos}".strip()
+            rol_texto = roles.get(rol, rol or "")
+            self.contactos[pk] = {
+                "id": pk,
+                "username": username,
+                "nombre": completo or username,
+                "rol": rol_texto,
+            }
+            for texto in (username, completo, rol, rol_texto, *completo.split()):
+                termino = normalizar(texto)
+                if termino:
+                    terminos.add((termino, pk))
+        self.terminos = sorted(terminos)
+        self.claves = [t for t, _ in self.terminos]
+        self.orden = sorted(self.contactos.values(), key=lambda c: (normalizar(c["nombre"]), c["id"]))
+
+    def __len__(self):
+        return len(self.contactos)
+
+    def _prefijo(self, prefijo):
+        ids = set()
+        i = bisect_left(self.claves, prefijo)
+        while i < len(self.claves) and self.claves[i].startswith(prefijo):
+            ids.add(self.terminos[i][1])
+            i += 1
+        return ids
+
+    def buscar(self, consulta, excluir=()):
+        """
+        Contactos cuyo usuario, nombre o rol empiezan por cada palabra de
+        `consulta` ("ana prof" = nombre "Ana…" y rol "Profesor"), ordenados por nombre.
+        """
+        palabras = normalizar(consulta).split()
+        if not palabras:
+            return [c for c in self.orden if c["id"] not in excluir]
+        ids = set.intersection(*(self._prefijo(p) for p in palabras))
+        ids.difference_update(excluir)
+        return sorted((self.contactos[pk] for pk in ids), key=lambda c: (normalizar(c["nombre"]), c["id"]))
+
+
+# ---------------------- CACHÉ POR PROCESO ----------------------
+
+_directorio = None
+_version = None
+_comprobado = 0.0
+
+
+def _comprobar_version():
+    global _directorio, _version, _comprobado
+    ahora = time.monotonic()
+    if ahora - _comprobado < settings.DIRECTORIO_INTERVALO_VERSION:
+        return
+    _comprobado = ahora
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, uuid.uuid4().hex, timeout=None)
+        version = cache.get(CLAVE_VERSION)
+    if version != _version:
+        _directorio = None
+        _version = version
+
+
+def obtener_directorio():
+    """Índice de contactos del proceso (se reconstruye si otro proceso lo invalidó)."""
+    global _directorio
+    _comprobar_version()
+    if _directorio is None:
+        _directorio = Directorio(
+            get_user_model().objects.filter(is_active=True)
+            .values_list("id", "username", "first_name", "last_name", "role")
+        )
+    return _directorio
+
+
+def invalidar_directorio():
+    """Descarta el índice de contactos en todos los procesos."""
+    def _invalidar():
+        global _directorio, _comprobado
+        _directorio = None
+        _comprobado = 0.0
+        cache.set(CLAVE_VERSION, uuid.uuid4().hex, timeout=None)
+
+    transaction.on_commit(_invalidar)
@@ -0,0 +1,95 @@
+# dashboard/estadisticas.py
+from dataclasses import asdict, dataclass
+from datetime import date
+
+from django.db.models import Count, Q
+
+from .calendario import obtener_calendario
+from .contadores import obtener_contadores
+from .models import Aviso, Incidencia, MensajeArchivado, PrivateMessage, Tarea
+
+DIAS_SEMANA_ES = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+
+@dataclass(frozen=True)
+class ResumenDashboard:
+    """
+    Contadores del dashboard de un usuario. Inmutable para poder cachearlo
+    y reutilizarlo tanto en la vista HTML como en los endpoints JSON.
+    """
+    total_tareas: int = 0
+    tareas_completadas: int = 0
+    total_avisos: int = 0
+    total_mensajes: int = 0
+    mensajes_no_leidos: int = 0
+    total_incidencias: int = 0
+    notificaciones_no_leidas: int = 0
+
+    @property
+    def progreso_academico(self) -> int:
+        if not self.total_tareas:
+            return 0
+        return int((self.tareas_completadas / self.total_tareas) * 100)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["progreso_academico"] = self.progreso_academico
+        return data
+
+
+def obtener_resumen(user) -> ResumenDashboard:
+    """
+    Calcula todos los contadores del usuario con una única consulta de
+    agregación condicional por tabla (5 consultas, una de ellas al archivo de
+    mensajes; las notificaciones sin leer salen del contador en caché).
+    """
+    tareas = Tarea.objects.filter(autor=user).aggregate(
+        total=Count("id"),
+        completadas=Count("id", filter=Q(completada=True)),
+    )
+    avisos = Aviso.objects.filter(autor=user).aggregate(total=Count("id"))
+    mensajes = PrivateMessage.objects.filter(receiver=user).aggregate(
+        total=Count("id"),
+        no_leidos=Count("id", filter=Q(is_read=False)),
+    )
+    # Lo archivado está leído: solo suma al total
+    archivados = MensajeArchivado.objects.filter(receiver=user).count()
+    incidencias = Incidencia.objects.filter(autor=user).aggregate(total=Count("id"))
+    # Contador cacheado que mantienen los caminos de escritura (contadores.py)
+    notificaciones = obtener_contadores(user.pk)["notificaciones"]
+
+    return ResumenDashboard(
+        total_tareas=tareas["total"],
+        tareas_completadas=tareas["completadas"],
+        total_avisos=avisos["total"],
+        total_mensajes=mensajes["total"] + archivados,
+        mensajes_no_leidos=mensajes["no_leidos"],
+        total_incidencias=incidencias["total"],
+        notificaciones_no_leidas=notificaciones,
+    )
+
+
+def completadas_por_dia(user, dias):
+    """
+    Tareas completadas por `user` en cada fecha de `dias`, con una sola consulta
+    GROUP BY fecha_completado. Los días sin tareas se rellenan con 0.
+    """
+    conteo = dict(
+        Tarea.objects.filter(autor=user, completada=True, fecha_completado__in=dias)
+        .values_list("fecha_completado")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    return [conteo.get(dia, 0) for dia in dias]
+
+
+def serie_completadas(user, n=7, hasta: date = None):
+    """Serie de tareas completadas en los últimos `n` días lectivos hasta `hasta`."""
+    if hasta is None:
+        hasta = date.today()
+    dias = obtener_calendario(hasta).ultimos_lectivos(n, hasta)
+    return {
+        "fechas": [d.isoformat() for d in dias],
+        "labels": [f"{DIAS_SEMANA_ES[d.weekday()]} {d.strftime('%d/%m')}" for d in dias],
+        "values": completadas_por_dia(user, dias),
+    }
@@ -1,13 +1,121 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.validators import FileExtensionValidator
+from django.urls import reverse
 
+from announcements.models import ClassGroup
+from core.models import Classroom, Group, School
+
+from .adjuntos import validar_tamano
+from .audiencias import asignar_audiencias
 from .models import Aviso, Tarea, Incidencia, PrivateMessage
+from .operaciones import ACCIONES, MAX_IDS
 
 User = get_user_model()
 
 
+# ---------------------- SELECTOR DE CONTACTOS ----------------------
+class SelectorContactos(forms.Select):
+    """
+    Select de usuarios que solo pinta las opciones elegidas: el resto se
+    busca en /dashboard/api/directorio/ según se escribe. El campo mantiene
+    su queryset completo para validar, pero la página no crece con el centro.
+    """
+    template_name = "dashboard/widgets/selector_contactos.html"
+
+    def _elegidos(self, value):
+        ids = [v for v in value if str(v).isdigit()]
+        opciones = [] if self.allow_multiple_selected else [("", "---------")]
+        for u in User.objects.filter(pk__in=ids).order_by("first_name", "last_name", "username"):
+            opciones.append((u.pk, u.get_full_name() or u.username))
+        return opciones
+
+    def optgroups(self, name, value, attrs=None):
+        todas = self.choices
+        self.choices = self._elegidos(value)
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = todas
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context["directorio_url"] = reverse("dashboard:directorio")
+        return context
+
+
+class SelectorContactosMultiple(SelectorContactos, forms.SelectMultiple):
+    pass
+
+
+# ---------------------- ADJUNTOS ----------------------
+class AdjuntosInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class AdjuntosField(forms.FileField):
+    """Varios ficheros en un solo input; cleaned_data es siempre una lista."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", AdjuntosInput(attrs={"class": "form-control"}))
+        kwargs.setdefault("required", False)
+        kwargs.setdefault("label", "Adjuntos")
+        kwargs.setdefault("validators", [
+            FileExtensionValidator(settings.ADJUNTOS_EXTENSIONES), validar_tamano,
+        ])
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        if not data:
+            return []
+        if not isinstance(data, (list, tuple)):
+            data = [data]
+        return [super(AdjuntosField, self).clean(d, initial) for d in data]
+
+
+class ConAdjuntosMixin:
+    """
+    Formularios con campo `adjuntos`. `rechazados` son los ficheros que el
+    upload handler ya descartó por tamaño (ver adjuntos.rechazados).
+    """
+
+    def __init__(self, *args, rechazados=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rechazados = list(rechazados)
+
+    def clean_adjuntos(self):
+        if self.rechazados:
+            raise forms.ValidationError(
+                "Superan el tamaño máximo: %s." % ", ".join(self.rechazados)
+            )
+        archivos = self.cleaned_data.get("adjuntos") or []
+        if len(archivos) > settings.ADJUNTOS_POR_ENVIO:
+            raise forms.ValidationError(f"Como mucho {settings.ADJUNTOS_POR_ENVIO} adjuntos por envío.")
+        return archivos
+
+
 # ---------------------- FORMULARIO DE AVISOS ----------------------
-class AvisoForm(forms.ModelForm):
+class AudienciaField(forms.ModelMultipleChoiceField):
+    def label_from_instance(self, obj):
+        return getattr(obj, "name", str(obj))
+
+
+class AvisoForm(ConAdjuntosMixin, forms.ModelForm):
+    # Audiencias: cada una se guarda como una fila en AudienciaAviso, no una por usuario
+    grupos = AudienciaField(queryset=Group.objects.order_by("name"), required=False, label="Grupos",
+                            widget=forms.SelectMultiple(attrs={'class': 'form-select'}))
+    aulas = AudienciaField(queryset=Classroom.objects.order_by("name"), required=False, label="Aulas",
+                           widget=forms.SelectMultiple(attrs={'class': 'form-select'}))
+    centros = AudienciaField(queryset=School.objects.order_by("name"), required=False, label="Centros",
+                             widget=forms.SelectMultiple(attrs={'class': 'form-select'}))
+    clases = AudienciaField(queryset=ClassGroup.objects.order_by("name"), required=False, label="Clases",
+                            widget=forms.SelectMultiple(attrs={'class': 'form-select'}))
+
+    adjuntos = AdjuntosField()
+
+    CAMPOS_AUDIENCIA = {"grupos": "grupo", "aulas": "aula", "centros": "centro", "clases": "clase"}
+
     class Meta:
         model = Aviso
         fields = ['titulo', 'contenido', 'destinatarios']
@@ -21,11 +129,36 @@ class AvisoForm(forms.ModelForm):
                 'rows': 5,
                 'placeholder': 'Contenido del aviso'
             }),
-            'destinatarios': forms.SelectMultiple(attrs={
+            'destinatarios': SelectorContactosMultiple(attrs={
                 'class': 'form-select'
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['destinatarios'].required = False
+        if self.instance.pk:
+            actuales = self.instance.audiencias.values_list("tipo", "objeto_id")
+            for campo, tipo in self.CAMPOS_AUDIENCIA.items():
+                self.initial[campo] = [oid for t, oid in actuales if t == tipo]
+
+    def clean(self):
+        cleaned = super().clean()
+        if not cleaned.get('destinatarios') and not any(cleaned.get(c) for c in self.CAMPOS_AUDIENCIA):
+            raise forms.ValidationError("Elige al menos un destinatario, grupo, aula, centro o clase.")
+        return cleaned
+
+    def audiencias(self):
+        return [
+            (tipo, obj.pk)
+            for campo, tipo in self.CAMPOS_AUDIENCIA.items()
+            for obj in self.cleaned_data.get(campo) or []
+        ]
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        asignar_audiencias(self.instance, self.audiencias())
+
 
 # ---------------------- FORMULARIO DE TAREAS ----------------------
 class TareaForm(forms.ModelForm):
@@ -69,12 +202,13 @@ class EstadoIncidenciaForm(forms.ModelForm):
 
 
 # ---------------------- FORMULARIO DE MENSAJE PRIVADO ----------------------
-class PrivateMessageForm(forms.ModelForm):
+class PrivateMessageForm(ConAdjuntosMixin, forms.ModelForm):
     receiver = forms.ModelChoiceField(
         queryset=User.objects.all(),
         label="Destinatario",
-        widget=forms.Select(attrs={"class": "form-select"})
+        widget=SelectorContactos(attrs={"class": "form-select"})
     )
+    adjuntos = AdjuntosField()
 
     class Meta:
         model = PrivateMessage
@@ -83,3 +217,42 @@ class PrivateMessageForm(forms.ModelForm):
             "subject": forms.TextInput(attrs={"class": "form-control", "placeholder": "Asunto"}),
             "content": forms.Textarea(attrs={"class": "form-control", "placeholder": "Escribe tu mensaje..."}),
         }
+
+
+# ---------------------- OPERACIONES MASIVAS SOBRE MENSAJES ----------------------
+class ListaIdsField(forms.Field):
+    """Lista de ids enteros: valores repetidos del formulario (ids=1&ids=2) o una lista JSON."""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        try:
+            return sorted({int(v) for v in value})
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Los ids deben ser números enteros.")
+
+
+class OperacionMensajesForm(forms.Form):
+    """
+    Qué hacer y con qué mensajes recibidos: `ids` o un filtro (remitente,
+    anteriores a una fecha). Se combinan con AND; al menos uno es obligatorio.
+    """
+    accion = forms.ChoiceField(choices=list(ACCIONES.items()))
+    ids = ListaIdsField(required=False)
+    remitente = forms.IntegerField(required=False, min_value=1)
+    antes = forms.DateTimeField(required=False)
+
+    def clean_ids(self):
+        ids = self.cleaned_data["ids"]
+        if len(ids) > MAX_IDS:
+            raise forms.ValidationError(f"Como mucho {MAX_IDS} mensajes por operación; usa un filtro.")
+        return ids or None
+
+    def clean(self):
+        datos = super().clean()
+        if not any(datos.get(c) for c in ("ids", "remitente", "antes")):
+            raise forms.ValidationError("Indica los mensajes (ids) o un filtro (remitente, antes).")
+        return datos
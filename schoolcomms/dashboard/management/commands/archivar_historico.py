@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.archivo import archivar, fecha_corte, mensajes_archivables, notificaciones_archivables
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve a las tablas de archivo los mensajes privados y notificaciones leídos "
+        "anteriores al corte (ARCHIVO_ANTIGUEDAD_DIAS o el último curso cerrado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="Antigüedad mínima en días (por defecto, ARCHIVO_ANTIGUEDAD_DIAS).")
+        parser.add_argument("--cursos-cerrados", action="store_true", help="Archiva todo lo anterior al fin del último curso cerrado.")
+        parser.add_argument("--simular", action="store_true", help="Solo cuenta lo que se archivaría.")
+
+    def handle(self, *args, **options):
+        corte = fecha_corte(options["dias"], options["cursos_cerrados"])
+        if corte is None:
+            self.stdout.write("No hay ningún curso escolar cerrado: nada que archivar.")
+            return
+        if options["simular"]:
+            self.stdout.write(
+                f"Anterior a {corte:%d/%m/%Y %H:%M}: {mensajes_archivables(corte).count()} mensajes y "
+                f"{notificaciones_archivables(corte).count()} notificaciones."
+            )
+            return
+        mensajes, notificaciones = archivar(corte)
+        self.stdout.write(self.style.SUCCESS(
+            f"Archivados {mensajes} mensajes y {notificaciones} notificaciones anteriores a {corte:%d/%m/%Y %H:%M}."
+        ))
@@ -0,0 +1,67 @@
+from datetime import date, timedelta
+from timeit import timeit
+
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.calendario import SchoolCalendar, obtener_calendario
+
+
+def _es_dia_lectivo_antiguo(cal, fecha):
+    # Implementación previa: comprobación día a día contra los conjuntos
+    if fecha < cal.inicio or fecha > cal.fin:
+        return False
+    if fecha.weekday() >= 5:
+        return False
+    return fecha not in cal.festivos and fecha not in cal.vacaciones
+
+
+def _consultas_antiguas(cal, hoy):
+    contados = sum(
+        1 for i in range((hoy - cal.inicio).days + 1)
+        if _es_dia_lectivo_antiguo(cal, cal.inicio + timedelta(days=i))
+    )
+    ultimos, i = [], 0
+    while len(ultimos) < 7 and i <= 365 * 5:
+        dia = hoy - timedelta(days=i)
+        if _es_dia_lectivo_antiguo(cal, dia):
+            ultimos.append(dia)
+        i += 1
+    ultimos.reverse()
+    return contados, ultimos
+
+
+def _consultas_compiladas(cal, hoy):
+    return cal.contar_lectivos(cal.inicio, hoy), cal.ultimos_lectivos(7, hoy)
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark: bucle día a día vs. SchoolCalendar compilado (bisect)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticiones", type=int, default=2000)
+        parser.add_argument("--fecha", type=date.fromisoformat, default=None,
+                            help="Fecha de referencia (por defecto, el último día del curso actual)")
+
+    def handle(self, *args, **options):
+        n = options["repeticiones"]
+        cal = obtener_calendario(options["fecha"])
+        hoy = options["fecha"] or cal.fin
+
+        antiguo = _consultas_antiguas(cal, hoy)
+        nuevo = _consultas_compiladas(cal, hoy)
+        if antiguo != nuevo:
+            self.stderr.write(self.style.ERROR(f"Resultados distintos: {antiguo} != {nuevo}"))
+            return
+
+        t_compilar = timeit(
+            lambda: SchoolCalendar(cal.inicio, cal.fin, cal.festivos, cal.vacaciones),
+            number=10,
+        ) / 10
+        t_antiguo = timeit(lambda: _consultas_antiguas(cal, hoy), number=n) / n
+        t_nuevo = timeit(lambda: _consultas_compiladas(cal, hoy), number=n) / n
+
+        self.stdout.write(f"Curso {cal.nombre or '-'}, fecha de referencia {hoy} ({nuevo[0]} días lectivos)")
+        self.stdout.write(f"Compilar el curso (una vez): {t_compilar * 1e6:10.1f} µs")
+        self.stdout.write(f"Bucle día a día:             {t_antiguo * 1e6:10.1f} µs/consulta")
+        self.stdout.write(f"SchoolCalendar (bisect):     {t_nuevo * 1e6:10.1f} µs/consulta")
+        self.stdout.write(self.style.SUCCESS(f"Aceleración: x{t_antiguo / t_nuevo:.0f}"))
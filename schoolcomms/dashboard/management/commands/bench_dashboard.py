@@ -0,0 +1,93 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+from threading import local
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from schoolcomms.dashboard.cache import invalidar_dashboard
+
+
+def _percentiles(tiempos):
+    cortes = quantiles(tiempos, n=100, method="inclusive")
+    return cortes[49] * 1000, cortes[98] * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark bajo carga concurrente: dashboard completo síncrono (WSGI, "
+        "tarjetas en serie) vs. asíncrono (ASGI, tarjetas en paralelo). Muestra p50/p99."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usuario", help="Username (por defecto, el primero)")
+        parser.add_argument("--peticiones", type=int, default=200)
+        parser.add_argument("--concurrencia", type=int, default=16)
+        parser.add_argument("--caliente", action="store_true",
+                            help="No invalidar el snapshot entre peticiones (mide la caché, no las consultas)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        qs = User.objects.filter(username=options["usuario"]) if options["usuario"] else User.objects.order_by("pk")
+        self.user = qs.first()
+        if self.user is None:
+            raise CommandError("No hay usuario con el que medir.")
+        self.n = options["peticiones"]
+        self.concurrencia = options["concurrencia"]
+        self.frio = not options["caliente"]
+
+        # Los clientes de pruebas de Django llaman al servidor "testserver"
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            resultados = [
+                ("Síncrono (WSGI, en serie)", self._medir_sync()),
+                ("Asíncrono (ASGI, en paralelo)", asyncio.run(self._medir_async())),
+            ]
+        modo = "frío" if self.frio else "caliente"
+        self.stdout.write(f"{self.n} peticiones, concurrencia {self.concurrencia}, snapshot {modo}, usuario {self.user}")
+        for nombre, tiempos in resultados:
+            p50, p99 = _percentiles(tiempos)
+            self.stdout.write(f"{nombre:32} p50 {p50:8.1f} ms   p99 {p99:8.1f} ms")
+
+    def _medir_sync(self):
+        hilo = local()
+
+        def peticion(_):
+            if not hasattr(hilo, "client"):
+                hilo.client = Client()
+                hilo.client.force_login(self.user)
+            if self.frio:
+                invalidar_dashboard(self.user.pk)
+            inicio = time.perf_counter()
+            respuesta = hilo.client.get("/dashboard/?completo=1")
+            fin = time.perf_counter()
+            if respuesta.status_code != 200:
+                raise CommandError(f"Vista síncrona: HTTP {respuesta.status_code}")
+            return fin - inicio
+
+        with ThreadPoolExecutor(max_workers=self.concurrencia) as pool:
+            return list(pool.map(peticion, range(self.n)))
+
+    async def _medir_async(self):
+        pendientes = iter(range(self.n))
+        tiempos = []
+
+        async def trabajador():
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            for _ in pendientes:
+                if self.frio:
+                    await sync_to_async(invalidar_dashboard)(self.user.pk)
+                inicio = time.perf_counter()
+                respuesta = await client.get("/dashboard/async/")
+                tiempos.append(time.perf_counter() - inicio)
+                if respuesta.status_code != 200:
+                    raise CommandError(f"Vista asíncrona: HTTP {respuesta.status_code}")
+
+        await asyncio.gather(*(trabajador() for _ in range(self.concurrencia)))
+        return tiempos
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.asistencia import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los resúmenes de asistencia (alumno, grupo y diario por grupo)."
+
+    def handle(self, *args, **options):
+        alumnos, grupos, diarios = reconstruir_resumenes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Resúmenes reconstruidos: {alumnos} de alumno, {grupos} de grupo, {diarios} diarios de grupo."
+        ))
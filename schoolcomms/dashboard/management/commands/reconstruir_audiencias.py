@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.audiencias import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero el índice de pertenencia a grupos, aulas, centros y clases (avisos por audiencia)."
+
+    def handle(self, *args, **options):
+        filas = reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS(f"Índice de audiencias reconstruido: {filas} pertenencias."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = "Rehace desde los mensajes (también los archivados) el índice de búsqueda de texto completo."
+
+    def handle(self, *args, **options):
+        reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS("Índice de búsqueda de mensajes reconstruido."))
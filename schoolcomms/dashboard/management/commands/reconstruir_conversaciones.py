@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from schoolcomms.dashboard.conversaciones import recalcular_conversaciones
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde los mensajes privados las conversaciones (último mensaje y no leídos)."
+
+    def handle(self, *args, **options):
+        total = recalcular_conversaciones()
+        self.stdout.write(self.style.SUCCESS(f"Conversaciones reconstruidas: {total}."))
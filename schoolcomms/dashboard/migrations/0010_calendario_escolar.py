@@ -0,0 +1,61 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_customuser_role'),
+        ('dashboard', '0009_notification_mensaje'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CursoEscolar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=20, unique=True)),
+                ('inicio', models.DateField()),
+                ('fin', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'Curso escolar',
+                'verbose_name_plural': 'Cursos escolares',
+                'ordering': ['-inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PeriodoNoLectivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('festivo', 'Festivo oficial'), ('vacaciones', 'Vacaciones escolares')], default='festivo', max_length=20)),
+                ('descripcion', models.CharField(blank=True, max_length=150)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField()),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='periodos_no_lectivos', to='dashboard.cursoescolar')),
+                ('school', models.ForeignKey(blank=True, help_text='Vacío = se aplica a todos los centros', null=True, on_delete=django.db.models.deletion.CASCADE, to='core.school')),
+            ],
+            options={
+                'verbose_name': 'Periodo no lectivo',
+                'verbose_name_plural': 'Periodos no lectivos',
+                'ordering': ['fecha_inicio'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CalendarioCentro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateField(blank=True, null=True)),
+                ('fin', models.DateField(blank=True, null=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.school')),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendarios_centro', to='dashboard.cursoescolar')),
+            ],
+            options={
+                'verbose_name': 'Calendario de centro',
+                'verbose_name_plural': 'Calendarios de centro',
+                'unique_together': {('curso', 'school')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.db import migrations
+
+# Calendario que antes estaba fijado en dashboard/views.py
+PERIODOS = [
+    ("festivo", "Día de la Comunitat Valenciana", date(2025, 10, 9), date(2025, 10, 9)),
+    ("festivo", "Fiesta Nacional", date(2025, 10, 12), date(2025, 10, 12)),
+    ("festivo", "Todos los Santos", date(2025, 11, 1), date(2025, 11, 1)),
+    ("festivo", "Día de la Constitución", date(2025, 12, 6), date(2025, 12, 6)),
+    ("festivo", "Inmaculada Concepción", date(2025, 12, 8), date(2025, 12, 8)),
+    ("festivo", "San José", date(2026, 3, 19), date(2026, 3, 19)),
+    ("festivo", "Día del Trabajo", date(2026, 5, 1), date(2026, 5, 1)),
+    ("vacaciones", "Navidad", date(2025, 12, 20), date(2026, 1, 7)),
+    ("vacaciones", "Semana Santa", date(2026, 3, 28), date(2026, 4, 5)),
+]
+
+
+def cargar_curso(apps, schema_editor):
+    CursoEscolar = apps.get_model("dashboard", "CursoEscolar")
+    PeriodoNoLectivo = apps.get_model("dashboard", "PeriodoNoLectivo")
+    curso, creado = CursoEscolar.objects.get_or_create(
+        nombre="2025-2026",
+        defaults={"inicio": date(2025, 9, 8), "fin": date(2026, 6, 19)},
+    )
+    if creado:
+        PeriodoNoLectivo.objects.bulk_create([
+            PeriodoNoLectivo(curso=curso, tipo=tipo, descripcion=descripcion, fecha_inicio=inicio, fecha_fin=fin)
+            for tipo, descripcion, inicio, fin in PERIODOS
+        ])
+
+
+def borrar_curso(apps, schema_editor):
+    CursoEscolar = apps.get_model("dashboard", "CursoEscolar")
+    CursoEscolar.objects.filter(nombre="2025-2026").delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_calendario_escolar'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_curso, borrar_curso),
+    ]
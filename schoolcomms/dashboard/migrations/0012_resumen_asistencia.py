@@ -0,0 +1,107 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_group_students'),
+        ('dashboard', '0011_cargar_curso_2025_2026'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AsistenciaDiariaGrupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('ausentes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Asistencia diaria (grupo)',
+                'verbose_name_plural': 'Asistencia diaria (grupo)',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenAsistenciaAlumno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trimestre', models.PositiveSmallIntegerField()),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('ausentes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de asistencia (alumno)',
+                'verbose_name_plural': 'Resúmenes de asistencia (alumno)',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenAsistenciaGrupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trimestre', models.PositiveSmallIntegerField()),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('ausentes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Resumen de asistencia (grupo)',
+                'verbose_name_plural': 'Resúmenes de asistencia (grupo)',
+            },
+        ),
+        migrations.AddField(
+            model_name='cursoescolar',
+            name='fin_primer_trimestre',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='cursoescolar',
+            name='fin_segundo_trimestre',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='asistencia',
+            index=models.Index(fields=['alumno', 'fecha'], name='dashboard_a_alumno__eb5469_idx'),
+        ),
+        migrations.AddField(
+            model_name='asistenciadiariagrupo',
+            name='grupo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asistencia_diaria', to='core.group'),
+        ),
+        migrations.AddField(
+            model_name='resumenasistenciaalumno',
+            name='alumno',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_asistencia', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='resumenasistenciaalumno',
+            name='curso',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.cursoescolar'),
+        ),
+        migrations.AddField(
+            model_name='resumenasistenciagrupo',
+            name='curso',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='dashboard.cursoescolar'),
+        ),
+        migrations.AddField(
+            model_name='resumenasistenciagrupo',
+            name='grupo',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_asistencia', to='core.group'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='asistenciadiariagrupo',
+            unique_together={('grupo', 'fecha')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='resumenasistenciaalumno',
+            unique_together={('alumno', 'curso', 'trimestre')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='resumenasistenciagrupo',
+            unique_together={('grupo', 'curso', 'trimestre')},
+        ),
+    ]
@@ -0,0 +1,22 @@
+from datetime import date
+
+from django.db import migrations
+
+
+def cargar_trimestres(apps, schema_editor):
+    CursoEscolar = apps.get_model("dashboard", "CursoEscolar")
+    CursoEscolar.objects.filter(nombre="2025-2026", fin_primer_trimestre__isnull=True).update(
+        fin_primer_trimestre=date(2025, 12, 19),
+        fin_segundo_trimestre=date(2026, 3, 27),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_resumen_asistencia'),
+    ]
+
+    operations = [
+        migrations.RunPython(cargar_trimestres, migrations.RunPython.noop),
+    ]
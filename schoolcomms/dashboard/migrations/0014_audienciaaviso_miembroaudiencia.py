@@ -0,0 +1,46 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_trimestres_curso_2025_2026'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AudienciaAviso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('grupo', 'Grupo'), ('aula', 'Aula'), ('centro', 'Centro'), ('clase', 'Clase')], max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('aviso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audiencias', to='dashboard.aviso')),
+            ],
+            options={
+                'verbose_name': 'Audiencia de aviso',
+                'verbose_name_plural': 'Audiencias de avisos',
+                'indexes': [models.Index(fields=['tipo', 'objeto_id'], name='dashboard_a_tipo_2c6f11_idx')],
+                'unique_together': {('aviso', 'tipo', 'objeto_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MiembroAudiencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('grupo', 'Grupo'), ('aula', 'Aula'), ('centro', 'Centro'), ('clase', 'Clase')], max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audiencias', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Miembro de audiencia',
+                'verbose_name_plural': 'Miembros de audiencias',
+                'indexes': [models.Index(fields=['tipo', 'objeto_id'], name='dashboard_m_tipo_9aaa3d_idx')],
+                'unique_together': {('user', 'tipo', 'objeto_id')},
+            },
+        ),
+    ]
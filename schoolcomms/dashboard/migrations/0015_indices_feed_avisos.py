@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0014_audienciaaviso_miembroaudiencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='aviso',
+            index=models.Index(fields=['fecha_publicacion', 'id'], name='dashboard_a_fecha_p_ca474f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='aviso',
+            index=models.Index(fields=['autor', 'fecha_publicacion', 'id'], name='dashboard_a_autor_i_974ed8_idx'),
+        ),
+    ]
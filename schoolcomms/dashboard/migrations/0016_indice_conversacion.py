@@ -0,0 +1,19 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0015_indices_feed_avisos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='privatemessage',
+            index=models.Index(fields=['sender', 'receiver', 'created_at'], name='dashboard_p_sender__6ea8d6_idx'),
+        ),
+    ]
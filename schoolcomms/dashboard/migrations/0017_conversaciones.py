@@ -0,0 +1,49 @@
+# Generated by Django 5.0.6 on 2026-10-18 17:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0016_indice_conversacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultima_actividad', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultimo_mensaje', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='dashboard.privatemessage')),
+                ('usuario_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('usuario_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Conversación',
+                'verbose_name_plural': 'Conversaciones',
+                'unique_together': {('usuario_a', 'usuario_b')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ParticipanteConversacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('no_leidos', models.PositiveIntegerField(default=0)),
+                ('ultima_actividad', models.DateTimeField(default=django.utils.timezone.now)),
+                ('conversacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participantes', to='dashboard.conversacion')),
+                ('otro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='conversaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Participante de conversación',
+                'verbose_name_plural': 'Participantes de conversaciones',
+                'indexes': [models.Index(fields=['usuario', '-ultima_actividad'], name='dashboard_p_usuario_bf5cf4_idx')],
+                'unique_together': {('conversacion', 'usuario')},
+            },
+        ),
+    ]
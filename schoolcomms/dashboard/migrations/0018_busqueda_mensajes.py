@@ -0,0 +1,26 @@
+# Índice de texto completo de los mensajes privados (ver dashboard/busqueda.py)
+
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from schoolcomms.dashboard.busqueda import asegurar_indice
+
+    asegurar_indice(schema_editor.connection)
+
+
+def eliminar_indice(apps, schema_editor):
+    from schoolcomms.dashboard.busqueda import eliminar_indice
+
+    eliminar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_conversaciones'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0018_busqueda_mensajes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='privatemessage',
+            name='archivado',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:07
+
+import django.db.models.deletion
+import schoolcomms.dashboard.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_privatemessage_archivado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Adjunto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(max_length=255, storage=schoolcomms.dashboard.models.almacen_adjuntos, upload_to=schoolcomms.dashboard.models.ruta_adjunto)),
+                ('nombre', models.CharField(max_length=255)),
+                ('tipo', models.CharField(default='application/octet-stream', max_length=100)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('aviso', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='adjuntos', to='dashboard.aviso')),
+                ('mensaje', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='adjuntos', to='dashboard.privatemessage')),
+                ('subido_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='adjunto',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('aviso__isnull', True), ('mensaje__isnull', False)), models.Q(('aviso__isnull', False), ('mensaje__isnull', True)), _connector='OR'), name='adjunto_de_mensaje_o_aviso'),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Índice de búsqueda del archivo (ver dashboard/busqueda.py), con el SQL fijo en la migración
+TABLA = "dashboard_mensajearchivado"
+
+
+def _sqlite(tabla):
+    fts = f"{tabla}_fts"
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            subject, content, content='{tabla}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {fts}(rowid, subject, content) VALUES (new.id, new.subject, new.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, content)
+            VALUES ('delete', old.id, old.subject, old.content);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF subject, content ON {tabla} BEGIN
+            INSERT INTO {fts}({fts}, rowid, subject, content)
+            VALUES ('delete', old.id, old.subject, old.content);
+            INSERT INTO {fts}(rowid, subject, content) VALUES (new.id, new.subject, new.content);
+        END""",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _postgres(tabla):
+    return [
+        f"""ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS busqueda tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('spanish', coalesce(subject, '')), 'A') ||
+            setweight(to_tsvector('spanish', coalesce(content, '')), 'B')
+        ) STORED""",
+        f"CREATE INDEX IF NOT EXISTS {tabla}_busqueda_gin ON {tabla} USING gin (busqueda)",
+    ]
+
+
+def crear_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    sentencias = _sqlite(TABLA) if vendor == "sqlite" else _postgres(TABLA) if vendor == "postgresql" else []
+    for sql in sentencias:
+        schema_editor.execute(sql)
+
+
+def eliminar_indice(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        for sufijo in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {TABLA}_fts_{sufijo}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {TABLA}_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TABLA}_busqueda_gin")
+        schema_editor.execute(f"ALTER TABLE {TABLA} DROP COLUMN IF EXISTS busqueda")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0020_adjuntos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MensajeArchivado',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('subject', models.CharField(max_length=200)),
+                ('content', models.TextField()),
+                ('created_at', models.DateTimeField()),
+                ('is_read', models.BooleanField(default=True)),
+                ('archivado', models.BooleanField(default=False)),
+                ('archivado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('receiver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('sender', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Mensaje archivado',
+                'verbose_name_plural': 'Mensajes archivados',
+                'indexes': [models.Index(fields=['sender', 'receiver', 'created_at'], name='dashboard_m_sender__23e87e_idx'), models.Index(fields=['receiver', 'created_at'], name='dashboard_m_receive_ce922d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificacionArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('info', 'Información'), ('warning', 'Advertencia'), ('error', 'Error'), ('success', 'Éxito')], default='info', max_length=20)),
+                ('titulo', models.CharField(default='Notificación', max_length=200)),
+                ('contenido', models.TextField(default='')),
+                ('url', models.URLField(blank=True, null=True)),
+                ('creado', models.DateTimeField()),
+                ('leida', models.BooleanField(default=True)),
+                ('mensaje_id', models.BigIntegerField(blank=True, null=True)),
+                ('archivado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notificación archivada',
+                'verbose_name_plural': 'Notificaciones archivadas',
+                'indexes': [models.Index(fields=['user', '-creado'], name='dashboard_n_user_id_eae2c2_idx')],
+            },
+        ),
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.6 on 2026-10-18 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0022_notificacion_clave'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Las que ya existen se dan por entregadas: no se reenvía el histórico
+        migrations.AddField(
+            model_name='notification',
+            name='envio_pendiente',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='envio_pendiente',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('envio_pendiente', True)), fields=['id'], name='notificacion_envio_pendiente'),
+        ),
+    ]
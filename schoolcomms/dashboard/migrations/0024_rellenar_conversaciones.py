@@ -0,0 +1,65 @@
+from django.db import migrations
+from django.db.models import Count, Max, Q
+
+LOTE = 500
+
+
+def _par(x, y):
+    return (x, y) if x <= y else (y, x)
+
+
+def rellenar_conversaciones(apps, schema_editor):
+    """
+    Crea las conversaciones de los mensajes que ya existían antes de 0017 (se
+    crearon vacías y solo se llenaban con los mensajes nuevos). Rehace todas
+    desde PrivateMessage, igual que recalcular_conversaciones().
+    """
+    PrivateMessage = apps.get_model("dashboard", "PrivateMessage")
+    Conversacion = apps.get_model("dashboard", "Conversacion")
+    ParticipanteConversacion = apps.get_model("dashboard", "ParticipanteConversacion")
+
+    resumen = {}
+    filas = (
+        PrivateMessage.objects.order_by().values_list("sender_id", "receiver_id")
+        .annotate(ultimo=Max("id"), no_leidos=Count("id", filter=Q(is_read=False)))
+    )
+    for sender_id, receiver_id, ultimo, no_leidos in filas:
+        datos = resumen.setdefault(_par(sender_id, receiver_id), {"ultimo": 0, "no_leidos": {}})
+        datos["ultimo"] = max(datos["ultimo"], ultimo)
+        datos["no_leidos"][receiver_id] = datos["no_leidos"].get(receiver_id, 0) + no_leidos
+    ultimos = [d["ultimo"] for d in resumen.values()]
+    fechas = {}
+    for i in range(0, len(ultimos), LOTE):
+        fechas.update(PrivateMessage.objects.filter(pk__in=ultimos[i:i + LOTE]).values_list("id", "created_at"))
+
+    ParticipanteConversacion.objects.all().delete()
+    Conversacion.objects.all().delete()
+    nuevas = Conversacion.objects.bulk_create(
+        [
+            Conversacion(usuario_a_id=a, usuario_b_id=b, ultimo_mensaje_id=d["ultimo"], ultima_actividad=fechas[d["ultimo"]])
+            for (a, b), d in resumen.items()
+        ],
+        batch_size=LOTE,
+    )
+    ParticipanteConversacion.objects.bulk_create(
+        [
+            ParticipanteConversacion(
+                conversacion=c, usuario_id=u, otro_id=o, ultima_actividad=c.ultima_actividad,
+                no_leidos=resumen[(c.usuario_a_id, c.usuario_b_id)]["no_leidos"].get(u, 0),
+            )
+            for c in nuevas
+            for u, o in {(c.usuario_a_id, c.usuario_b_id), (c.usuario_b_id, c.usuario_a_id)}
+        ],
+        batch_size=LOTE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("dashboard", "0023_notificacion_envio_pendiente"),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_conversaciones, migrations.RunPython.noop),
+    ]
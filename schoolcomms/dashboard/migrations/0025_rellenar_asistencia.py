@@ -0,0 +1,107 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+LOTE = 1000
+
+
+def _dias(desde, hasta):
+    return (desde + timedelta(days=i) for i in range((hasta - desde).days + 1))
+
+
+def _cursos(apps):
+    """
+    [(inicio, curso_id, lectivos, fines_trimestre)] ordenado por inicio: el
+    calendario general (sin ajustes de centro), como dashboard/calendario.py.
+    """
+    CursoEscolar = apps.get_model("dashboard", "CursoEscolar")
+    PeriodoNoLectivo = apps.get_model("dashboard", "PeriodoNoLectivo")
+
+    cursos = []
+    for curso in CursoEscolar.objects.order_by("inicio"):
+        no_lectivos = set()
+        periodos = PeriodoNoLectivo.objects.filter(curso=curso, school__isnull=True)
+        for desde, hasta in periodos.values_list("fecha_inicio", "fecha_fin"):
+            no_lectivos.update(_dias(max(desde, curso.inicio), min(hasta, curso.fin)))
+        lectivos = {d for d in _dias(curso.inicio, curso.fin) if d.weekday() < 5 and d not in no_lectivos}
+        fines = sorted(f for f in (curso.fin_primer_trimestre, curso.fin_segundo_trimestre) if f)
+        cursos.append((curso.inicio, curso.pk, lectivos, fines))
+    return cursos
+
+
+def rellenar_asistencia(apps, schema_editor):
+    """
+    Rellena una vez los resúmenes de 0012 con la asistencia que ya existía
+    (se crearon vacíos; desde entonces los mantienen las señales). Mismo
+    cálculo que reconstruir_resumenes(), que queda para cargas masivas.
+    """
+    Asistencia = apps.get_model("dashboard", "Asistencia")
+    Group = apps.get_model("core", "Group")
+    ResumenAsistenciaAlumno = apps.get_model("dashboard", "ResumenAsistenciaAlumno")
+    ResumenAsistenciaGrupo = apps.get_model("dashboard", "ResumenAsistenciaGrupo")
+    AsistenciaDiariaGrupo = apps.get_model("dashboard", "AsistenciaDiariaGrupo")
+
+    cursos = _cursos(apps)
+    if not cursos:
+        return
+    inicios = [c[0] for c in cursos]
+
+    miembros = {}
+    for grupo_id, alumno_id in Group.students.through.objects.values_list("group_id", "customuser_id"):
+        miembros.setdefault(alumno_id, []).append(grupo_id)
+
+    alumnos, grupos, diarios = {}, {}, {}
+
+    def acumular(destino, clave, presentes, ausentes):
+        acumulado = destino.setdefault(clave, [0, 0])
+        acumulado[0] += presentes
+        acumulado[1] += ausentes
+
+    filas = (
+        Asistencia.objects.values_list("alumno_id", "fecha")
+        .annotate(
+            presentes=Count("id", filter=Q(estado="presente")),
+            ausentes=Count("id", filter=Q(estado="ausente")),
+        )
+        .order_by()
+    )
+    for alumno_id, fecha, presentes, ausentes in filas.iterator():
+        # El último curso empezado (o el primero si la fecha es anterior a todos)
+        _, curso_id, lectivos, fines = cursos[max(bisect_right(inicios, fecha) - 1, 0)]
+        if fecha not in lectivos:
+            continue
+        periodo = (curso_id, bisect_left(fines, fecha) + 1)
+        acumular(alumnos, (alumno_id, *periodo), presentes, ausentes)
+        for grupo_id in miembros.get(alumno_id, []):
+            acumular(grupos, (grupo_id, *periodo), presentes, ausentes)
+            acumular(diarios, (grupo_id, fecha), presentes, ausentes)
+
+    ResumenAsistenciaAlumno.objects.all().delete()
+    ResumenAsistenciaGrupo.objects.all().delete()
+    AsistenciaDiariaGrupo.objects.all().delete()
+    ResumenAsistenciaAlumno.objects.bulk_create([
+        ResumenAsistenciaAlumno(alumno_id=a, curso_id=c, trimestre=t, presentes=p, ausentes=au)
+        for (a, c, t), (p, au) in alumnos.items()
+    ], batch_size=LOTE)
+    ResumenAsistenciaGrupo.objects.bulk_create([
+        ResumenAsistenciaGrupo(grupo_id=g, curso_id=c, trimestre=t, presentes=p, ausentes=au)
+        for (g, c, t), (p, au) in grupos.items()
+    ], batch_size=LOTE)
+    AsistenciaDiariaGrupo.objects.bulk_create([
+        AsistenciaDiariaGrupo(grupo_id=g, fecha=f, presentes=p, ausentes=au)
+        for (g, f), (p, au) in diarios.items()
+    ], batch_size=LOTE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_group_students"),
+        ("dashboard", "0024_rellenar_conversaciones"),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_asistencia, migrations.RunPython.noop),
+    ]
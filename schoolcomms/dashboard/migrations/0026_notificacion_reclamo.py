@@ -0,0 +1,23 @@
+# Generated by Django 5.0.6 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_rellenar_asistencia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='envio_no_antes',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='envio_reclamado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,6 +1,9 @@
+import uuid
 from datetime import time
+from pathlib import PurePath
 
 from django.conf import settings
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils import timezone
 
@@ -75,10 +78,62 @@ class Aviso(models.Model):
         related_name='avisos_recibidos'
     )
 
+    class Meta:
+        # Paginación por cursor (fecha_publicacion, id): ver paginacion.py
+        indexes = [
+            models.Index(fields=["fecha_publicacion", "id"]),
+            models.Index(fields=["autor", "fecha_publicacion", "id"]),
+        ]
+
     def __str__(self):
         return f"Aviso: {self.titulo}"
 
 
+# Tipos de audiencia a los que se puede dirigir un aviso (objeto_id = pk del objeto)
+TIPOS_AUDIENCIA = [
+    ("grupo", "Grupo"),
+    ("aula", "Aula"),
+    ("centro", "Centro"),
+    ("clase", "Clase"),
+]
+
+
+class AudienciaAviso(models.Model):
+    """Un grupo, aula, centro o clase al que va dirigido un aviso (en vez de una fila por usuario)."""
+    aviso = models.ForeignKey(Aviso, on_delete=models.CASCADE, related_name="audiencias")
+    tipo = models.CharField(max_length=10, choices=TIPOS_AUDIENCIA)
+    objeto_id = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("aviso", "tipo", "objeto_id")
+        indexes = [models.Index(fields=["tipo", "objeto_id"])]
+        verbose_name = "Audiencia de aviso"
+        verbose_name_plural = "Audiencias de avisos"
+
+    def __str__(self):
+        return f"{self.aviso} → {self.get_tipo_display()} {self.objeto_id}"
+
+
+class MiembroAudiencia(models.Model):
+    """
+    Índice precalculado de pertenencia: a qué grupos, aulas, centros y clases
+    pertenece cada usuario. Se mantiene desde signals.py (ver audiencias.py).
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="audiencias"
+    )
+    tipo = models.CharField(max_length=10, choices=TIPOS_AUDIENCIA)
+    objeto_id = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ("user", "tipo", "objeto_id")
+        indexes = [models.Index(fields=["tipo", "objeto_id"])]
+        verbose_name = "Miembro de audiencia"
+        verbose_name_plural = "Miembros de audiencias"
+
+
 # ---------------------- MENSAJES PRIVADOS ----------------------
 class PrivateMessage(models.Model):
     sender = models.ForeignKey(
@@ -95,11 +150,108 @@ class PrivateMessage(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    # Archivado por el destinatario: sale de la bandeja, sigue en el chat y en las búsquedas
+    archivado = models.BooleanField(default=False)
+
+    class Meta:
+        # Historial de una conversación por cursor (ver paginacion.py)
+        indexes = [models.Index(fields=["sender", "receiver", "created_at"])]
 
     def __str__(self):
         return f"De {self.sender} a {self.receiver}: {self.subject}"
 
 
+class Conversacion(models.Model):
+    """
+    Hilo entre dos usuarios (usuario_a tiene el id menor) con el último
+    mensaje ya resuelto. Se mantiene desde conversaciones.py al escribir o
+    leer mensajes; no hace falta agregar PrivateMessage para listar hilos.
+    """
+    usuario_a = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    usuario_b = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    ultimo_mensaje = models.ForeignKey(
+        PrivateMessage, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    ultima_actividad = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("usuario_a", "usuario_b")
+        verbose_name = "Conversación"
+        verbose_name_plural = "Conversaciones"
+
+    def __str__(self):
+        return f"{self.usuario_a} ↔ {self.usuario_b}"
+
+
+class ParticipanteConversacion(models.Model):
+    """
+    Una fila por usuario y conversación: "mis conversaciones con sus no
+    leídos" es una consulta por el índice (usuario, ultima_actividad).
+    """
+    conversacion = models.ForeignKey(Conversacion, on_delete=models.CASCADE, related_name="participantes")
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="conversaciones")
+    otro = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    no_leidos = models.PositiveIntegerField(default=0)
+    ultima_actividad = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ("conversacion", "usuario")
+        indexes = [models.Index(fields=["usuario", "-ultima_actividad"])]
+        verbose_name = "Participante de conversación"
+        verbose_name_plural = "Participantes de conversaciones"
+
+
+# ---------------------- ADJUNTOS ----------------------
+def almacen_adjuntos():
+    # Fuera de MEDIA_ROOT y sin URL pública: se sirven por dashboard:descargar_adjunto
+    return FileSystemStorage(location=settings.ADJUNTOS_ROOT, base_url=None)
+
+
+def ruta_adjunto(instance, filename):
+    # En disco con nombre aleatorio; el original se guarda en `nombre`
+    extension = PurePath(filename).suffix.lower()
+    return timezone.now().strftime(f"%Y/%m/{uuid.uuid4().hex}{extension}")
+
+
+class Adjunto(models.Model):
+    """Fichero adjunto a un mensaje privado o a un aviso (uno de los dos)."""
+    archivo = models.FileField(upload_to=ruta_adjunto, storage=almacen_adjuntos, max_length=255)
+    nombre = models.CharField(max_length=255)
+    tipo = models.CharField(max_length=100, default="application/octet-stream")
+    tamano = models.PositiveBigIntegerField(default=0)
+    mensaje = models.ForeignKey(
+        PrivateMessage, on_delete=models.CASCADE, null=True, blank=True, related_name="adjuntos"
+    )
+    aviso = models.ForeignKey(
+        Aviso, on_delete=models.CASCADE, null=True, blank=True, related_name="adjuntos"
+    )
+    subido_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(mensaje__isnull=False, aviso__isnull=True)
+                | models.Q(mensaje__isnull=True, aviso__isnull=False),
+                name="adjunto_de_mensaje_o_aviso",
+            ),
+        ]
+
+    @property
+    def icono(self):
+        if self.tipo == "application/pdf":
+            return "fa-file-pdf"
+        if self.tipo.startswith("image/"):
+            return "fa-file-image"
+        return "fa-paperclip"
+
+    def __str__(self):
+        return self.nombre
+
+
 # ---------------------- NOTIFICACIONES ----------------------
 class Notification(models.Model):
     TIPOS = [
@@ -117,6 +269,22 @@ class Notification(models.Model):
     creado = models.DateTimeField(auto_now_add=True)
     leida = models.BooleanField(default=False)
     mensaje = models.ForeignKey("PrivateMessage", on_delete=models.CASCADE, null=True, blank=True)
+    # Evento que la originó ("mensaje:12", "aviso:7"): una sola por usuario y evento
+    clave = models.CharField(max_length=100, null=True, blank=True)
+    # Falta entregarla por email/SMS/push (ver notifications/entrega.py)
+    envio_pendiente = models.BooleanField(default=True)
+    # Cuándo la reclamó un worker (caduca si muere) y, en horas de silencio, desde cuándo puede salir
+    envio_reclamado = models.DateTimeField(null=True, blank=True)
+    envio_no_antes = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "clave"], name="notificacion_unica_por_evento"),
+        ]
+        indexes = [
+            # Solo las pendientes: el índice se queda pequeño aunque la tabla crezca
+            models.Index(fields=["id"], condition=models.Q(envio_pendiente=True), name="notificacion_envio_pendiente"),
+        ]
 
     def __str__(self):
         return f"[{self.tipo}] {self.titulo} → {self.user}"
@@ -124,6 +292,60 @@ class Notification(models.Model):
 
 
 
+# ---------------------- ARCHIVO (DATOS FRÍOS) ----------------------
+# Copias de mensajes y notificaciones antiguos, con el mismo id, para que las
+# tablas calientes no crezcan sin fin (ver archivo.py). No se escriben desde
+# las vistas: solo las rellena el archivado.
+class MensajeArchivado(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    receiver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    subject = models.CharField(max_length=200)
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    is_read = models.BooleanField(default=True)
+    archivado = models.BooleanField(default=False)
+    archivado_en = models.DateTimeField(default=timezone.now)
+
+    # Se usa como PrivateMessage en plantillas y en datos_mensaje(); esto los distingue
+    en_archivo = True
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sender", "receiver", "created_at"]),
+            models.Index(fields=["receiver", "created_at"]),
+        ]
+        verbose_name = "Mensaje archivado"
+        verbose_name_plural = "Mensajes archivados"
+
+    def __str__(self):
+        return f"De {self.sender} a {self.receiver}: {self.subject}"
+
+
+class NotificacionArchivada(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    tipo = models.CharField(max_length=20, choices=Notification.TIPOS, default="info")
+    titulo = models.CharField(max_length=200, default="Notificación")
+    contenido = models.TextField(default="")
+    url = models.URLField(blank=True, null=True)
+    creado = models.DateTimeField()
+    leida = models.BooleanField(default=True)
+    # Sin FK: el mensaje puede estar en PrivateMessage o en MensajeArchivado
+    mensaje_id = models.BigIntegerField(null=True, blank=True)
+    archivado_en = models.DateTimeField(default=timezone.now)
+
+    en_archivo = True
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-creado"])]
+        verbose_name = "Notificación archivada"
+        verbose_name_plural = "Notificaciones archivadas"
+
+    def __str__(self):
+        return f"[{self.tipo}] {self.titulo} → {self.user}"
+
+
 # ---------------------- ANUNCIOS ----------------------
 class Announcement(models.Model):
     titulo = models.CharField(max_length=200)
@@ -175,5 +397,115 @@ class Asistencia(models.Model):
         default='presente'
     )
 
+    class Meta:
+        indexes = [models.Index(fields=["alumno", "fecha"])]
+
     def __str__(self):
         return f"{self.alumno} - {self.fecha} ({self.estado})"
+
+
+# ---------------------- CALENDARIO ESCOLAR ----------------------
+class CursoEscolar(models.Model):
+    nombre = models.CharField(max_length=20, unique=True)  # "2025-2026"
+    inicio = models.DateField()
+    fin = models.DateField()
+    fin_primer_trimestre = models.DateField(null=True, blank=True)
+    fin_segundo_trimestre = models.DateField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-inicio"]
+        verbose_name = "Curso escolar"
+        verbose_name_plural = "Cursos escolares"
+
+    def __str__(self):
+        return f"Curso {self.nombre}"
+
+
+class PeriodoNoLectivo(models.Model):
+    TIPOS = [
+        ("festivo", "Festivo oficial"),
+        ("vacaciones", "Vacaciones escolares"),
+    ]
+
+    curso = models.ForeignKey(CursoEscolar, on_delete=models.CASCADE, related_name="periodos_no_lectivos")
+    school = models.ForeignKey(
+        "core.School",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        help_text="Vacío = se aplica a todos los centros",
+    )
+    tipo = models.CharField(max_length=20, choices=TIPOS, default="festivo")
+    descripcion = models.CharField(max_length=150, blank=True)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField()
+
+    class Meta:
+        ordering = ["fecha_inicio"]
+        verbose_name = "Periodo no lectivo"
+        verbose_name_plural = "Periodos no lectivos"
+
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.fecha_inicio:%d/%m/%Y} - {self.fecha_fin:%d/%m/%Y}"
+
+
+class CalendarioCentro(models.Model):
+    """Fechas de inicio/fin propias de un centro para un curso."""
+    curso = models.ForeignKey(CursoEscolar, on_delete=models.CASCADE, related_name="calendarios_centro")
+    school = models.ForeignKey("core.School", on_delete=models.CASCADE)
+    inicio = models.DateField(null=True, blank=True)
+    fin = models.DateField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ("curso", "school")
+        verbose_name = "Calendario de centro"
+        verbose_name_plural = "Calendarios de centro"
+
+    def __str__(self):
+        return f"{self.curso} · centro {self.school_id}"
+
+
+# ---------------------- RESÚMENES DE ASISTENCIA ----------------------
+class ResumenAsistencia(models.Model):
+    """Contadores de asistencia por trimestre, mantenidos en cada escritura de Asistencia."""
+    curso = models.ForeignKey(CursoEscolar, on_delete=models.CASCADE)
+    trimestre = models.PositiveSmallIntegerField()
+    presentes = models.PositiveIntegerField(default=0)
+    ausentes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ResumenAsistenciaAlumno(ResumenAsistencia):
+    alumno = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="resumenes_asistencia"
+    )
+
+    class Meta:
+        unique_together = ("alumno", "curso", "trimestre")
+        verbose_name = "Resumen de asistencia (alumno)"
+        verbose_name_plural = "Resúmenes de asistencia (alumno)"
+
+
+class ResumenAsistenciaGrupo(ResumenAsistencia):
+    grupo = models.ForeignKey("core.Group", on_delete=models.CASCADE, related_name="resumenes_asistencia")
+
+    class Meta:
+        unique_together = ("grupo", "curso", "trimestre")
+        verbose_name = "Resumen de asistencia (grupo)"
+        verbose_name_plural = "Resúmenes de asistencia (grupo)"
+
+
+class AsistenciaDiariaGrupo(models.Model):
+    grupo = models.ForeignKey("core.Group", on_delete=models.CASCADE, related_name="asistencia_diaria")
+    fecha = models.DateField()
+    presentes = models.PositiveIntegerField(default=0)
+    ausentes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("grupo", "fecha")
+        verbose_name = "Asistencia diaria (grupo)"
+        verbose_name_plural = "Asistencia diaria (grupo)"
@@ -0,0 +1,172 @@
+# dashboard/notificaciones.py
+"""
+Reparto de notificaciones: el único camino por el que se crean.
+
+Cada notificación lleva la clave del evento que la origina ("mensaje:<id>",
+"aviso:<id>") y la base de datos no admite dos con la misma clave para el
+mismo usuario (notificacion_unica_por_evento). Repetir un evento (la vista y
+la señal a la vez, un reintento, un formulario enviado dos veces) no duplica
+nada: las que ya existen se saltan.
+
+Se escriben con bulk_create por lotes dentro de una transacción: un aviso a
+miles de familias son unas pocas sentencias INSERT, no miles. Los avisos se
+disparan desde m2m_changed (en post_save aún no están los destinatarios) y
+los mensajes desde su post_save. Tras el commit cada notificación se publica
+también en vivo (tiempo_real.py), y las de avisos encargan además su correo
+en bloque, con la plantilla renderizada una vez (announcements/tasks.py).
+"""
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.urls import reverse
+
+from announcements.tasks import enviar_aviso_por_correo
+
+from .cache import invalidar_dashboard
+from .contadores import invalidar_contadores, sumar
+from .models import Notification
+from .tiempo_real import publicar_notificaciones
+
+# Filas por INSERT (Notification tiene 8 columnas: cabe holgado en los
+# límites de parámetros de SQLite y PostgreSQL)
+TAMANO_LOTE = 1000
+
+
+def lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while lote := list(islice(iterador, tamano)):
+        yield lote
+
+
+def clave_mensaje(mensaje):
+    return f"mensaje:{mensaje.pk}"
+
+
+def clave_aviso(aviso):
+    return f"aviso:{aviso.pk}"
+
+
+# ---------------------- DESPACHO ----------------------
+
+
+def _existentes(notificaciones):
+    """(user_id, clave) de `notificaciones` que ya están en la base de datos."""
+    # Un evento a muchos usuarios o muchos eventos a un usuario: el cruce es pequeño
+    return set(Notification.objects.filter(
+        user_id__in={n.user_id for n in notificaciones}, clave__in={n.clave for n in notificaciones},
+    ).values_list("user_id", "clave"))
+
+
+def _insertar(notificaciones):
+    existentes = _existentes(notificaciones)
+    nuevas = [n for n in notificaciones if (n.user_id, n.clave) not in existentes]
+    if nuevas:
+        Notification.objects.bulk_create(nuevas)
+    return nuevas
+
+
+def _insertar_una_a_una(notificaciones):
+    """Tras un choque: cada fila en su savepoint; la que ya exista se salta sin abortar el resto."""
+    existentes = _existentes(notificaciones)
+    nuevas = []
+    for notificacion in notificaciones:
+        if (notificacion.user_id, notificacion.clave) in existentes:
+            continue
+        try:
+            with transaction.atomic():
+                Notification.objects.bulk_create([notificacion])
+        except IntegrityError:
+            continue
+        nuevas.append(notificacion)
+    return nuevas
+
+
+def despachar(notificaciones):
+    """
+    Guarda `notificaciones` (instancias sin guardar, cada una con su clave)
+    saltándose las que ya existen, y las publica y cuenta tras el commit.
+    Devuelve las creadas.
+    """
+    creadas = []
+    with transaction.atomic():
+        for lote in lotes(notificaciones, TAMANO_LOTE):
+            try:
+                with transaction.atomic():
+                    nuevas = _insertar(lote)
+            except IntegrityError:
+                # Otra petición ha creado alguna entre la consulta y el INSERT: fila a fila,
+                # para que un segundo choque no rompa la transacción (ni los lotes anteriores)
+                nuevas = _insertar_una_a_una(lote)
+            if not nuevas:
+                continue
+            creadas += nuevas
+            publicar_notificaciones(nuevas)
+            usuarios = {n.user_id for n in nuevas}
+            if len(usuarios) == 1:
+                sumar("notificaciones", nuevas[0].user_id, len(nuevas))
+            else:
+                # Un delete_many por lote en vez de un incr por familia
+                invalidar_contadores(usuarios, "notificaciones")
+            invalidar_dashboard(*usuarios)
+    return creadas
+
+
+def notificar(user_ids, clave, **campos):
+    """Notifica el evento `clave` a cada id de `user_ids` (una vez por usuario). Devuelve cuántas."""
+    return len(despachar(Notification(user_id=uid, clave=clave, **campos) for uid in user_ids))
+
+
+# ---------------------- EVENTOS ----------------------
+
+
+def _notificacion_aviso(aviso, user_id):
+    return Notification(
+        user_id=user_id,
+        clave=clave_aviso(aviso),
+        tipo="aviso",
+        titulo="Nuevo aviso",
+        contenido=aviso.titulo,
+        url=f"/dashboard/avisos/{aviso.id}/",
+    )
+
+
+def _correo_aviso(aviso_id, user_ids):
+    # Solo a quien se acaba de notificar: repetir el evento no repite el correo.
+    # robust: si el broker no responde, el aviso ya está guardado y no se rompe la petición
+    if user_ids:
+        transaction.on_commit(lambda: enviar_aviso_por_correo.delay(aviso_id, user_ids), robust=True)
+
+
+def notificar_aviso(aviso, user_ids):
+    """
+    Crea la notificación de `aviso` para cada id de `user_ids` y encarga su
+    correo en bloque (announcements.tasks). Devuelve cuántas.
+    """
+    creadas = despachar(_notificacion_aviso(aviso, uid) for uid in user_ids)
+    _correo_aviso(aviso.pk, [n.user_id for n in creadas])
+    return len(creadas)
+
+
+def notificar_avisos(avisos, user_id):
+    """Lado inverso (user.avisos_recibidos.add(...)): un usuario, varios avisos."""
+    avisos = list(avisos)
+    creadas = {n.clave for n in despachar(_notificacion_aviso(aviso, user_id) for aviso in avisos)}
+    for aviso in avisos:
+        if clave_aviso(aviso) in creadas:
+            _correo_aviso(aviso.pk, [user_id])
+    return len(creadas)
+
+
+def notificar_mensaje(mensaje):
+    """La notificación de un mensaje privado a su destinatario (la misma venga de donde venga)."""
+    remitente = mensaje.sender.get_full_name() or mensaje.sender.username
+    contenido = mensaje.content if len(mensaje.content) <= 50 else mensaje.content[:50] + "…"
+    return len(despachar([Notification(
+        user_id=mensaje.receiver_id,
+        clave=clave_mensaje(mensaje),
+        mensaje=mensaje,
+        tipo="mensaje",
+        titulo=f"Nuevo mensaje de {remitente}",
+        contenido=contenido,
+        url=reverse("dashboard:mensaje_detalle", args=[mensaje.pk]),
+    )]))
@@ -0,0 +1,105 @@
+# dashboard/operaciones.py
+"""
+Operaciones masivas sobre los mensajes recibidos (leer, no leído, archivar,
+eliminar).
+
+Los mensajes se eligen por ids o por filtro (remitente, anteriores a una
+fecha) y siempre dentro de los recibidos por el usuario: la operación es un
+único UPDATE o DELETE sobre ese queryset. Lo que cuelga de los mensajes
+(no leídos de cada conversación, contadores, notificaciones y adjuntos) se
+ajusta con una consulta por tabla, no por mensaje.
+"""
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .adjuntos import borrar_adjuntos
+from .cache import invalidar_dashboard
+from .contadores import invalidar_contadores, sumar
+from .conversaciones import recalcular_conversaciones
+from .models import Adjunto, Conversacion, Notification, ParticipanteConversacion, PrivateMessage
+
+ACCIONES = {
+    "leer": "Marcar como leídos",
+    "no_leido": "Marcar como no leídos",
+    "archivar": "Archivar",
+    "desarchivar": "Devolver a la bandeja",
+    "eliminar": "Eliminar",
+}
+
+# Por petición: más ids que esto se piden por filtro
+MAX_IDS = 500
+
+
+def seleccion(user, ids=None, remitente=None, antes=None):
+    """Mensajes recibidos por `user` que cumplen todos los criterios dados."""
+    qs = PrivateMessage.objects.filter(receiver=user)
+    if ids is not None:
+        qs = qs.filter(pk__in=ids)
+    if remitente is not None:
+        qs = qs.filter(sender_id=remitente)
+    if antes is not None:
+        qs = qs.filter(created_at__lt=antes)
+    return qs
+
+
+def _recontar_no_leidos(user, remitentes):
+    # Un UPDATE con subconsulta: no_leidos de cada hilo tocado, contado de nuevo
+    no_leidos = (
+        PrivateMessage.objects.filter(receiver=user, sender=OuterRef("otro"), is_read=False)
+        .order_by().values("sender").annotate(n=Count("id")).values("n")
+    )
+    ParticipanteConversacion.objects.filter(usuario=user, otro_id__in=remitentes).update(
+        no_leidos=Coalesce(Subquery(no_leidos), Value(0)),
+    )
+
+
+def _cambiar_lectura(user, qs, leido):
+    qs = qs.filter(is_read=not leido)
+    remitentes = list(qs.order_by().values_list("sender_id", flat=True).distinct())
+    total = qs.update(is_read=leido)
+    if total:
+        _recontar_no_leidos(user, remitentes)
+        sumar("mensajes", user.id, -total if leido else total)
+    return total
+
+
+def _eliminar(user, qs):
+    remitentes = list(qs.order_by().values_list("sender_id", flat=True).distinct())
+    if not remitentes:
+        return 0
+    # Sin pasar por el Collector (que cargaría cada mensaje y lanzaría sus señales):
+    # lo que apunta a los mensajes se resuelve antes, en bloque
+    notificaciones = Notification.objects.filter(mensaje__in=qs)
+    avisados = set(notificaciones.values_list("user_id", flat=True).distinct())
+    # _raw_delete es privado de Django, pero es el único DELETE sin Collector:
+    # delete() cargaría cada notificación para sus post_delete (contador y
+    # snapshot), que aquí se rehacen una vez abajo con invalidar_contadores
+    notificaciones._raw_delete(notificaciones.db)
+    borrar_adjuntos(Adjunto.objects.filter(mensaje__in=qs))
+    Conversacion.objects.filter(ultimo_mensaje__in=qs).update(ultimo_mensaje=None)
+    # Igual con los mensajes: sus post_delete recalculan la conversación y el
+    # contador mensaje a mensaje; recalcular_conversaciones lo hace por hilo.
+    # Si _raw_delete cambia en Django, falla OperacionMensajesTests
+    total = qs._raw_delete(qs.db)
+    recalcular_conversaciones([(user.id, r) for r in remitentes])
+    invalidar_contadores(avisados | {user.id})
+    invalidar_dashboard(*remitentes)
+    return total
+
+
+def aplicar(user, accion, qs):
+    """Aplica `accion` a `qs` (ver seleccion()). Devuelve cuántos mensajes han cambiado."""
+    with transaction.atomic():
+        if accion in ("leer", "no_leido"):
+            total = _cambiar_lectura(user, qs, accion == "leer")
+        elif accion in ("archivar", "desarchivar"):
+            archivar = accion == "archivar"
+            total = qs.filter(archivado=not archivar).update(archivado=archivar)
+        elif accion == "eliminar":
+            total = _eliminar(user, qs)
+        else:
+            raise ValueError(f"Acción desconocida: {accion}")
+    if total:
+        invalidar_dashboard(user.id)
+    return total
@@ -0,0 +1,71 @@
+# dashboard/paginacion.py
+"""
+Paginación por cursor (keyset) sobre (fecha, id).
+
+En lugar de OFFSET, cada página pide "los N siguientes anteriores a la última
+fila vista", que con un índice compuesto (…, fecha, id) cuesta lo mismo en la
+primera página que en la número 500.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def codificar_cursor(fecha, pk):
+    texto = f"{fecha.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """(fecha, id) del cursor, o None si viene vacío o manipulado."""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha, pk = texto.split("|")
+        return datetime.fromisoformat(fecha), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _desde_cursor(qs, campo_fecha, cursor, descendente):
+    orden = "-" if descendente else ""
+    qs = qs.order_by(f"{orden}{campo_fecha}", f"{orden}id")
+    posicion = decodificar_cursor(cursor)
+    if posicion:
+        fecha, pk = posicion
+        op = "lt" if descendente else "gt"
+        qs = qs.filter(Q(**{f"{campo_fecha}__{op}": fecha}) | Q(**{campo_fecha: fecha, f"id__{op}": pk}))
+    return qs
+
+
+def _recortar(filas, campo_fecha, tamano):
+    if len(filas) <= tamano:
+        return filas, None
+    filas = filas[:tamano]
+    ultima = filas[-1]
+    return filas, codificar_cursor(getattr(ultima, campo_fecha), ultima.pk)
+
+
+def pagina_keyset(qs, campo_fecha, cursor=None, tamano=20, descendente=True):
+    """
+    Devuelve (filas, cursor_siguiente) de `qs` ordenado por (campo_fecha, id).
+    cursor_siguiente es None en la última página.
+    """
+    qs = _desde_cursor(qs, campo_fecha, cursor, descendente)
+    # Una fila de más para saber si hay otra página sin hacer COUNT
+    return _recortar(list(qs[:tamano + 1]), campo_fecha, tamano)
+
+
+def pagina_keyset_combinada(querysets, campo_fecha, cursor=None, tamano=20, descendente=True):
+    """
+    Como pagina_keyset, pero sobre varias tablas con el mismo orden (caliente y
+    archivo, ver archivo.py): una página de cada una y se mezclan. Los ids no
+    se repiten entre ellas, así que el cursor sirve para todas.
+    """
+    filas = []
+    for qs in querysets:
+        filas += list(_desde_cursor(qs, campo_fecha, cursor, descendente)[:tamano + 1])
+    filas.sort(key=lambda f: (getattr(f, campo_fecha), f.pk), reverse=descendente)
+    return _recortar(filas, campo_fecha, tamano)
@@ -0,0 +1,8 @@
+# dashboard/routing.py
+from django.urls import path
+
+from .consumers import EventosConsumer
+
+websocket_urlpatterns = [
+    path("ws/eventos/", EventosConsumer.as_asgi()),
+]
@@ -1,32 +1,49 @@
 # dashboard/signals.py
-from django.db.models.signals import post_save
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed, post_migrate
 from django.dispatch import receiver
-from .models import Aviso, PrivateMessage, Tarea, Notification
+from .models import (
+    Adjunto, Aviso, PrivateMessage, Tarea, Notification, Incidencia, Asistencia,
+    CursoEscolar, PeriodoNoLectivo, CalendarioCentro,
+)
+from .adjuntos import borrar_ficheros
+from .asistencia import aplicar_asistencia
+from .busqueda import reponer_triggers
+from .cache import invalidar_dashboard, invalidar_dashboard_global
+from .calendario import invalidar_calendarios
+from .contadores import sumar
+from .conversaciones import recalcular_conversaciones, registrar_mensaje
+from .directorio import invalidar_directorio
+from .tiempo_real import publicar_mensaje, publicar_notificaciones
+from .notificaciones import notificar_aviso, notificar_avisos, notificar_mensaje
+from .audiencias import MODELOS_AUDIENCIA, alumnos_de, olvidar_objeto, reindexar_usuarios
+from announcements.models import ClassGroup
+from core.models import Classroom, CustomUser, Group, School
 from django.utils import timezone
 from django.contrib.auth.signals import user_logged_in
 
 @receiver(post_save, sender=Aviso)
 def aviso_notif(sender, instance, created, **kwargs):
-    if created:
-        for user in instance.destinatarios.all():
-            Notification.objects.create(
-                user=user,
-                tipo="aviso",
-                titulo="Nuevo aviso",
-                contenido=instance.titulo,
-                url=f"/dashboard/avisos/{instance.id}/"
-            )
+    # Las notificaciones salen al añadir destinatarios (aviso_notificar_destinatarios):
+    # en post_save todavía no se han guardado
+    invalidar_dashboard(instance.autor_id)
+
+@receiver(m2m_changed, sender=Aviso.destinatarios.through)
+def aviso_notificar_destinatarios(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set solo trae los destinatarios nuevos: al editar no se repite la notificación
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        notificar_avisos(Aviso.objects.filter(pk__in=pk_set).only("id", "titulo"), instance.pk)
+    else:
+        notificar_aviso(instance, sorted(pk_set))
 
 @receiver(post_save, sender=PrivateMessage)
 def mensaje_notif(sender, instance, created, **kwargs):
+    invalidar_dashboard(instance.sender_id, instance.receiver_id)
     if created:
-        Notification.objects.create(
-            user=instance.receiver,
-            tipo="mensaje",
-            titulo=f"Nuevo mensaje de {instance.sender}",
-            contenido=instance.content[:50] + "...",
-            url=f"/dashboard/mensajes/{instance.id}/"
-        )
+        # Todos los envíos (chat, formularios, respuestas, tutor-familia) pasan por aquí
+        notificar_mensaje(instance)
 
 @receiver(user_logged_in)
 def registrar_asistencia_automatica(sender, request, user, **kwargs):
@@ -36,4 +53,191 @@ def registrar_asistencia_automatica(sender, request, user, **kwargs):
         alumno=user,
         fecha=hoy,
         defaults={"estado": "presente"}
-    )
\ No newline at end of file
+    )
+
+
+# ---------------------- INVALIDACIÓN DEL SNAPSHOT DEL DASHBOARD ----------------------
+
+@receiver(post_delete, sender=Aviso)
+def aviso_invalidar(sender, instance, **kwargs):
+    invalidar_dashboard(instance.autor_id)
+
+@receiver(post_delete, sender=PrivateMessage)
+def mensaje_invalidar(sender, instance, **kwargs):
+    invalidar_dashboard(instance.sender_id, instance.receiver_id)
+
+@receiver([post_save, post_delete], sender=Tarea)
+@receiver([post_save, post_delete], sender=Incidencia)
+def autor_invalidar(sender, instance, **kwargs):
+    invalidar_dashboard(instance.autor_id)
+
+@receiver([post_save, post_delete], sender=Notification)
+def notificacion_invalidar(sender, instance, **kwargs):
+    invalidar_dashboard(instance.user_id)
+
+@receiver(m2m_changed, sender=Aviso.destinatarios.through)
+def destinatarios_invalidar(sender, instance, action, reverse, pk_set, **kwargs):
+    # pre_clear: aún se pueden leer los destinatarios que se van a quitar
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        # instance es el usuario; pk_set son avisos
+        avisos = Aviso.objects.filter(pk__in=pk_set) if pk_set else instance.avisos_recibidos.all()
+        invalidar_dashboard(instance.pk, *avisos.values_list("autor_id", flat=True))
+    else:
+        ids = pk_set if pk_set else instance.destinatarios.values_list("pk", flat=True)
+        invalidar_dashboard(instance.autor_id, *ids)
+
+
+# ---------------------- CALENDARIO ESCOLAR ----------------------
+
+@receiver([post_save, post_delete], sender=CursoEscolar)
+@receiver([post_save, post_delete], sender=PeriodoNoLectivo)
+@receiver([post_save, post_delete], sender=CalendarioCentro)
+def calendario_invalidar(sender, instance, **kwargs):
+    invalidar_calendarios()
+    invalidar_dashboard_global()
+
+
+# ---------------------- RESÚMENES DE ASISTENCIA ----------------------
+
+@receiver(pre_save, sender=Asistencia)
+def asistencia_previa(sender, instance, **kwargs):
+    # Guardamos el estado anterior para poder restarlo del resumen
+    instance._previa = None
+    if instance.pk:
+        instance._previa = (
+            Asistencia.objects.filter(pk=instance.pk)
+            .values_list("alumno_id", "fecha", "estado")
+            .first()
+        )
+
+@receiver(post_save, sender=Asistencia)
+def asistencia_resumir(sender, instance, created, **kwargs):
+    actual = (instance.alumno_id, instance.fecha, instance.estado)
+    previa = getattr(instance, "_previa", None)
+    if previa == actual:
+        return
+    if previa:
+        aplicar_asistencia(*previa, delta=-1)
+    aplicar_asistencia(*actual, delta=1)
+    invalidar_dashboard(instance.alumno_id, previa and previa[0])
+
+@receiver(post_delete, sender=Asistencia)
+def asistencia_descontar(sender, instance, **kwargs):
+    aplicar_asistencia(instance.alumno_id, instance.fecha, instance.estado, delta=-1)
+    invalidar_dashboard(instance.alumno_id)
+
+
+# ---------------------- ÍNDICE DE AUDIENCIAS ----------------------
+
+@receiver(m2m_changed, sender=Group.students.through)
+@receiver(m2m_changed, sender=ClassGroup.members.through)
+def audiencias_miembros(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and not reverse:
+        # Tras el clear ya no se puede saber quién estaba
+        instance._miembros_previos = list(
+            sender.objects.filter(**{f"{instance._meta.model_name}_id": instance.pk})
+            .values_list("customuser_id", flat=True)
+        )
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        reindexar_usuarios([instance.pk])
+    elif action == "post_clear":
+        reindexar_usuarios(getattr(instance, "_miembros_previos", []))
+    else:
+        reindexar_usuarios(pk_set)
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=Classroom)
+def audiencias_mover(sender, instance, created, **kwargs):
+    # Un grupo que cambia de aula (o un aula de centro) cambia el aula/centro de sus alumnos
+    if not created:
+        tipo = "grupo" if sender is Group else "aula"
+        reindexar_usuarios(alumnos_de(tipo, instance.pk))
+
+@receiver(pre_delete, sender=Group)
+def audiencias_grupo_previo(sender, instance, **kwargs):
+    instance._miembros_previos = alumnos_de("grupo", instance.pk)
+
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Classroom)
+@receiver(post_delete, sender=School)
+@receiver(post_delete, sender=ClassGroup)
+def audiencias_olvidar(sender, instance, **kwargs):
+    tipo = next(t for t, modelo in MODELOS_AUDIENCIA.items() if modelo is sender)
+    olvidar_objeto(tipo, instance.pk)
+    reindexar_usuarios(getattr(instance, "_miembros_previos", []))
+
+
+# ---------------------- DIRECTORIO DE CONTACTOS ----------------------
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def directorio_invalidar(sender, instance, update_fields=None, **kwargs):
+    # Cada login guarda last_login: eso no cambia el directorio
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidar_directorio()
+
+
+# ---------------------- CONVERSACIONES ----------------------
+
+@receiver(post_save, sender=PrivateMessage)
+def mensaje_conversacion(sender, instance, created, **kwargs):
+    if created:
+        registrar_mensaje(instance)
+
+@receiver(post_delete, sender=PrivateMessage)
+def mensaje_borrado_conversacion(sender, instance, **kwargs):
+    # Puede haberse ido el último mensaje o uno sin leer: se recalcula el hilo
+    recalcular_conversaciones([(instance.sender_id, instance.receiver_id)])
+
+
+# ---------------------- TIEMPO REAL ----------------------
+
+@receiver(post_save, sender=PrivateMessage)
+def mensaje_tiempo_real(sender, instance, created, **kwargs):
+    if created:
+        publicar_mensaje(instance)
+
+@receiver(post_save, sender=Notification)
+def notificacion_tiempo_real(sender, instance, created, **kwargs):
+    if created:
+        publicar_notificaciones([instance])
+
+
+# ---------------------- CONTADORES DE NO LEÍDOS ----------------------
+# Los mensajes nuevos y leídos los cuenta conversaciones.py
+
+@receiver(post_delete, sender=PrivateMessage)
+def mensaje_borrado_contador(sender, instance, **kwargs):
+    if not instance.is_read:
+        sumar("mensajes", instance.receiver_id, -1)
+
+@receiver(post_save, sender=Notification)
+def notificacion_contador(sender, instance, created, **kwargs):
+    if created and not instance.leida:
+        sumar("notificaciones", instance.user_id)
+
+@receiver(post_delete, sender=Notification)
+def notificacion_borrada_contador(sender, instance, **kwargs):
+    if not instance.leida:
+        sumar("notificaciones", instance.user_id, -1)
+
+
+# ---------------------- BÚSQUEDA ----------------------
+
+@receiver(post_migrate)
+def busqueda_triggers(sender, using, **kwargs):
+    # El índice se sincroniza con triggers; si una migración rehízo la tabla, se reponen
+    if sender.name == "schoolcomms.dashboard":
+        reponer_triggers(connections[using])
+
+
+# ---------------------- ADJUNTOS ----------------------
+
+@receiver(post_delete, sender=Adjunto)
+def adjunto_borrar_fichero(sender, instance, **kwargs):
+    borrar_ficheros([instance.archivo.name])
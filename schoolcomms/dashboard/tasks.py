@@ -0,0 +1,16 @@
+from celery import shared_task
+
+from .archivo import archivar, fecha_corte
+from .tiempo_real import enviar_notificaciones
+
+
+@shared_task
+def archivar_historico():
+    """Archivado periódico (ver archivo.py); devuelve (mensajes, notificaciones) movidos."""
+    return archivar(fecha_corte())
+
+
+@shared_task
+def publicar_notificaciones(ids):
+    """Publica en tiempo real un reparto grande de notificaciones (ver tiempo_real.py)."""
+    return enviar_notificaciones(ids)
@@ -0,0 +1,1387 @@
+import asyncio
+import base64
+import datetime
+import importlib
+import json
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from announcements.models import ClassGroup
+from core.models import Classroom, CustomUser, Group, School
+
+from . import archivo, busqueda, contadores, context_processors, notificaciones, operaciones, tiempo_real
+from .adjuntos import guardar_adjuntos
+from .asistencia import reconstruir_resumenes, totales_alumno, totales_grupo
+from .audiencias import asignar_audiencias, avisos_recibidos, avisos_visibles
+from .cache import estadisticas_cache, invalidar_dashboard_global, obtener_snapshot
+from .calendario import SchoolCalendar, invalidar_calendarios, obtener_calendario
+from .conversaciones import (
+    conversaciones_de, marcar_conversacion_leida, marcar_leido, recalcular_conversaciones,
+)
+from .directorio import Directorio, invalidar_directorio
+from .estadisticas import ResumenDashboard, obtener_resumen
+from .forms import AvisoForm
+from .models import (
+    Adjunto, Asistencia, AsistenciaDiariaGrupo, Aviso, CalendarioCentro, Conversacion, CursoEscolar, Incidencia,
+    MensajeArchivado, MiembroAudiencia, NotificacionArchivada, Notification, ParticipanteConversacion, PeriodoNoLectivo, PrivateMessage,
+    ResumenAsistenciaAlumno, ResumenAsistenciaGrupo, Tarea,
+)
+from .notificaciones import despachar, notificar
+from .paginacion import codificar_cursor, decodificar_cursor
+from .routing import websocket_urlpatterns
+from .tarjetas import TARJETAS
+
+# Sin Redis: caché y capa de Channels en memoria del proceso de tests
+EN_MEMORIA = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+
+
+def usuario(nombre, **campos):
+    return CustomUser.objects.create_user(nombre, password="x", **campos)
+
+
+def mensaje(sender, receiver, **campos):
+    return PrivateMessage.objects.create(sender=sender, receiver=receiver, subject="Asunto", content="Texto", **campos)
+
+
+class AlmacenTemporalMixin:
+    """Los adjuntos de cada test van a un directorio temporal, no a ADJUNTOS_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.almacen = FileSystemStorage(carpeta.name)
+        parche = mock.patch.object(Adjunto._meta.get_field("archivo"), "storage", self.almacen)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def adjuntar(self, nombre="acta.pdf", contenido=b"%PDF-1.4 acta", **destino):
+        fichero = SimpleUploadedFile(nombre, contenido, content_type="application/pdf")
+        adjunto, = guardar_adjuntos([fichero], destino.get("usuario"), mensaje=destino.get("mensaje"),
+                                    aviso=destino.get("aviso"))
+        return adjunto
+
+
+# ---------------------- RESUMEN DEL DASHBOARD ----------------------
+
+
+@EN_MEMORIA
+class ResumenDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana, self.bob = usuario("ana"), usuario("bob")
+
+    def test_cuenta_lo_de_cada_tabla(self):
+        hoy = datetime.date.today()
+        Tarea.objects.create(titulo="Leer", fecha_entrega=hoy, autor=self.ana, completada=True)
+        Tarea.objects.create(titulo="Sumar", fecha_entrega=hoy, autor=self.ana)
+        Tarea.objects.create(titulo="Otra", fecha_entrega=hoy, autor=self.bob)
+        Aviso.objects.create(titulo="Excursión", contenido="x", autor=self.ana)
+        Incidencia.objects.create(titulo="Luz", descripcion="x", autor=self.ana)
+        mensaje(self.bob, self.ana)
+        mensaje(self.bob, self.ana, is_read=True)
+        mensaje(self.ana, self.bob)
+        MensajeArchivado.objects.create(id=10_000, sender=self.bob, receiver=self.ana, subject="a", content="b",
+                                        created_at=timezone.now())
+        notificar([self.ana.pk], "aviso:1", titulo="Hola")
+        # Las de los mensajes recibidos y la del aviso
+        sin_leer = Notification.objects.filter(user=self.ana, leida=False).count()
+
+        self.assertEqual(obtener_resumen(self.ana), ResumenDashboard(
+            total_tareas=2, tareas_completadas=1, total_avisos=1, total_mensajes=3,
+            mensajes_no_leidos=1, total_incidencias=1, notificaciones_no_leidas=sin_leer,
+        ))
+
+    def test_una_consulta_por_tabla(self):
+        obtener_resumen(self.ana)
+        # Con el contador de notificaciones ya en caché
+        with self.assertNumQueries(5):
+            obtener_resumen(self.ana)
+
+    def test_progreso(self):
+        self.assertEqual(ResumenDashboard().progreso_academico, 0)
+        resumen = ResumenDashboard(total_tareas=3, tareas_completadas=2)
+        self.assertEqual(resumen.progreso_academico, 66)
+        self.assertEqual(resumen.as_dict()["progreso_academico"], 66)
+
+
+# ---------------------- SNAPSHOT DEL DASHBOARD ----------------------
+
+
+@EN_MEMORIA
+class SnapshotDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana, self.bob = usuario("ana"), usuario("bob")
+        self.construidos = 0
+
+    def snapshot(self, user=None):
+        def construir():
+            self.construidos += 1
+            return {"n": self.construidos}
+        return obtener_snapshot(user or self.ana, construir)
+
+    def test_el_segundo_acceso_sale_de_la_cache(self):
+        self.assertEqual(self.snapshot(), {"n": 1})
+        self.assertEqual(self.snapshot(), {"n": 1})
+        estadisticas = estadisticas_cache()
+        self.assertEqual((estadisticas["hits"], estadisticas["misses"]), (1, 1))
+        self.assertEqual(estadisticas["hit_ratio"], 0.5)
+
+    def test_las_senales_invalidan_solo_a_los_afectados(self):
+        self.snapshot()
+        self.snapshot(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            Tarea.objects.create(titulo="Leer", fecha_entrega=datetime.date.today(), autor=self.ana)
+        self.assertEqual(self.snapshot(), {"n": 3})
+        self.assertEqual(self.snapshot(self.bob), {"n": 2})
+
+    def test_borrar_tambien_invalida(self):
+        aviso = Aviso.objects.create(titulo="Excursión", contenido="x", autor=self.ana)
+        self.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            aviso.delete()
+        self.assertEqual(self.snapshot(), {"n": 2})
+
+    def test_la_invalidacion_espera_al_commit(self):
+        self.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            mensaje(self.bob, self.ana)
+            # Dentro de la transacción aún vale el snapshot anterior
+            self.assertEqual(self.snapshot(), {"n": 1})
+        self.assertEqual(self.snapshot(), {"n": 2})
+
+    def test_invalidacion_global(self):
+        self.snapshot()
+        self.snapshot(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_dashboard_global()
+        self.assertEqual(self.snapshot(), {"n": 3})
+        self.assertEqual(self.snapshot(self.bob), {"n": 4})
+
+    def test_otro_dia_se_recalcula(self):
+        self.snapshot()
+        manana = datetime.date.today() + datetime.timedelta(days=1)
+        with mock.patch("schoolcomms.dashboard.cache.date") as fecha:
+            fecha.today.return_value = manana
+            self.assertEqual(self.snapshot(), {"n": 2})
+
+
+# ---------------------- CALENDARIO PRECOMPILADO ----------------------
+
+
+def _dia(dia):
+    return datetime.date(2025, 9, dia)
+
+
+class SchoolCalendarTests(TestCase):
+    def setUp(self):
+        # Tres semanas de lunes 8 a viernes 26: festivo el 10, vacaciones el 17 y el 18
+        self.calendario = SchoolCalendar(
+            _dia(8), _dia(26), festivos=[_dia(10)], vacaciones=[_dia(17), _dia(18)],
+            fines_trimestre=[_dia(12), None],
+        )
+
+    def test_igual_que_mirar_dia_a_dia(self):
+        dias = [_dia(1) + datetime.timedelta(days=i) for i in range(40)]
+        self.assertEqual(
+            [d for d in dias if self.calendario.es_lectivo(d)],
+            [d for d in dias if self.calendario.motivo(d)[0]],
+        )
+        self.assertEqual(len(self.calendario), 12)
+
+    def test_motivo(self):
+        self.assertEqual(self.calendario.motivo(_dia(9)), (True, "Día lectivo"))
+        self.assertEqual(self.calendario.motivo(_dia(10)), (False, "Festivo oficial"))
+        self.assertEqual(self.calendario.motivo(_dia(13)), (False, "Fin de semana"))
+        self.assertEqual(self.calendario.motivo(_dia(17)), (False, "Vacaciones escolares"))
+        self.assertEqual(self.calendario.motivo(_dia(29)), (False, "Fuera del calendario escolar"))
+        self.assertNotIn(_dia(5), self.calendario)
+
+    def test_contar_lectivos(self):
+        self.assertEqual(self.calendario.contar_lectivos(_dia(8), _dia(12)), 4)
+        self.assertEqual(self.calendario.contar_lectivos(_dia(1), _dia(30)), 12)
+        self.assertEqual(self.calendario.contar_lectivos(_dia(12), _dia(8)), 0)
+        self.assertEqual(self.calendario.lectivos_entre(_dia(15), _dia(19)), [_dia(15), _dia(16), _dia(19)])
+
+    def test_ultimos_lectivos(self):
+        self.assertEqual(self.calendario.ultimos_lectivos(3, _dia(20)), [_dia(15), _dia(16), _dia(19)])
+        # Si no hay tantos, los que haya
+        self.assertEqual(self.calendario.ultimos_lectivos(10, _dia(9)), [_dia(8), _dia(9)])
+        self.assertEqual(self.calendario.ultimos_lectivos(3, _dia(1)), [])
+
+    def test_trimestre(self):
+        self.assertEqual(self.calendario.trimestre(_dia(12)), 1)
+        self.assertEqual(self.calendario.trimestre(_dia(15)), 2)
+
+
+# ---------------------- CALENDARIO EN BASE DE DATOS ----------------------
+
+# Curso 2025-2026 (migraciones 0011 y 0013): el 9 de octubre es festivo y el 11, sábado
+LECTIVO_T1 = datetime.date(2025, 10, 8)
+FESTIVO = datetime.date(2025, 10, 9)
+SABADO = datetime.date(2025, 10, 11)
+LECTIVO_T2 = datetime.date(2026, 1, 12)
+
+
+@EN_MEMORIA
+class CalendarioBDTests(TestCase):
+    def setUp(self):
+        self.descartar()
+        self.addCleanup(self.descartar)
+        self.curso = CursoEscolar.objects.get(nombre="2025-2026")
+        self.centro = School.objects.create(name="Centro", address="-", language="es")
+
+    def descartar(self):
+        # Lo compilado vive en el proceso y sobrevive al rollback de cada test
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_calendarios()
+
+    def test_curso_sembrado(self):
+        calendario = obtener_calendario(LECTIVO_T1)
+        self.assertEqual(calendario.nombre, "2025-2026")
+        self.assertTrue(calendario.es_lectivo(LECTIVO_T1))
+        self.assertEqual(calendario.motivo(FESTIVO), (False, "Festivo oficial"))
+        self.assertEqual(calendario.motivo(datetime.date(2025, 12, 24)), (False, "Vacaciones escolares"))
+        self.assertEqual((calendario.trimestre(LECTIVO_T1), calendario.trimestre(LECTIVO_T2)), (1, 2))
+
+    def test_en_verano_el_ultimo_curso_empezado(self):
+        self.assertEqual(obtener_calendario(datetime.date(2026, 7, 15)).curso_id, self.curso.pk)
+
+    def test_se_compila_una_vez(self):
+        obtener_calendario(LECTIVO_T1)
+        with self.assertNumQueries(0):
+            self.assertIs(obtener_calendario(LECTIVO_T2), obtener_calendario(LECTIVO_T1))
+
+    def test_ajustes_del_centro(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            CalendarioCentro.objects.create(curso=self.curso, school=self.centro, fin=datetime.date(2026, 6, 12))
+            PeriodoNoLectivo.objects.create(curso=self.curso, school=self.centro, fecha_inicio=LECTIVO_T1,
+                                            fecha_fin=LECTIVO_T1)
+        del_centro = obtener_calendario(LECTIVO_T1, school=self.centro)
+        self.assertFalse(del_centro.es_lectivo(LECTIVO_T1))
+        self.assertEqual(del_centro.fin, datetime.date(2026, 6, 12))
+        # Los demás centros siguen con el calendario general
+        self.assertTrue(obtener_calendario(LECTIVO_T1).es_lectivo(LECTIVO_T1))
+
+    def test_editar_el_calendario_lo_recompila(self):
+        self.assertTrue(obtener_calendario(LECTIVO_T1).es_lectivo(LECTIVO_T1))
+        with self.captureOnCommitCallbacks(execute=True):
+            PeriodoNoLectivo.objects.create(curso=self.curso, fecha_inicio=LECTIVO_T1, fecha_fin=LECTIVO_T1)
+        self.assertFalse(obtener_calendario(LECTIVO_T1).es_lectivo(LECTIVO_T1))
+
+
+# ---------------------- TARJETAS DEL DASHBOARD ----------------------
+
+
+@EN_MEMORIA
+class TarjetasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana = usuario("ana")
+        self.client.force_login(self.ana)
+
+    def pedir(self, nombre, **cabeceras):
+        return self.client.get(reverse("dashboard:tarjeta_dashboard", args=[nombre]), headers=cabeceras)
+
+    def test_cada_tarjeta_por_separado(self):
+        for nombre, tarjeta in TARJETAS.items():
+            with self.subTest(nombre):
+                respuesta = self.pedir(nombre)
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertIn("private", respuesta["Cache-Control"])
+                self.assertIn(f"max-age={tarjeta.max_age}", respuesta["Cache-Control"])
+        self.assertIn("max-age=300", self.pedir("asistencia")["Cache-Control"])
+
+    def test_tarjeta_desconocida(self):
+        self.assertEqual(self.pedir("nada").status_code, 404)
+
+    def test_sin_sesion(self):
+        self.client.logout()
+        self.assertEqual(self.pedir("avisos").status_code, 302)
+
+    def test_etag_y_304(self):
+        etiqueta = self.pedir("tareas")["ETag"]
+        respuesta = self.pedir("tareas", If_None_Match=etiqueta)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertIn("max-age=0", respuesta["Cache-Control"])
+        # Los datos del usuario cambian: la tarjeta vuelve entera y con los datos nuevos
+        with self.captureOnCommitCallbacks(execute=True):
+            Tarea.objects.create(titulo="Leer el capítulo 3", fecha_entrega=datetime.date.today(), autor=self.ana)
+        respuesta = self.pedir("tareas", If_None_Match=etiqueta)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, "Leer el capítulo 3")
+
+
+# ---------------------- AUDIENCIAS DE AVISOS ----------------------
+
+
+@EN_MEMORIA
+class AudienciasTests(TestCase):
+    def setUp(self):
+        self.centro = School.objects.create(name="Centro", address="-", language="es")
+        self.aula = Classroom.objects.create(name="Aula 1", school=self.centro)
+        self.grupo = Group.objects.create(name="2º ESO A", classroom=self.aula)
+        self.otro_grupo = Group.objects.create(name="2º ESO B", classroom=self.aula)
+        self.clase = ClassGroup.objects.create(name="Teatro")
+        self.tutora, self.ana, self.bob = usuario("tutora"), usuario("ana"), usuario("bob")
+        self.grupo.students.add(self.ana)
+        self.otro_grupo.students.add(self.bob)
+        self.clase.members.add(self.bob)
+
+    def aviso(self, *objetivos):
+        aviso = Aviso.objects.create(titulo="Excursión", contenido="x", autor=self.tutora)
+        asignar_audiencias(aviso, objetivos)
+        return aviso
+
+    def test_indice_de_pertenencias(self):
+        self.assertEqual(
+            set(MiembroAudiencia.objects.filter(user=self.ana).values_list("tipo", "objeto_id")),
+            {("grupo", self.grupo.pk), ("aula", self.aula.pk), ("centro", self.centro.pk)},
+        )
+        self.grupo.students.remove(self.ana)
+        self.assertFalse(MiembroAudiencia.objects.filter(user=self.ana).exists())
+
+    def test_recibidos_por_cada_audiencia(self):
+        por_grupo = self.aviso(("grupo", self.grupo.pk))
+        por_aula = self.aviso(("aula", self.aula.pk))
+        por_centro = self.aviso(("centro", self.centro.pk))
+        por_clase = self.aviso(("clase", self.clase.pk))
+        self.assertEqual(set(avisos_recibidos(self.ana)), {por_grupo, por_aula, por_centro})
+        self.assertEqual(set(avisos_recibidos(self.bob)), {por_aula, por_centro, por_clase})
+        self.assertEqual(avisos_visibles(self.tutora).count(), 4)
+
+    def test_directos_y_por_audiencia_sin_repetir(self):
+        aviso = self.aviso(("grupo", self.grupo.pk), ("aula", self.aula.pk))
+        aviso.destinatarios.add(self.ana)
+        self.assertEqual(list(avisos_visibles(self.ana)), [aviso])
+
+    def test_notifica_una_vez_a_los_nuevos_miembros(self):
+        aviso = Aviso.objects.create(titulo="Excursión", contenido="x", autor=self.tutora)
+        aviso.destinatarios.add(self.ana)
+        self.assertEqual(asignar_audiencias(aviso, [("grupo", self.grupo.pk)]), 0)
+        self.assertEqual(asignar_audiencias(aviso, [("grupo", self.grupo.pk), ("aula", self.aula.pk)]), 1)
+        self.assertEqual(Notification.objects.filter(clave=f"aviso:{aviso.pk}").count(), 2)
+
+    def test_cambiar_de_aula_reindexa(self):
+        otra_aula = Classroom.objects.create(name="Aula 2", school=self.centro)
+        aviso = self.aviso(("aula", otra_aula.pk))
+        self.grupo.classroom = otra_aula
+        self.grupo.save()
+        self.assertEqual(list(avisos_recibidos(self.ana)), [aviso])
+
+    def test_formulario_pide_alguna_audiencia(self):
+        datos = {"titulo": "Excursión", "contenido": "x"}
+        self.assertFalse(AvisoForm(datos).is_valid())
+        formulario = AvisoForm({**datos, "grupos": [self.grupo.pk]})
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        self.assertEqual(formulario.audiencias(), [("grupo", self.grupo.pk)])
+
+
+# ---------------------- DIRECTORIO DE CONTACTOS ----------------------
+
+
+class DirectorioTests(TestCase):
+    def setUp(self):
+        self.directorio = Directorio([
+            (1, "jperez", "José", "Pérez", "profesor"),
+            (2, "amartin", "Ana", "Martín", "padre"),
+            (3, "aprof", "Ana", "Gómez", "profesor"),
+            (4, "sinnombre", "", "", None),
+        ])
+
+    def ids(self, consulta, **kwargs):
+        return [c["id"] for c in self.directorio.buscar(consulta, **kwargs)]
+
+    def test_prefijos_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.ids("jose"), [1])
+        self.assertEqual(self.ids("PER"), [1])
+        self.assertEqual(self.ids("mart"), [2])
+
+    def test_cada_palabra_filtra(self):
+        self.assertEqual(self.ids("ana"), [3, 2])
+        self.assertEqual(self.ids("ana prof"), [3])
+        self.assertEqual(self.ids("ana padre"), [2])
+        self.assertEqual(self.ids("ana director"), [])
+
+    def test_sin_consulta_todos_por_nombre(self):
+        self.assertEqual(self.ids("", excluir={2}), [3, 1, 4])
+        self.assertEqual(self.directorio.contactos[4]["nombre"], "sinnombre")
+
+
+@EN_MEMORIA
+class DirectorioApiTests(TestCase):
+    def setUp(self):
+        self.descartar()
+        self.addCleanup(self.descartar)
+        self.ana = usuario("ana", first_name="Ana", role="profesor")
+        for i in range(3):
+            usuario(f"familia{i}", first_name="Familia", role="padre")
+        self.descartar()
+        self.client.force_login(self.ana)
+
+    def descartar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidar_directorio()
+
+    def buscar(self, **parametros):
+        return self.client.get(reverse("dashboard:directorio"), parametros).json()
+
+    def test_pagina_y_no_se_incluye_a_si_mismo(self):
+        primera = self.buscar(q="fam", n=2)
+        self.assertEqual(len(primera["resultados"]), 2)
+        self.assertEqual(primera["siguiente"], 2)
+        segunda = self.buscar(q="fam", n=2, pagina=2)
+        self.assertEqual([c["username"] for c in segunda["resultados"]], ["familia2"])
+        self.assertIsNone(segunda["siguiente"])
+        self.assertEqual(self.buscar(q="ana")["resultados"], [])
+
+    def test_usuario_nuevo_aparece_tras_el_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario("bea", first_name="Beatriz")
+        self.assertEqual([c["username"] for c in self.buscar(q="bea")["resultados"]], ["bea"])
+
+    def test_parametros_invalidos(self):
+        self.assertEqual(self.buscar(q="fam", pagina="x")["pagina"], 1)
+
+    def test_sin_sesion(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse("dashboard:directorio")).status_code, 302)
+
+
+# ---------------------- CONVERSACIONES ----------------------
+
+
+@EN_MEMORIA
+class ConversacionesTests(TestCase):
+    def setUp(self):
+        self.ana, self.bob, self.eva = usuario("ana"), usuario("bob"), usuario("eva")
+
+    def estado(self):
+        """{(usuario, otro): (no_leidos, último mensaje)} de todas las conversaciones."""
+        return {
+            (p.usuario_id, p.otro_id): (p.no_leidos, p.conversacion.ultimo_mensaje_id)
+            for p in ParticipanteConversacion.objects.select_related("conversacion")
+        }
+
+    def test_un_hilo_por_pareja(self):
+        mensaje(self.bob, self.ana)
+        mensaje(self.ana, self.bob)
+        ultimo = mensaje(self.bob, self.ana)
+        self.assertEqual(Conversacion.objects.count(), 1)
+        self.assertEqual(self.estado(), {
+            (self.ana.pk, self.bob.pk): (2, ultimo.pk),
+            (self.bob.pk, self.ana.pk): (1, ultimo.pk),
+        })
+
+    def test_leer_resta_una_vez(self):
+        recibido = mensaje(self.bob, self.ana)
+        mensaje(self.bob, self.ana)
+        self.assertTrue(marcar_leido(recibido))
+        self.assertFalse(marcar_leido(recibido))
+        self.assertEqual(self.estado()[(self.ana.pk, self.bob.pk)][0], 1)
+        marcar_leido(recibido, leido=False)
+        self.assertEqual(self.estado()[(self.ana.pk, self.bob.pk)][0], 2)
+
+    def test_leer_la_conversacion_entera(self):
+        mensaje(self.bob, self.ana)
+        mensaje(self.bob, self.ana)
+        mensaje(self.eva, self.ana)
+        self.assertEqual(marcar_conversacion_leida(self.ana, self.bob), 2)
+        self.assertEqual(self.estado()[(self.ana.pk, self.bob.pk)][0], 0)
+        self.assertEqual(self.estado()[(self.ana.pk, self.eva.pk)][0], 1)
+        self.assertEqual(marcar_conversacion_leida(self.ana, self.bob), 0)
+
+    def test_bandeja_en_una_consulta(self):
+        mensaje(self.bob, self.ana)
+        mensaje(self.eva, self.ana)
+        with self.assertNumQueries(1):
+            hilos = [(p.otro.username, p.no_leidos, p.conversacion.ultimo_mensaje.content)
+                     for p in conversaciones_de(self.ana)]
+        self.assertEqual(hilos, [("eva", 1, "Texto"), ("bob", 1, "Texto")])
+
+    def test_recalcular_cuadra_con_lo_incremental(self):
+        mensaje(self.bob, self.ana)
+        leido = mensaje(self.ana, self.bob)
+        mensaje(self.eva, self.ana)
+        marcar_leido(leido)
+        incremental = self.estado()
+        self.assertEqual(recalcular_conversaciones(), 2)
+        self.assertEqual(self.estado(), incremental)
+
+    def test_el_relleno_de_la_migracion(self):
+        # bulk_create no lanza señales: los mensajes de antes de 0017
+        PrivateMessage.objects.bulk_create([
+            PrivateMessage(sender=self.bob, receiver=self.ana, subject="a", content="b"),
+            PrivateMessage(sender=self.ana, receiver=self.bob, subject="a", content="b", is_read=True),
+        ])
+        self.assertFalse(Conversacion.objects.exists())
+        migracion = importlib.import_module("schoolcomms.dashboard.migrations.0024_rellenar_conversaciones")
+        migracion.rellenar_conversaciones(apps, None)
+        ultimo = PrivateMessage.objects.latest("id").pk
+        self.assertEqual(self.estado(), {
+            (self.ana.pk, self.bob.pk): (1, ultimo),
+            (self.bob.pk, self.ana.pk): (0, ultimo),
+        })
+
+
+# ---------------------- WEBSOCKETS ----------------------
+
+
+@EN_MEMORIA
+class EventosConsumerTests(TestCase):
+    def setUp(self):
+        self.ana, self.bob = usuario("ana"), usuario("bob")
+
+    async def conectar(self, user):
+        # ApplicationCommunicator de asgiref: channels.testing necesita daphne
+        scope = {"type": "websocket", "path": "/ws/eventos/", "headers": [], "subprotocols": [], "user": user}
+        comunicador = ApplicationCommunicator(URLRouter(websocket_urlpatterns), scope)
+        await comunicador.send_input({"type": "websocket.connect"})
+        return comunicador, await comunicador.receive_output()
+
+    def test_sin_sesion_se_rechaza(self):
+        async def probar():
+            _, respuesta = await self.conectar(AnonymousUser())
+            return respuesta["type"], respuesta["code"]
+
+        self.assertEqual(async_to_sync(probar)(), ("websocket.close", 4401))
+
+    def test_recibe_los_eventos_de_su_grupo(self):
+        notificacion = {"id": 1, "titulo": "Hola"}
+
+        async def probar():
+            comunicador, respuesta = await self.conectar(self.ana)
+            self.assertEqual(respuesta["type"], "websocket.accept")
+            capa = get_channel_layer()
+            for user, datos in ((self.bob, {"id": 0}), (self.ana, notificacion)):
+                evento = {"type": "evento.notificacion", "notificacion": datos}
+                await capa.group_send(tiempo_real.grupo_usuario(user.pk), evento)
+            recibido = await comunicador.receive_output()
+            # Lo del grupo de otro usuario no llega
+            self.assertTrue(await comunicador.receive_nothing())
+            await comunicador.send_input({"type": "websocket.disconnect", "code": 1000})
+            await comunicador.wait()
+            return json.loads(recibido["text"])
+
+        self.assertEqual(async_to_sync(probar)(), {"tipo": "notificacion", "notificacion": notificacion})
+
+    def test_un_mensaje_se_publica_a_los_dos_tras_el_commit(self):
+        capa = get_channel_layer()
+        canales = {}
+        for user in (self.ana, self.bob):
+            canales[user.pk] = async_to_sync(capa.new_channel)()
+            async_to_sync(capa.group_add)(tiempo_real.grupo_usuario(user.pk), canales[user.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            enviado = mensaje(self.ana, self.bob)
+        # Al destinatario le llega además la notificación del mensaje
+        esperados = {self.ana.pk: ["evento.mensaje"], self.bob.pk: ["evento.mensaje", "evento.notificacion"]}
+        for user_id, canal in canales.items():
+            eventos = [async_to_sync(capa.receive)(canal) for _ in esperados[user_id]]
+            self.assertEqual(sorted(e["type"] for e in eventos), esperados[user_id])
+            mensaje_recibido, = [e["mensaje"] for e in eventos if e["type"] == "evento.mensaje"]
+            self.assertEqual(mensaje_recibido["id"], enviado.pk)
+
+
+# ---------------------- SSE DE NOTIFICACIONES ----------------------
+
+
+@EN_MEMORIA
+class NotificacionesSSETests(TestCase):
+    def setUp(self):
+        self.ana = usuario("ana")
+        self.client.force_login(self.ana)
+        self.primera = self.notificar("Primera")
+
+    def notificar(self, titulo):
+        return Notification.objects.create(user=self.ana, titulo=titulo)
+
+    def ids(self, cuerpo):
+        return [int(linea[4:]) for linea in cuerpo.splitlines() if linea.startswith("id: ")]
+
+    def pedir(self, **cabeceras):
+        return self.client.get(reverse("dashboard:notificaciones_stream"), headers=cabeceras)
+
+    def test_wsgi_sin_last_event_id_solo_lo_nuevo(self):
+        respuesta = self.pedir()
+        self.assertEqual(respuesta["Content-Type"], "text/event-stream")
+        self.assertEqual(respuesta["Cache-Control"], "no-cache")
+        cuerpo = respuesta.content.decode()
+        self.assertTrue(cuerpo.startswith(f"retry: {tiempo_real.RECONEXION_WSGI}\n"))
+        self.assertEqual(self.ids(cuerpo), [self.primera.pk])
+        self.assertNotIn("event: notificacion", cuerpo)
+
+    def test_wsgi_continua_desde_last_event_id(self):
+        segunda, tercera = self.notificar("Segunda"), self.notificar("Tercera")
+        cuerpo = self.pedir(Last_Event_ID=str(self.primera.pk)).content.decode()
+        self.assertEqual(self.ids(cuerpo), [self.primera.pk, segunda.pk, tercera.pk])
+        self.assertIn('"titulo": "Tercera"', cuerpo)
+        # Lo de otros usuarios no sale
+        Notification.objects.create(user=usuario("bob"), titulo="Ajena")
+        self.assertEqual(self.ids(self.pedir(Last_Event_ID=str(tercera.pk)).content.decode()), [tercera.pk])
+
+    @mock.patch.object(tiempo_real, "LOTE_SSE", 1)
+    def test_wsgi_con_mas_de_un_lote_vuelve_enseguida(self):
+        self.notificar("Segunda")
+        cuerpo = self.pedir(Last_Event_ID="0").content.decode()
+        self.assertTrue(cuerpo.startswith("retry: 100\n"))
+        self.assertEqual(self.ids(cuerpo), [0, self.primera.pk])
+
+    def test_asgi_despierta_con_el_grupo_del_usuario(self):
+        async def probar():
+            flujo = tiempo_real.flujo_notificaciones(self.ana.pk)
+            cabecera = await anext(flujo)
+            siguiente = asyncio.ensure_future(anext(flujo))
+            # Consulta, no hay nada y se queda esperando en la capa
+            await asyncio.sleep(0.2)
+            self.assertFalse(siguiente.done())
+            nueva = await sync_to_async(self.notificar)("Nueva")
+            capa = get_channel_layer()
+            await capa.group_send(tiempo_real.grupo_usuario(self.ana.pk), tiempo_real.evento_notificacion(nueva))
+            evento = await asyncio.wait_for(siguiente, 5)
+            await flujo.aclose()
+            return cabecera, evento, nueva.pk
+
+        cabecera, evento, nueva = async_to_sync(probar)()
+        self.assertEqual(self.ids(cabecera), [self.primera.pk])
+        self.assertEqual(self.ids(evento), [nueva])
+
+    @mock.patch.object(tiempo_real, "LATIDO_SSE", 0.01)
+    def test_asgi_latido_sin_novedades(self):
+        async def probar():
+            flujo = tiempo_real.flujo_notificaciones(self.ana.pk, desde=self.primera.pk)
+            eventos = [await anext(flujo), await anext(flujo)]
+            await flujo.aclose()
+            return eventos
+
+        self.assertEqual(async_to_sync(probar)()[1], ": latido\n\n")
+
+
+# ---------------------- BÚSQUEDA DE MENSAJES ----------------------
+
+
+class BusquedaMensajesTests(TestCase):
+    def setUp(self):
+        self.ana, self.bob, self.eva = usuario("ana"), usuario("bob"), usuario("eva")
+
+    def escribir(self, sender, receiver, asunto, contenido):
+        return PrivateMessage.objects.create(sender=sender, receiver=receiver, subject=asunto, content=contenido)
+
+    def buscar(self, consulta, user=None, **kwargs):
+        resultados, _ = busqueda.buscar_mensajes(user or self.ana, consulta, **kwargs)
+        return [m.pk for m in resultados]
+
+    def test_por_relevancia_y_solo_lo_suyo(self):
+        en_contenido = self.escribir(self.bob, self.ana, "Recordatorio", "Mañana es la excursión al museo")
+        en_asunto = self.escribir(self.ana, self.bob, "Excursión al museo", "Traed almuerzo")
+        self.escribir(self.bob, self.eva, "Excursión", "Otra familia")
+        # Sin tildes ni mayúsculas y por prefijo; el asunto pesa más
+        self.assertEqual(self.buscar("EXCURSION mus"), [en_asunto.pk, en_contenido.pk])
+        self.assertEqual(self.buscar("excursion almuerzo"), [en_asunto.pk])
+
+    def test_tambien_los_archivados(self):
+        MensajeArchivado.objects.create(id=10_000, sender=self.bob, receiver=self.ana, subject="Boletín",
+                                        content="Notas del trimestre", created_at=timezone.now())
+        resultados, _ = busqueda.buscar_mensajes(self.ana, "trimestre")
+        self.assertEqual([(m.pk, m.en_archivo) for m in resultados], [(10_000, True)])
+
+    def test_el_indice_sigue_a_las_escrituras(self):
+        escrito = self.escribir(self.bob, self.ana, "Reunión", "El martes")
+        escrito.content = "El jueves"
+        escrito.save()
+        self.assertEqual(self.buscar("martes"), [])
+        self.assertEqual(self.buscar("jueves"), [escrito.pk])
+        escrito.delete()
+        self.assertEqual(self.buscar("jueves"), [])
+
+    def test_pagina(self):
+        for i in range(3):
+            self.escribir(self.bob, self.ana, f"Aviso {i}", "Comedor")
+        primera, hay_siguiente = busqueda.buscar_mensajes(self.ana, "comedor", tamano=2)
+        self.assertTrue(hay_siguiente)
+        segunda, hay_siguiente = busqueda.buscar_mensajes(self.ana, "comedor", pagina=2, tamano=2)
+        self.assertFalse(hay_siguiente)
+        self.assertEqual(len({m.pk for m in primera + segunda}), 3)
+
+    def test_la_consulta_no_es_sintaxis_fts(self):
+        self.escribir(self.bob, self.ana, "Hola", "Hola")
+        self.assertEqual(len(self.buscar('"hola*')), 1)
+        # OR es una palabra más, no el operador
+        self.assertEqual(self.buscar("hola OR adiós"), [])
+        self.assertEqual(self.buscar("¿?"), [])
+
+    def test_resalta_escapando(self):
+        self.escribir(self.bob, self.ana, "<b>Aviso</b>", "<script>alert(1)</script> importante")
+        resultado, = busqueda.buscar_mensajes(self.ana, "importante")[0]
+        self.assertEqual(resultado.asunto_resaltado, "&lt;b&gt;Aviso&lt;/b&gt;")
+        self.assertIn("&lt;script&gt;", resultado.fragmento)
+        self.assertIn("<mark>importante</mark>", resultado.fragmento)
+
+    def test_otros_motores_sin_indice(self):
+        buscado = self.escribir(self.bob, self.ana, "Excursión", "Museo")
+        self.escribir(self.bob, self.eva, "Excursión", "Museo")
+        filas = busqueda._buscar_generico(self.ana.pk, ["museo"], 10, 0)
+        self.assertEqual([(fuente, pk) for fuente, pk, *_ in filas], [(0, buscado.pk)])
+
+    def test_vista(self):
+        self.escribir(self.bob, self.ana, "Excursión", "Museo")
+        self.client.force_login(self.ana)
+        respuesta = self.client.get(reverse("dashboard:buscar_mensajes"), {"q": "museo", "pagina": "x"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.context["resultados"]), 1)
+
+
+# ---------------------- ARCHIVO ----------------------
+
+
+@EN_MEMORIA
+class ArchivoTests(AlmacenTemporalMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ana, self.bob = usuario("ana"), usuario("bob")
+        self.corte = timezone.now()
+
+    def antiguo(self, sender, receiver, leido=True):
+        escrito = mensaje(sender, receiver, is_read=leido)
+        PrivateMessage.objects.filter(pk=escrito.pk).update(created_at=self.corte - datetime.timedelta(days=400))
+        return escrito
+
+    def archivados(self):
+        return set(MensajeArchivado.objects.values_list("id", flat=True))
+
+    def test_mueve_lo_leido_y_deja_lo_que_se_ve(self):
+        leidos = [self.antiguo(self.bob, self.ana) for _ in range(3)]
+        no_leido = self.antiguo(self.bob, self.ana, leido=False)
+        con_adjunto = self.antiguo(self.ana, self.bob)
+        self.adjuntar(mensaje=con_adjunto, usuario=self.ana)
+        ultimo = self.antiguo(self.ana, self.bob)
+        no_leidos = dict(ParticipanteConversacion.objects.values_list("usuario_id", "no_leidos"))
+
+        self.assertEqual(archivo.archivar(self.corte, lote=2)[0], 3)
+        self.assertEqual(self.archivados(), {m.pk for m in leidos})
+        self.assertEqual(set(PrivateMessage.objects.values_list("id", flat=True)),
+                         {no_leido.pk, con_adjunto.pk, ultimo.pk})
+        # Mudar no es borrar: ni conversación ni contadores cambian
+        self.assertEqual(dict(ParticipanteConversacion.objects.values_list("usuario_id", "no_leidos")), no_leidos)
+        self.assertEqual(Conversacion.objects.get().ultimo_mensaje_id, ultimo.pk)
+
+    def test_lo_reciente_se_queda(self):
+        mensaje(self.bob, self.ana, is_read=True)
+        mensaje(self.ana, self.bob, is_read=True)
+        self.assertEqual(archivo.archivar(self.corte - datetime.timedelta(days=1)), (0, 0))
+
+    def test_notificaciones(self):
+        escrito = self.antiguo(self.bob, self.ana)
+        self.antiguo(self.ana, self.bob)
+        notificacion = Notification.objects.get(mensaje=escrito)
+        pendiente = Notification.objects.create(user=self.ana, titulo="Pendiente", leida=True)
+        Notification.objects.filter(pk=notificacion.pk).update(leida=True, envio_pendiente=False)
+        Notification.objects.update(creado=self.corte - datetime.timedelta(days=400))
+
+        archivo.archivar(self.corte)
+        # La que aún tiene envíos pendientes se queda en caliente
+        self.assertEqual(list(Notification.objects.filter(user=self.ana)), [pendiente])
+        self.assertEqual(NotificacionArchivada.objects.get(pk=notificacion.pk).mensaje_id, escrito.pk)
+
+    def test_el_detalle_lee_del_archivo(self):
+        escrito = self.antiguo(self.bob, self.ana)
+        self.antiguo(self.ana, self.bob)
+        archivo.archivar(self.corte)
+        self.assertIsInstance(archivo.obtener_mensaje(pk=escrito.pk, receiver=self.ana), MensajeArchivado)
+        # El detalle solo lo ve el destinatario, también en el archivo
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(reverse("dashboard:mensaje_detalle", args=[escrito.pk])).status_code, 404)
+
+    def test_corte_por_curso_cerrado(self):
+        self.assertIsNone(archivo.fecha_corte(cursos_cerrados=True, hoy=datetime.date(2026, 6, 1)))
+        corte = archivo.fecha_corte(cursos_cerrados=True, hoy=datetime.date(2026, 7, 1))
+        self.assertEqual(timezone.localtime(corte).date(), datetime.date(2026, 6, 20))
+
+
+# ---------------------- NOTIFICACIONES ----------------------
+
+
+@EN_MEMORIA
+class DespacharTests(TestCase):
+    def setUp(self):
+        self.ana = usuario("ana")
+        self.bob = usuario("bob")
+
+    def test_un_evento_una_notificacion_por_usuario(self):
+        self.assertEqual(notificar([self.ana.pk, self.bob.pk], "aviso:1", titulo="Hola"), 2)
+        self.assertEqual(notificar([self.ana.pk, self.bob.pk], "aviso:1", titulo="Hola"), 0)
+        self.assertEqual(Notification.objects.filter(clave="aviso:1").count(), 2)
+
+    def test_la_base_de_datos_impide_duplicados(self):
+        Notification.objects.create(user=self.ana, clave="aviso:1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Notification.objects.create(user=self.ana, clave="aviso:1")
+        # Sin clave (notificaciones antiguas) no hay restricción
+        Notification.objects.create(user=self.ana)
+        Notification.objects.create(user=self.ana)
+
+    def test_reintenta_si_otra_peticion_inserta_entre_medias(self):
+        Notification.objects.create(user=self.ana, clave="aviso:1")
+        real = notificaciones._existentes
+        llamadas = []
+
+        def carrera(lote):
+            # La primera consulta no ve la fila de ana: el INSERT choca con la restricción
+            llamadas.append(lote)
+            return set() if len(llamadas) == 1 else real(lote)
+
+        with mock.patch.object(notificaciones, "_existentes", side_effect=carrera):
+            creadas = despachar(Notification(user_id=u.pk, clave="aviso:1") for u in (self.ana, self.bob))
+
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual([n.user_id for n in creadas], [self.bob.pk])
+        self.assertEqual(Notification.objects.filter(clave="aviso:1").count(), 2)
+
+    def test_un_segundo_choque_no_deshace_los_lotes_anteriores(self):
+        carlos, dani = usuario("carlos"), usuario("dani")
+        Notification.objects.create(user=self.ana, clave="aviso:1")
+        destinatarios = [carlos, dani, self.ana, self.bob]
+        # _existentes nunca ve la fila de ana: chocan el lote y también el reintento
+        with mock.patch.object(notificaciones, "_existentes", return_value=set()), \
+                mock.patch.object(notificaciones, "TAMANO_LOTE", 2):
+            creadas = despachar(Notification(user_id=u.pk, clave="aviso:1") for u in destinatarios)
+
+        self.assertEqual({n.user_id for n in creadas}, {carlos.pk, dani.pk, self.bob.pk})
+        self.assertEqual(Notification.objects.filter(clave="aviso:1").count(), 4)
+
+    def test_el_mensaje_notifica_una_sola_vez(self):
+        m = mensaje(self.ana, self.bob)
+        notificaciones.notificar_mensaje(m)
+        self.assertEqual(Notification.objects.filter(user=self.bob, mensaje=m).count(), 1)
+
+
+# ---------------------- OPERACIONES MASIVAS ----------------------
+
+
+@EN_MEMORIA
+class OperacionMensajesTests(TestCase):
+    def setUp(self):
+        self.ana = usuario("ana")
+        self.bob = usuario("bob")
+        self.eva = usuario("eva")
+        self.recibido = mensaje(self.bob, self.ana)
+        self.enviado = mensaje(self.ana, self.bob)
+        self.ajeno = mensaje(self.bob, self.eva)
+        self.client.force_login(self.ana)
+
+    def operar(self, **datos):
+        return self.client.post(reverse("dashboard:operacion_mensajes"), datos, content_type="application/json")
+
+    def test_ids_ajenos_no_se_tocan(self):
+        ids = [self.recibido.pk, self.enviado.pk, self.ajeno.pk]
+        respuesta = self.operar(accion="leer", ids=ids)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["afectados"], 1)
+        self.assertFalse(PrivateMessage.objects.get(pk=self.enviado.pk).is_read)
+        self.assertFalse(PrivateMessage.objects.get(pk=self.ajeno.pk).is_read)
+
+    def test_eliminar_por_remitente_solo_borra_lo_recibido(self):
+        respuesta = self.operar(accion="eliminar", remitente=self.bob.pk)
+        self.assertEqual(respuesta.json()["afectados"], 1)
+        self.assertFalse(PrivateMessage.objects.filter(pk=self.recibido.pk).exists())
+        self.assertTrue(PrivateMessage.objects.filter(pk=self.enviado.pk).exists())
+        self.assertTrue(PrivateMessage.objects.filter(pk=self.ajeno.pk).exists())
+        self.assertTrue(Notification.objects.filter(user=self.eva, mensaje=self.ajeno).exists())
+
+    def test_archivar_por_fecha_no_alcanza_a_otros(self):
+        manana = (timezone.now() + datetime.timedelta(days=1)).isoformat()
+        self.operar(accion="archivar", antes=manana)
+        self.assertTrue(PrivateMessage.objects.get(pk=self.recibido.pk).archivado)
+        self.assertFalse(PrivateMessage.objects.get(pk=self.ajeno.pk).archivado)
+
+    def test_sin_seleccion_es_un_error(self):
+        self.assertEqual(self.operar(accion="leer").status_code, 400)
+
+
+# ---------------------- CURSORES ----------------------
+
+
+def _b64(texto):
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+MANIPULADOS = ["!!!", "xyz", _b64("no-es-un-cursor"), _b64("2024-01-01|abc"), _b64("a|b|c"), "é"]
+
+
+@EN_MEMORIA
+class CursorTests(TestCase):
+    def setUp(self):
+        self.ana = usuario("ana")
+        self.bob = usuario("bob")
+        self.eva = usuario("eva")
+        self.client.force_login(self.ana)
+
+    def test_cursor_manipulado_no_se_decodifica(self):
+        for cursor in MANIPULADOS:
+            self.assertIsNone(decodificar_cursor(cursor), cursor)
+
+    def test_feed_con_cursor_manipulado_da_la_primera_pagina(self):
+        avisos = [Aviso.objects.create(titulo=f"a{i}", contenido="c", autor=self.ana) for i in range(3)]
+        primera = self.client.get(reverse("dashboard:avisos_feed")).json()
+        for cursor in MANIPULADOS:
+            respuesta = self.client.get(reverse("dashboard:avisos_feed"), {"cursor": cursor})
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual(respuesta.json(), primera)
+        self.assertEqual({a["id"] for a in primera["avisos"]}, {a.pk for a in avisos})
+
+    def test_feed_recorre_todas_las_paginas(self):
+        propios = [Aviso.objects.create(titulo=f"a{i}", contenido="c", autor=self.ana) for i in range(3)]
+        recibido = Aviso.objects.create(titulo="r", contenido="c", autor=self.bob)
+        recibido.destinatarios.add(self.ana)
+        Aviso.objects.create(titulo="ajeno", contenido="c", autor=self.bob)
+        # Misma fecha en dos: el id desempata sin repetir ni saltar
+        Aviso.objects.filter(pk__in=[propios[0].pk, propios[1].pk]).update(fecha_publicacion=timezone.now())
+        vistos, parametros = [], {"n": 2}
+        while True:
+            pagina = self.client.get(reverse("dashboard:avisos_feed"), parametros).json()
+            vistos += [a["id"] for a in pagina["avisos"]]
+            if not pagina["siguiente"]:
+                break
+            parametros["cursor"] = pagina["siguiente"]
+        esperados = Aviso.objects.filter(pk__in=[*[a.pk for a in propios], recibido.pk])
+        self.assertEqual(vistos, list(esperados.order_by("-fecha_publicacion", "-id").values_list("id", flat=True)))
+
+    def test_cursor_falsificado_no_muestra_avisos_ajenos(self):
+        propio = Aviso.objects.create(titulo="propio", contenido="c", autor=self.ana)
+        ajeno = Aviso.objects.create(titulo="ajeno", contenido="c", autor=self.bob)
+        ajeno.destinatarios.add(self.eva)
+        futuro = codificar_cursor(timezone.now() + datetime.timedelta(days=365), 10 ** 9)
+        ids = [a["id"] for a in self.client.get(reverse("dashboard:avisos_feed"), {"cursor": futuro}).json()["avisos"]]
+        self.assertEqual(ids, [propio.pk])
+
+    def test_historial_hacia_atras_y_nuevos(self):
+        url = reverse("dashboard:conversacion_api", args=[self.bob.pk])
+        antiguo = timezone.now() - datetime.timedelta(days=400)
+        MensajeArchivado.objects.create(id=10_000, sender=self.bob, receiver=self.ana, subject="a", content="b",
+                                        created_at=antiguo)
+        escritos = [mensaje(self.bob, self.ana) if i % 2 else mensaje(self.ana, self.bob) for i in range(4)]
+
+        ultima = self.client.get(url, {"n": 3}).json()
+        self.assertEqual([m["id"] for m in ultima["mensajes"]], [m.pk for m in escritos[1:]])
+        self.assertEqual([m["propio"] for m in ultima["mensajes"]], [False, True, False])
+        # Hacia atrás se sigue por el archivo
+        anterior = self.client.get(url, {"n": 3, "antes": ultima["anteriores"]}).json()
+        self.assertEqual([m["id"] for m in anterior["mensajes"]], [10_000, escritos[0].pk])
+        self.assertIsNone(anterior["anteriores"])
+
+        nuevo = mensaje(self.bob, self.ana)
+        nuevos = self.client.get(url, {"despues": ultima["ultimo"]}).json()
+        self.assertEqual([m["id"] for m in nuevos["mensajes"]], [nuevo.pk])
+        # Sin novedades se devuelve el mismo cursor para volver a preguntar
+        vacio = self.client.get(url, {"despues": nuevos["ultimo"]}).json()
+        self.assertEqual((vacio["mensajes"], vacio["ultimo"]), ([], nuevos["ultimo"]))
+
+    def test_cursor_falsificado_no_sale_de_la_conversacion(self):
+        propio = mensaje(self.bob, self.ana)
+        mensaje(self.bob, self.eva)
+        url = reverse("dashboard:conversacion_api", args=[self.bob.pk])
+        futuro = codificar_cursor(timezone.now() + datetime.timedelta(days=365), 10 ** 9)
+        pasado = codificar_cursor(timezone.now() - datetime.timedelta(days=365), 0)
+        for parametros in ({"antes": futuro}, {"despues": pasado}, {"antes": "!!!"}, {"despues": "!!!"}):
+            respuesta = self.client.get(url, parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertEqual([m["id"] for m in respuesta.json()["mensajes"]], [propio.pk], parametros)
+
+
+# ---------------------- ADJUNTOS ----------------------
+
+
+@EN_MEMORIA
+class SubidaAdjuntosTests(AlmacenTemporalMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.ana = usuario("ana")
+        self.bob = usuario("bob")
+        self.client.force_login(self.ana)
+
+    @override_settings(ADJUNTO_TAMANO_MAXIMO=10, ADJUNTOS_POR_ENVIO=1, DATA_UPLOAD_MAX_MEMORY_SIZE=100)
+    def test_subida_demasiado_grande_es_un_400(self):
+        fichero = SimpleUploadedFile("grande.pdf", b"x" * 2000, content_type="application/pdf")
+        respuesta = self.client.post(reverse("dashboard:compose_message"), {
+            "receiver": self.bob.pk, "subject": "s", "content": "c", "adjuntos": fichero,
+        })
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(PrivateMessage.objects.exists())
+
+    def test_mensaje_con_adjuntos(self):
+        ficheros = [SimpleUploadedFile(n, b"%PDF-1.4 " + n.encode(), content_type="application/pdf")
+                    for n in ("acta.pdf", "menu.pdf")]
+        respuesta = self.client.post(reverse("dashboard:compose_message"), {
+            "receiver": self.bob.pk, "subject": "s", "content": "c", "adjuntos": ficheros,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        enviado = PrivateMessage.objects.get()
+        guardados = sorted(enviado.adjuntos.values_list("nombre", "tipo", "tamano", "subido_por"))
+        self.assertEqual(guardados, [("acta.pdf", "application/pdf", 17, self.ana.pk),
+                                     ("menu.pdf", "application/pdf", 17, self.ana.pk)])
+        self.assertTrue(all(self.almacen.exists(a.archivo.name) for a in enviado.adjuntos.all()))
+
+    @override_settings(ADJUNTO_TAMANO_MAXIMO=10)
+    def test_un_fichero_demasiado_grande_invalida_el_formulario(self):
+        fichero = SimpleUploadedFile("grande.pdf", b"x" * 20, content_type="application/pdf")
+        respuesta = self.client.post(reverse("dashboard:compose_message"), {
+            "receiver": self.bob.pk, "subject": "s", "content": "c", "adjuntos": fichero,
+        })
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn("grande.pdf", str(respuesta.context["form"].errors["adjuntos"]))
+        self.assertFalse(PrivateMessage.objects.exists())
+
+    def test_los_handlers_globales_son_los_de_django(self):
+        self.assertNotIn("schoolcomms.dashboard.adjuntos.LimiteAdjuntosUploadHandler", settings.FILE_UPLOAD_HANDLERS)
+
+    def test_la_vista_de_adjuntos_sigue_comprobando_csrf(self):
+        cliente = Client(enforce_csrf_checks=True)
+        cliente.force_login(self.ana)
+        respuesta = cliente.post(reverse("dashboard:compose_message"), {"receiver": self.bob.pk, "content": "c"})
+        self.assertEqual(respuesta.status_code, 403)
+
+    def test_eliminar_mensajes_borra_adjuntos_y_ficheros(self):
+        recibido = mensaje(self.bob, self.ana)
+        adjunto = self.adjuntar(mensaje=recibido, usuario=self.bob)
+        self.assertTrue(self.almacen.exists(adjunto.archivo.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            operaciones.aplicar(self.ana, "eliminar", operaciones.seleccion(self.ana, ids=[recibido.pk]))
+        self.assertFalse(Adjunto.objects.exists())
+        self.assertFalse(self.almacen.exists(adjunto.archivo.name))
+
+
+@EN_MEMORIA
+class DescargaAdjuntosTests(AlmacenTemporalMixin, TestCase):
+    CONTENIDO = b"%PDF-1.4 acta de la reunion"
+
+    def setUp(self):
+        super().setUp()
+        self.ana, self.bob, self.eva = usuario("ana"), usuario("bob"), usuario("eva")
+        self.adjunto = self.adjuntar(contenido=self.CONTENIDO, mensaje=mensaje(self.bob, self.ana), usuario=self.bob)
+        self.client.force_login(self.ana)
+
+    def descargar(self, adjunto=None, datos=None, **cabeceras):
+        url = reverse("dashboard:descargar_adjunto", args=[(adjunto or self.adjunto).pk])
+        return self.client.get(url, datos, headers=cabeceras)
+
+    def test_las_partes_del_mensaje(self):
+        respuesta = self.descargar()
+        self.assertEqual(b"".join(respuesta.streaming_content), self.CONTENIDO)
+        self.assertEqual(respuesta["Content-Disposition"], 'inline; filename="acta.pdf"')
+        self.assertEqual(respuesta["Accept-Ranges"], "bytes")
+        self.client.force_login(self.bob)
+        self.assertEqual(self.descargar().status_code, 200)
+
+    def test_los_demas_ven_un_404(self):
+        self.client.force_login(self.eva)
+        self.assertEqual(self.descargar().status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.descargar().status_code, 302)
+
+    def test_adjunto_de_un_aviso_por_audiencia(self):
+        grupo = Group.objects.create(name="1ºA", classroom=Classroom.objects.create(
+            name="Aula 1", school=School.objects.create(name="Centro", address="-", language="es")))
+        grupo.students.add(self.eva)
+        aviso = Aviso.objects.create(titulo="Excursión", contenido="x", autor=self.bob)
+        asignar_audiencias(aviso, [("grupo", grupo.pk)])
+        del_aviso = self.adjuntar("circular.pdf", aviso=aviso, usuario=self.bob)
+        self.assertEqual(self.descargar(del_aviso).status_code, 404)
+        self.client.force_login(self.eva)
+        self.assertEqual(self.descargar(del_aviso).status_code, 200)
+
+    def test_rangos(self):
+        respuesta = self.descargar(Range="bytes=0-3")
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(b"".join(respuesta.streaming_content), b"%PDF")
+        self.assertEqual(respuesta["Content-Range"], f"bytes 0-3/{len(self.CONTENIDO)}")
+        sufijo = self.descargar(Range="bytes=-7")
+        self.assertEqual(b"".join(sufijo.streaming_content), b"reunion")
+
+    def test_rango_imposible_es_un_416(self):
+        respuesta = self.descargar(Range=f"bytes={len(self.CONTENIDO)}-")
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta["Content-Range"], f"bytes */{len(self.CONTENIDO)}")
+
+    def test_if_range_de_otra_version_lo_envia_entero(self):
+        self.assertEqual(self.descargar(Range="bytes=0-3", If_Range='"otro"').status_code, 200)
+        self.assertEqual(self.descargar(Range="bytes=0-3", If_Range=self.descargar()["ETag"]).status_code, 206)
+
+    def test_forzar_descarga_y_tipos_que_no_se_muestran(self):
+        self.assertTrue(self.descargar(datos={"descargar": 1})["Content-Disposition"].startswith("attachment"))
+        hoja = self.adjuntar("notas.xlsx", b"PK", mensaje=self.adjunto.mensaje, usuario=self.bob)
+        self.assertTrue(self.descargar(hoja)["Content-Disposition"].startswith("attachment"))
+
+    @override_settings(ADJUNTOS_SERVIDOR="nginx")
+    def test_con_nginx_lo_envia_el_servidor(self):
+        respuesta = self.descargar()
+        self.assertEqual(respuesta["X-Accel-Redirect"], "/adjuntos-internos/" + self.adjunto.archivo.name)
+        self.assertEqual(respuesta.content, b"")
+
+
+# ---------------------- RESÚMENES DE ASISTENCIA ----------------------
+
+
+@EN_MEMORIA
+class ResumenAsistenciaTests(TestCase):
+    def setUp(self):
+        centro = School.objects.create(name="Centro", address="-", language="es")
+        self.grupo = Group.objects.create(name="1ºA", classroom=Classroom.objects.create(name="Aula 1", school=centro))
+        self.alumno = usuario("alumno")
+        self.grupo.students.add(self.alumno)
+
+    def resumenes(self):
+        return (
+            sorted(ResumenAsistenciaAlumno.objects.values_list("alumno_id", "trimestre", "presentes", "ausentes")),
+            sorted(ResumenAsistenciaGrupo.objects.values_list("grupo_id", "trimestre", "presentes", "ausentes")),
+            sorted(AsistenciaDiariaGrupo.objects.values_list("grupo_id", "fecha", "presentes", "ausentes")),
+        )
+
+    def test_cada_registro_suma_en_su_trimestre(self):
+        Asistencia.objects.create(alumno=self.alumno, fecha=LECTIVO_T1)
+        Asistencia.objects.create(alumno=self.alumno, fecha=LECTIVO_T2, estado="ausente")
+        alumnos, grupos, diarios = self.resumenes()
+        self.assertEqual(alumnos, [(self.alumno.pk, 1, 1, 0), (self.alumno.pk, 2, 0, 1)])
+        self.assertEqual(grupos, [(self.grupo.pk, 1, 1, 0), (self.grupo.pk, 2, 0, 1)])
+        self.assertEqual(diarios, [(self.grupo.pk, LECTIVO_T1, 1, 0), (self.grupo.pk, LECTIVO_T2, 0, 1)])
+        self.assertEqual(totales_alumno(self.alumno, LECTIVO_T2, trimestre=2)["ausentes"], 1)
+        self.assertEqual(totales_grupo(self.grupo, LECTIVO_T2)["presentes"], 1)
+
+    def test_los_dias_no_lectivos_no_cuentan(self):
+        Asistencia.objects.create(alumno=self.alumno, fecha=FESTIVO)
+        Asistencia.objects.create(alumno=self.alumno, fecha=SABADO)
+        self.assertEqual(self.resumenes(), ([], [], []))
+
+    def test_cambiar_y_borrar_mueven_el_contador(self):
+        registro = Asistencia.objects.create(alumno=self.alumno, fecha=LECTIVO_T1)
+        registro.estado = "ausente"
+        registro.save()
+        self.assertEqual(self.resumenes()[0], [(self.alumno.pk, 1, 0, 1)])
+        registro.delete()
+        self.assertEqual(self.resumenes()[0], [(self.alumno.pk, 1, 0, 0)])
+
+    def test_el_relleno_de_la_migracion_cuadra_con_reconstruir(self):
+        # bulk_create no lanza señales: es lo que había antes de 0012
+        Asistencia.objects.bulk_create([
+            Asistencia(alumno=self.alumno, fecha=LECTIVO_T1),
+            Asistencia(alumno=self.alumno, fecha=LECTIVO_T2, estado="ausente"),
+            Asistencia(alumno=self.alumno, fecha=FESTIVO),
+        ])
+        self.assertEqual(self.resumenes(), ([], [], []))
+        migracion = importlib.import_module("schoolcomms.dashboard.migrations.0025_rellenar_asistencia")
+        migracion.rellenar_asistencia(apps, None)
+        rellenado = self.resumenes()
+        self.assertEqual(rellenado[0], [(self.alumno.pk, 1, 1, 0), (self.alumno.pk, 2, 0, 1)])
+        reconstruir_resumenes()
+        self.assertEqual(self.resumenes(), rellenado)
+
+
+# ---------------------- CONTADORES ----------------------
+
+
+@EN_MEMORIA
+class ContadoresTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.ana, self.bob = usuario("ana"), usuario("bob")
+
+    def leer(self, ventana_pasada=True):
+        valor = contadores.obtener_contadores(self.ana.pk)["mensajes"]
+        if ventana_pasada:
+            cache.delete_many([contadores._marca(campo, self.ana.pk) for campo in contadores.CAMPOS])
+        return valor
+
+    def guardado(self):
+        return cache.get(contadores._clave("mensajes", self.ana.pk))
+
+    def test_suma_y_resta_tras_el_commit(self):
+        self.assertEqual(self.leer(), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            primero = mensaje(self.bob, self.ana)
+            mensaje(self.bob, self.ana)
+            # Hasta el commit no se toca
+            self.assertEqual(self.guardado(), 0)
+        self.assertEqual(self.guardado(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            marcar_leido(primero)
+        self.assertEqual(self.guardado(), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.leer(), 1)
+
+    def test_sin_clave_se_recuenta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            mensaje(self.bob, self.ana)
+        self.assertIsNone(self.guardado())
+        self.assertEqual(self.leer(), 1)
+
+    def test_un_recuento_entre_el_commit_y_el_on_commit_no_cuenta_dos_veces(self):
+        self.assertEqual(self.leer(), 0)
+        cache.clear()
+        with self.captureOnCommitCallbacks() as pendientes:
+            mensaje(self.bob, self.ana)
+        # Otra petición lee antes de que corra el on_commit: su COUNT ya ve el mensaje
+        self.assertEqual(self.leer(ventana_pasada=False), 1)
+        for pendiente in pendientes:
+            pendiente()
+        self.assertIsNone(self.guardado())
+        self.assertEqual(self.leer(), 1)
+
+    def test_nunca_negativo(self):
+        cache.set(contadores._clave("mensajes", self.ana.pk), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            contadores.sumar("mensajes", self.ana.pk, -1)
+        self.assertIsNone(self.guardado())
+
+    def test_context_processor_perezoso(self):
+        peticion = mock.Mock(user=AnonymousUser())
+        self.assertEqual(context_processors.contadores(peticion), {})
+        peticion.user = self.ana
+        with self.assertNumQueries(0):
+            perezoso = context_processors.contadores(peticion)["contadores"]
+        self.assertEqual(perezoso["mensajes"], 0)
+
+    def test_invalidar(self):
+        self.assertEqual(self.leer(), 0)
+        PrivateMessage.objects.bulk_create([PrivateMessage(sender=self.bob, receiver=self.ana, content="x")])
+        with self.captureOnCommitCallbacks(execute=True):
+            contadores.invalidar_contadores([self.ana.pk])
+        self.assertEqual(self.leer(), 1)
+
+
+# ---------------------- TIEMPO REAL ----------------------
+
+
+@EN_MEMORIA
+@override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+class PublicarNotificacionesTests(TestCase):
+    def setUp(self):
+        self.usuarios = [usuario(f"familia{i}") for i in range(3)]
+        self.capa = get_channel_layer()
+        self.canal = async_to_sync(self.capa.new_channel)()
+        async_to_sync(self.capa.group_add)(tiempo_real.grupo_usuario(self.usuarios[0].pk), self.canal)
+
+    def recibido(self):
+        return async_to_sync(self.capa.receive)(self.canal)
+
+    def test_un_reparto_pequeno_se_publica_en_la_peticion(self):
+        with mock.patch("schoolcomms.dashboard.tasks.publicar_notificaciones.delay") as tarea, \
+                self.captureOnCommitCallbacks(execute=True):
+            notificar([u.pk for u in self.usuarios], "aviso:1", titulo="Hola")
+        tarea.assert_not_called()
+        self.assertEqual(self.recibido()["notificacion"]["titulo"], "Hola")
+
+    @mock.patch.object(tiempo_real, "PUBLICAR_EN_LINEA", 2)
+    def test_un_reparto_grande_va_a_celery_con_los_ids(self):
+        with mock.patch("schoolcomms.dashboard.tasks.publicar_notificaciones.delay") as tarea, \
+                self.captureOnCommitCallbacks(execute=True):
+            notificar([u.pk for u in self.usuarios], "aviso:1", titulo="Hola")
+        ids, = tarea.call_args.args
+        self.assertEqual(sorted(ids), sorted(Notification.objects.values_list("id", flat=True)))
+
+    @mock.patch.object(tiempo_real, "PUBLICAR_EN_LINEA", 2)
+    @mock.patch.object(tiempo_real, "LOTE_PUBLICACION", 2)
+    def test_el_worker_publica_por_lotes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            notificar([u.pk for u in self.usuarios], "aviso:1", titulo="Hola")
+        evento = self.recibido()
+        self.assertEqual(evento["type"], "evento.notificacion")
+        self.assertEqual(evento["notificacion"]["id"], Notification.objects.get(user=self.usuarios[0]).pk)
+
+    @mock.patch.object(tiempo_real, "PUBLICAR_EN_LINEA", 2)
+    def test_sin_broker_las_notificaciones_se_guardan(self):
+        with mock.patch("schoolcomms.dashboard.tasks.publicar_notificaciones.delay", side_effect=OSError("sin broker")), \
+                self.captureOnCommitCallbacks(execute=True):
+            notificar([u.pk for u in self.usuarios], "aviso:1", titulo="Hola")
+        self.assertEqual(Notification.objects.count(), 3)
+
+
+# ---------------------- SERIE DE TAREAS COMPLETADAS ----------------------
+
+
+@EN_MEMORIA
+class SerieTareasTests(TestCase):
+    def setUp(self):
+        # Los ids se repiten entre tests y la caché en memoria no se vacía sola
+        cache.clear()
+        self.ana = usuario("ana")
+        self.client.force_login(self.ana)
+        self.url = reverse("dashboard:serie_tareas_completadas")
+
+    def completar(self, fecha, autor=None):
+        # La versión de datos del usuario cambia al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            return Tarea.objects.create(
+                titulo="t", fecha_entrega=fecha, completada=True, fecha_completado=fecha, autor=autor or self.ana,
+            )
+
+    def test_una_barra_por_dia_lectivo_con_ceros(self):
+        self.completar(LECTIVO_T1)
+        self.completar(LECTIVO_T1)
+        self.completar(datetime.date(2025, 10, 10))
+        self.completar(LECTIVO_T1, autor=usuario("bob"))
+        serie = self.client.get(self.url, {"dias": 3, "hasta": "2025-10-10"}).json()
+        # El 9 es festivo: no sale en la serie
+        self.assertEqual(serie["fechas"], ["2025-10-07", "2025-10-08", "2025-10-10"])
+        self.assertEqual(serie["values"], [0, 2, 1])
+
+    def test_304_mientras_no_cambian_los_datos(self):
+        parametros = {"dias": 3, "hasta": "2025-10-10"}
+        primera = self.client.get(self.url, parametros)
+        self.assertIn("private", primera["Cache-Control"])
+        otra = self.client.get(self.url, parametros, HTTP_IF_NONE_MATCH=primera["ETag"])
+        self.assertEqual(otra.status_code, 304)
+        self.completar(LECTIVO_T1)
+        nueva = self.client.get(self.url, parametros, HTTP_IF_NONE_MATCH=primera["ETag"])
+        self.assertEqual(nueva.status_code, 200)
+        self.assertEqual(nueva.json()["values"], [0, 1, 0])
+
+    def test_sin_sesion_redirige_al_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+# ---------------------- DASHBOARD ASÍNCRONO ----------------------
+
+
+@EN_MEMORIA
+class DashboardAsyncTests(TransactionTestCase):
+    # Las tarjetas se calculan en hilos del pool, con su propia conexión: los datos tienen que estar confirmados
+    def setUp(self):
+        cache.clear()
+        self.ana = usuario("ana")
+        self.recibido = PrivateMessage.objects.create(
+            sender=usuario("bob"), receiver=self.ana, subject="Reunión del viernes", content="c",
+        )
+        self.client.force_login(self.ana)
+
+    def test_pinta_todas_las_tarjetas_como_la_vista_completa(self):
+        completo = self.client.get(reverse("dashboard:inicio"), {"completo": 1}).content.decode()
+        asincrono = self.client.get(reverse("dashboard:inicio_async")).content.decode()
+        for html in (completo, asincrono):
+            self.assertIn(f'id="dash-msg-{self.recibido.pk}"', html)
+            self.assertIn("Reunión del viernes", html)
+            # Ninguna tarjeta se queda esperando al JavaScript
+            self.assertNotIn("data-tarjeta=", html)
+
+    def test_sin_sesion_redirige_al_login(self):
+        self.client.logout()
+        respuesta = self.client.get(reverse("dashboard:inicio_async"))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, respuesta["Location"])
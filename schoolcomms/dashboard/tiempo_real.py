@@ -0,0 +1,207 @@
+# dashboard/tiempo_real.py
+"""
+Eventos en tiempo real (mensajes y notificaciones) por la capa de Channels.
+
+Cada usuario conectado está en su propio grupo ("usuario.<id>"): publicar a
+un usuario es un group_send, da igual cuántas pestañas tenga abiertas. Se
+publica tras el commit, para que el cliente nunca reciba algo que luego no
+está en la base de datos, y sin romper la escritura si la capa no responde.
+Los envíos van concurrentes en un solo bucle de eventos, y un reparto grande
+(un aviso a todo el centro) no se publica en la petición: se pasan los ids a
+Celery y el worker los carga y publica por lotes.
+
+Para quien no use WebSockets hay un flujo SSE de notificaciones que se
+suscribe al mismo grupo: la conexión duerme hasta que llega un evento y solo
+entonces consulta la tabla (nada de sondear). Solo con ASGI: con WSGI cada
+conexión abierta ocuparía un hilo y la capa no se puede esperar desde un
+bucle de eventos por petición, así que se responde con lo pendiente y se
+cierra; EventSource reconecta tras `retry` con Last-Event-ID.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+
+def grupo_usuario(user_id):
+    return f"usuario.{user_id}"
+
+
+def datos_mensaje(mensaje):
+    return {
+        "id": mensaje.id,
+        "remitente_id": mensaje.sender_id,
+        "destinatario_id": mensaje.receiver_id,
+        "remitente": mensaje.sender.get_full_name() or mensaje.sender.username,
+        "asunto": mensaje.subject,
+        "contenido": mensaje.content,
+        "creado": mensaje.created_at.isoformat(),
+    }
+
+
+def datos_notificacion(notificacion):
+    return {
+        "id": notificacion.id,
+        "tipo": notificacion.tipo,
+        "titulo": notificacion.titulo,
+        "contenido": notificacion.contenido,
+        "url": notificacion.url or "",
+        "creado": notificacion.creado.isoformat(),
+    }
+
+
+# Más notificaciones que esto en una transacción se publican desde Celery
+PUBLICAR_EN_LINEA = 50
+# group_send concurrentes y notificaciones que carga el worker de cada vez
+LOTE_PUBLICACION = 500
+
+
+def evento_notificacion(notificacion):
+    return {"type": "evento.notificacion", "notificacion": datos_notificacion(notificacion)}
+
+
+async def _enviar_lotes(capa, eventos):
+    async def enviar(user_id, evento):
+        try:
+            await capa.group_send(grupo_usuario(user_id), evento)
+        except Exception:
+            # Sin capa (Redis caído) se pierde el aviso en vivo, no el mensaje
+            logger.warning("No se pudo publicar el evento %s a %s", evento["type"], user_id, exc_info=True)
+
+    for i in range(0, len(eventos), LOTE_PUBLICACION):
+        await asyncio.gather(*(enviar(uid, evento) for uid, evento in eventos[i:i + LOTE_PUBLICACION]))
+
+
+def _enviar(eventos):
+    capa = get_channel_layer()
+    if capa is None:
+        return
+    async_to_sync(_enviar_lotes)(capa, list(eventos))
+
+
+def publicar(eventos):
+    """Envía [(user_id, evento)] a los grupos de usuario cuando se confirme la transacción."""
+    eventos = list(eventos)
+    if eventos:
+        transaction.on_commit(lambda: _enviar(eventos))
+
+
+def publicar_mensaje(mensaje):
+    """Nuevo mensaje privado: le llega al destinatario y a las otras pestañas del remitente."""
+    evento = {"type": "evento.mensaje", "mensaje": datos_mensaje(mensaje)}
+    publicar((uid, evento) for uid in {mensaje.sender_id, mensaje.receiver_id})
+
+
+def publicar_notificaciones(notificaciones):
+    notificaciones = list(notificaciones)
+    if len(notificaciones) <= PUBLICAR_EN_LINEA:
+        publicar((n.user_id, evento_notificacion(n)) for n in notificaciones)
+        return
+    from .tasks import publicar_notificaciones as tarea
+
+    ids = [n.pk for n in notificaciones]
+    # Broker caído: se pierde el aviso en vivo, no las notificaciones
+    transaction.on_commit(lambda: tarea.delay(ids), robust=True)
+
+
+def enviar_notificaciones(ids):
+    """Publica las notificaciones `ids` por lotes (desde Celery). Devuelve cuántas."""
+    total = 0
+    for i in range(0, len(ids), LOTE_PUBLICACION):
+        lote = list(Notification.objects.filter(pk__in=ids[i:i + LOTE_PUBLICACION]).order_by("id"))
+        _enviar([(n.user_id, evento_notificacion(n)) for n in lote])
+        total += len(lote)
+    return total
+
+
+# ---------------------- FLUJO SSE DE NOTIFICACIONES ----------------------
+
+# Segundos entre comentarios de latido (mantienen viva la conexión en proxies)
+LATIDO_SSE = 25
+LOTE_SSE = 100
+# Milisegundos entre peticiones del SSE servido por WSGI
+RECONEXION_WSGI = 15000
+
+
+def _ultima_notificacion(user_id):
+    return Notification.objects.filter(user_id=user_id).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def _pendientes(user_id, desde):
+    return list(Notification.objects.filter(user_id=user_id, id__gt=desde).order_by("id")[:LOTE_SSE])
+
+
+def _evento_sse(notificacion):
+    datos = json.dumps(datos_notificacion(notificacion), ensure_ascii=False)
+    return f"id: {notificacion.id}\nevent: notificacion\ndata: {datos}\n\n"
+
+
+async def _esperar(capa, canal):
+    """True si ha llegado una notificación; False tras el latido sin novedades."""
+    try:
+        while True:
+            evento = await asyncio.wait_for(capa.receive(canal), LATIDO_SSE)
+            if evento.get("type") == "evento.notificacion":
+                return True
+    except asyncio.TimeoutError:
+        return False
+    except Exception:
+        # Capa caída: se sigue a ritmo de latido, consultando la tabla cada vez
+        logger.warning("Capa de canales no disponible para SSE", exc_info=True)
+        await asyncio.sleep(LATIDO_SSE)
+        return True
+
+
+async def _grupo(accion, grupo, canal):
+    try:
+        await accion(grupo, canal)
+    except Exception:
+        logger.warning("Capa de canales no disponible para SSE", exc_info=True)
+
+
+async def flujo_notificaciones(user_id, desde=None):
+    """
+    Generador async (ASGI) de eventos SSE con las notificaciones de `user_id`
+    posteriores al id `desde` (Last-Event-ID); sin él, solo las nuevas.
+    """
+    capa = get_channel_layer()
+    canal = await capa.new_channel()
+    grupo = grupo_usuario(user_id)
+    await _grupo(capa.group_add, grupo, canal)
+    try:
+        # Suscrito antes de consultar: lo que llegue entre medias despierta la espera
+        if desde is None:
+            desde = await sync_to_async(_ultima_notificacion)(user_id)
+        yield f"retry: 5000\nid: {desde}\n\n"
+        while True:
+            nuevas = await sync_to_async(_pendientes)(user_id, desde)
+            for notificacion in nuevas:
+                yield _evento_sse(notificacion)
+                desde = notificacion.id
+            if len(nuevas) == LOTE_SSE:
+                continue
+            if not await _esperar(capa, canal):
+                yield ": latido\n\n"
+    finally:
+        await _grupo(capa.group_discard, grupo, canal)
+
+
+def lote_notificaciones(user_id, desde=None):
+    """
+    Lo mismo para WSGI, sin mantener la conexión: las pendientes desde
+    `desde` en un solo cuerpo y RECONEXION_WSGI ms hasta la siguiente petición.
+    """
+    if desde is None:
+        desde = _ultima_notificacion(user_id)
+    nuevas = _pendientes(user_id, desde)
+    # Si queda más de un lote, se vuelve enseguida a por el resto
+    partes = [f"retry: {100 if len(nuevas) == LOTE_SSE else RECONEXION_WSGI}\nid: {desde}\n\n"]
+    partes += [_evento_sse(notificacion) for notificacion in nuevas]
+    return "".join(partes)
@@ -8,6 +8,9 @@ app_name = "dashboard"
 urlpatterns = [
     # Página principal
     path("", login_required(views.dashboard_home), name="inicio"),
+    # Vista async (comprueba la sesión ella misma: login_required no envuelve corrutinas)
+    path("async/", views.dashboard_home_async, name="inicio_async"),
+    path("tarjetas/<str:nombre>/", login_required(views.tarjeta_dashboard), name="tarjeta_dashboard"),
 
     # Avisos personales
     path("avisos/", login_required(views.avisos), name="avisos"),
@@ -38,10 +41,14 @@ urlpatterns = [
     path("mensajes/", login_required(views.compose_message), name="compose_message"),
     path("mensajes/inbox/", login_required(views.inbox), name="inbox"),
     path("mensajes/outbox/", login_required(views.outbox), name="outbox"),
+    path("mensajes/masivo/", views.operacion_mensajes, name="operacion_mensajes"),
+    path("adjuntos/<int:pk>/", views.descargar_adjunto, name="descargar_adjunto"),
+    path("mensajes/buscar/", login_required(views.buscar_mensajes), name="buscar_mensajes"),
     path("mensajes/chat/<int:usuario_id>/", login_required(views.chat), name="chat"),
     path("mensajes/enviar/", login_required(views.send_message), name="send_message"),
     path("mensajes/<int:pk>/", login_required(views.mensaje_detalle), name="mensaje_detalle"),
     path("notificaciones/marcar-todas/", login_required(views.marcar_notificaciones_leidas), name="marcar_notificaciones"),
+    path("notificaciones/stream/", login_required(views.notificaciones_stream), name="notificaciones_stream"),
     path("mensajes/toggle-read/<int:pk>/", views.toggle_read, name="toggle_read"),
     path("mensajes/reply/<int:pk>/", views.reply, name="reply"),
     path("mensajes/<int:mensaje_id>/toggle-read/", views.toggle_read, name="toggle_read"),
@@ -53,4 +60,12 @@ urlpatterns = [
 
     # Configuración
     path("configuracion/", login_required(views.configuracion), name="configuracion"),
+
+    # API JSON
+    path("api/resumen/", login_required(views.resumen_dashboard), name="resumen_dashboard"),
+    path("api/cache/", views.cache_dashboard, name="cache_dashboard"),
+    path("api/avisos/", login_required(views.avisos_feed), name="avisos_feed"),
+    path("api/conversacion/<int:usuario_id>/", login_required(views.conversacion_api), name="conversacion_api"),
+    path("api/directorio/", login_required(views.directorio_api), name="directorio"),
+    path("api/tareas/completadas/", views.serie_tareas_completadas, name="serie_tareas_completadas"),
 ]
@@ -1,100 +1,60 @@
 # views.py (unificado, limpio y completo)
-from datetime import datetime, date, timedelta
-import random
+from datetime import date
 import json
 from django.views.decorators.http import require_POST
 from django.shortcuts import render, redirect, get_object_or_404
 from django.utils import timezone
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
+from asgiref.sync import sync_to_async
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse, HttpResponseForbidden
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.db.models.functions import ExtractWeekDay
 from django.db.models import Count
+from django.conf import settings
 from .models import Notification, PrivateMessage
 
 # Importa aquí los modelos y formularios que usas en tu proyecto.
 # Ajusta los imports si los nombres/paths son distintos en tu repo.
 from schoolcomms.dashboard.models import (
-    Aviso, Tarea, Incidencia,
+    Adjunto, Aviso, Tarea, Incidencia,
     Announcement, AnnouncementRead,
     PrivateMessage, Notification, Asistencia
 )
 from schoolcomms.dashboard.forms import TareaForm, IncidenciaForm, AvisoForm
-from .forms import PrivateMessageForm, EstadoIncidenciaForm
+from .forms import PrivateMessageForm, EstadoIncidenciaForm, OperacionMensajesForm
+from django.core.cache import cache
+from django.views.decorators.cache import cache_control
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import etag
+from .estadisticas import obtener_resumen, serie_completadas
+from . import adjuntos, archivo, busqueda, operaciones
+from .cache import estadisticas_cache, invalidar_dashboard, obtener_snapshot, version_datos
+from .calendario import obtener_calendario
+from .contadores import invalidar_contadores, obtener_contadores
+from .conversaciones import conversaciones_de, marcar_conversacion_leida, marcar_leido
+from .directorio import obtener_directorio
+from .audiencias import avisos_visibles
+from .paginacion import codificar_cursor, pagina_keyset, pagina_keyset_combinada
+from .tiempo_real import datos_mensaje, flujo_notificaciones, lote_notificaciones
+from .tarjetas import TARJETAS, renderizar_tarjetas, renderizar_tarjetas_async
 from core.models import CustomUser  # si tu app se llama distinto, ajústalo
 
 User = get_user_model()
 
-# ---------------------- CONFIGURACIÓN ESCOLAR / CONSTANTES ----------------------
-
-INICIO_CURSO = date(2025, 9, 8)
-FIN_CURSO = date(2026, 6, 19)
-
-FESTIVOS = {
-    date(2025, 10, 9),
-    date(2025, 10, 12),
-    date(2025, 11, 1),
-    date(2025, 12, 6),
-    date(2025, 12, 8),
-    date(2026, 3, 19),
-    date(2026, 5, 1),
-}
-
-VACACIONES = set()
-VACACIONES.update([date(2025, 12, d) for d in range(20, 32)])  # Navidad
-VACACIONES.update([date(2026, 1, d) for d in range(1, 8)])
-VACACIONES.update([date(2026, 3, d) for d in range(28, 32)])  # Semana Santa
-VACACIONES.update([date(2026, 4, d) for d in range(1, 6)])
-
 # ---------------------- UTILIDADES ----------------------
 
 
 def es_dia_lectivo(fecha: date):
     """
-    Devuelve (bool, motivo_str). Reusa constantes INICIO_CURSO, FIN_CURSO, FESTIVOS, VACACIONES.
+    Devuelve (bool, motivo_str) consultando el calendario compilado del curso de `fecha`.
     """
-    if fecha < INICIO_CURSO or fecha > FIN_CURSO:
-        return False, "Fuera del calendario escolar"
-    if fecha.weekday() >= 5:
-        return False, "Fin de semana"
-    if fecha in FESTIVOS:
-        return False, "Festivo oficial"
-    if fecha in VACACIONES:
-        return False, "Vacaciones escolares"
-    return True, "Día lectivo"
-
-
-def generar_asistencia_curso(hasta_fecha):
-    historial = []
-    fecha = INICIO_CURSO
-    while fecha <= hasta_fecha:
-        es_lectivo, _ = es_dia_lectivo(fecha)
-        if es_lectivo:
-            # Simulación: alternancia de asistencia
-            presente = 1 if fecha.day % 3 != 0 else 0
-            ausente = 1 - presente
-            historial.append({
-                "fecha": fecha,
-                "presente": presente,
-                "ausente": ausente
-            })
-        fecha += timedelta(days=1)
-
-    totales = {
-        "dias_lectivos": len(historial),
-        "presentes": sum(d["presente"] for d in historial),
-        "ausentes": sum(d["ausente"] for d in historial)
-    }
-
-    return {
-        "historial": historial,
-        "totales": totales
-    }
-
+    return obtener_calendario(fecha).motivo(fecha)
 
 
 def obtener_ultimos_dias_lectivos(n=7, hasta_fecha: date = None):
@@ -104,27 +64,7 @@ def obtener_ultimos_dias_lectivos(n=7, hasta_fecha: date = None):
     """
     if hasta_fecha is None:
         hasta_fecha = date.today()
-    dias_lectivos = []
-    i = 0
-    # empezamos en el mismo día y vamos hacia atrás hasta tener n lectivos
-    while len(dias_lectivos) < n:
-        dia = hasta_fecha - timedelta(days=i)
-        if es_dia_lectivo(dia)[0]:
-            dias_lectivos.append(dia)
-        i += 1
-        # seguridad para no entrar en bucles infinitos (p. ej. si INICIO_CURSO logic)
-        if i > 365 * 5:
-            break
-    dias_lectivos.reverse()  # orden cronológico ascendente
-    return dias_lectivos
-
-
-def calcular_nota_semanal(base, nombre):
-    semana = datetime.now().isocalendar()[1]
-    semilla = sum(ord(c) for c in nombre) + semana
-    variacion = (semilla % 5) - 2  # -2 a +2
-    nueva = max(50, min(100, base + variacion))
-    return nueva
+    return obtener_calendario(hasta_fecha).ultimos_lectivos(n, hasta_fecha)
 
 
 # ---------------------- VISTAS: DASHBOARD ----------------------
@@ -132,191 +72,113 @@ def calcular_nota_semanal(base, nombre):
 
 @login_required
 def dashboard_home(request):
-    user = request.user
+    """
+    Esqueleto del dashboard: no consulta nada, cada tarjeta se pide después
+    a `tarjeta_dashboard` (ver tarjetas.py). Con ?completo=1 (sin JavaScript)
+    las tarjetas se renderizan aquí, una detrás de otra.
+    """
+    context = {"ultima_actualizacion": timezone.now()}
+    if request.GET.get("completo"):
+        context["tarjetas_html"] = renderizar_tarjetas(request, request.user)
+    return render(request, "dashboard/index.html", context)
 
-    # === Querysets base ===
-    tareas_qs = Tarea.objects.filter(autor=user)
-    avisos_qs = Aviso.objects.filter(autor=user)
-    incidencias_qs = Incidencia.objects.filter(autor=user)
 
-    # Mensajes: separa todos vs no leídos (para UI y métricas)
-    mensajes_all_qs = PrivateMessage.objects.filter(receiver=user)
-    mensajes_unread_qs = mensajes_all_qs.filter(is_read=False)
+async def dashboard_home_async(request):
+    """
+    Dashboard completo para ASGI: las tarjetas se calculan a la vez en un pool
+    de hilos acotado (DASHBOARD_ASYNC_WORKERS) en lugar de una detrás de otra.
+    """
+    # login_required no admite vistas async en Django 5.0
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    context = {
+        "ultima_actualizacion": timezone.now(),
+        "tarjetas_html": await renderizar_tarjetas_async(request, user),
+    }
+    return await sync_to_async(render)(request, "dashboard/index.html", context)
 
-    notificaciones = Notification.objects.filter(user=user, leida=False).order_by('-creado')[:20]
 
-    # === Datos básicos (sliced y ordenados) ===
-    tareas = tareas_qs.order_by('-fecha_entrega')[:5]
-    avisos = avisos_qs.order_by('-fecha_publicacion')[:5]
-    # El card de mensajes muestra SOLO no leídos
-    mensajes = mensajes_unread_qs.order_by('-created_at')[:5]
-    incidencias = incidencias_qs.order_by('-fecha_reporte')[:5]
+def _etag_tarjeta(request, tarjeta):
+    return f"{version_datos(request.user.id)}-{tarjeta.nombre}-{date.today().isoformat()}"
 
-    # === Estadísticas resumidas ===
-    total_tareas = tareas_qs.count()
-    completadas = tareas_qs.filter(completada=True).count()
-    progreso_academico = int((completadas / total_tareas) * 100) if total_tareas > 0 else 0
 
-    # Asistencia para hoy
+@etag(_etag_tarjeta)
+def _responder_tarjeta(request, tarjeta):
+    user = request.user
     hoy = date.today()
-    asistencia_data = generar_asistencia_curso(hasta_fecha=hoy)
-    asistencia_historial_curso = asistencia_data["historial"]
-    totales_asistencia = asistencia_data["totales"]
-
-    total_presentes = sum(d["presente"] for d in asistencia_historial_curso)
-    total_ausentes = sum(d["ausente"] for d in asistencia_historial_curso)
-
-    # Rendimiento por materias (simulado)
-    materias_base = [
-        {"nombre": "Matemáticas", "nota": 85},
-        {"nombre": "Lengua", "nota": 78},
-        {"nombre": "Historia", "nota": 92},
-        {"nombre": "Física", "nota": 74},
-        {"nombre": "Química", "nota": 88},
-        {"nombre": "Biología", "nota": 81},
-        {"nombre": "Geografía", "nota": 69},
-        {"nombre": "Educación Física", "nota": 95},
-        {"nombre": "Inglés", "nota": 79},
-        {"nombre": "Economía", "nota": 68},
-    ]
-    rendimiento_materias = [
-        {"nombre": m["nombre"], "nota": calcular_nota_semanal(m["nota"], m["nombre"])}
-        for m in materias_base
-    ]
-
-    eventos_proximos = []  # placeholder
-
-    # === Cards dinámicos ===
-    def items_from_queryset(qs, label_attr="titulo", fallback="Sin elementos", max_items=5, fmt=None):
-        items = []
-        for o in qs[:max_items]:
-            items.append(fmt(o) if fmt else getattr(o, label_attr, str(o)))
-        return items if items else [fallback]
-
-    cards = [
-        {
-            "title": "Avisos",
-            "icon": "fa-bullhorn",
-            "color": "from-blue-500 to-blue-700",
-            "items": items_from_queryset(avisos, label_attr="titulo", fallback="Sin avisos", max_items=5, fmt=lambda o: f"{o.titulo}")
-        },
-        {
-            "title": "Mensajes",
-            "icon": "fa-envelope",
-            "color": "from-green-500 to-green-700",
-            # Importante: items desde NO LEÍDOS
-            "items": items_from_queryset(
-                mensajes,
-                label_attr="subject",
-                fallback="Sin mensajes",
-                max_items=5,
-                fmt=lambda m: f"{getattr(m.sender, 'username', 'Desconocido')}: {m.subject}"
-            )
-        },
-        {
-            "title": "Tareas",
-            "icon": "fa-tasks",
-            "color": "from-purple-500 to-purple-700",
-            "items": items_from_queryset(
-                tareas,
-                label_attr="titulo",
-                fallback="Sin tareas",
-                max_items=5,
-                fmt=lambda t: f"{t.titulo} - {'✅' if t.completada else '❌'}"
-            )
-        },
-        {
-            "title": "Incidencias",
-            "icon": "fa-triangle-exclamation",
-            "color": "from-red-500 to-red-700",
-            "items": items_from_queryset(
-                incidencias,
-                label_attr="descripcion",
-                fallback="Sin incidencias",
-                max_items=5,
-                fmt=lambda i: (i.titulo if hasattr(i, 'titulo') else (i.descripcion[:60] + ("..." if len(i.descripcion) > 60 else "")))
-            )
-        },
-    ]
+    # Snapshot cacheado por usuario y tarjeta (se invalida desde signals.py)
+    context = obtener_snapshot(user, lambda: tarjeta.construir(user, hoy), parte=f"tarjeta:{tarjeta.nombre}")
+    return render(request, tarjeta.plantilla, context)
 
-    # === Actividad global (puedes contar todos, no solo no leídos) ===
-    activity_labels = ["Avisos", "Mensajes", "Tareas", "Incidencias"]
-    activity_values = [
-        avisos_qs.count(),
-        mensajes_all_qs.count(),  # total de mensajes, no solo no leídos
-        tareas_qs.count(),
-        incidencias_qs.count()
-    ]
 
-    # === Actividad reciente: tareas completadas últimos 7 días lectivos ===
-    dias_lectivos = obtener_ultimos_dias_lectivos(7, hasta_fecha=hoy)
-    dias_semana_es = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+@login_required
+def tarjeta_dashboard(request, nombre):
+    """Fragmento HTML de una tarjeta del dashboard, con sus propias cabeceras de caché."""
+    tarjeta = TARJETAS.get(nombre)
+    if tarjeta is None:
+        raise Http404("Tarjeta desconocida")
+    response = _responder_tarjeta(request, tarjeta)
+    # También en los 304, que `etag` devuelve sin pasar por la vista
+    patch_cache_control(response, private=True, max_age=tarjeta.max_age)
+    return response
 
-    labels_ultimos = [f"{dias_semana_es[d.weekday()]} {d.strftime('%d/%m')}" for d in dias_lectivos]
-    values_ultimos = [tareas_qs.filter(completada=True, fecha_completado=d).count() for d in dias_lectivos]
-    if sum(values_ultimos) == 0:
-        values_ultimos = [random.randint(0, 5) for _ in labels_ultimos]
 
-    # === Conteo de días lectivos desde inicio del curso ===
-    dias_desde_inicio = (hoy - INICIO_CURSO).days
-    dias_lectivos_contados = sum(
-        1 for i in range((hoy - INICIO_CURSO).days + 1)
-        if es_dia_lectivo(INICIO_CURSO + timedelta(days=i))[0]
-    )
+# ---------------------- VISTAS: AVISOS ----------------------
 
-    # === Contexto final (incluye unread_count para el badge del card) ===
-    context = {
-        "avisos": avisos,
-        "mensajes": mensajes,  # SOLO no leídos para el card
-        "unread_count": mensajes_unread_qs.count(),
-        "tareas": tareas,
-        "incidencias": incidencias,
-        "notificaciones": notificaciones,
-        "cards": cards,
-        "progreso_academico": progreso_academico,
-        "asistencia_historial_curso": asistencia_historial_curso,
-        "rendimiento_materias": rendimiento_materias,
-        "eventos_proximos": eventos_proximos,
-        "ultima_actualizacion": timezone.now(),
-        "activity_labels": labels_ultimos,
-        "activity_values": values_ultimos,
-        "activity_recent_labels": labels_ultimos,
-        "activity_recent_values": values_ultimos,
-        "asistencia_historial": asistencia_historial_curso,
-        "asistencia_totales": totales_asistencia,
-        "dias_desde_inicio": dias_desde_inicio,
-        "dias_lectivos_contados": dias_lectivos_contados,
-        "total_presentes": totales_asistencia["presentes"],
-        "total_ausentes": totales_asistencia["ausentes"],
-        "asistencia_totales": totales_asistencia,
-        "hoy": datetime.now(),
-    }
 
-    return render(request, "dashboard/index.html", context)
+AVISOS_POR_PAGINA = 20
 
 
-# ---------------------- VISTAS: AVISOS ----------------------
+def _pagina_avisos(request):
+    try:
+        n = min(max(int(request.GET.get("n", AVISOS_POR_PAGINA)), 1), 100)
+    except ValueError:
+        n = AVISOS_POR_PAGINA
+    # Creados y recibidos (directos o por grupo/aula/centro/clase), por cursor
+    return pagina_keyset(avisos_visibles(request.user), "fecha_publicacion", request.GET.get("cursor"), n)
 
 
 @login_required
 def avisos(request):
-    # Mostrar tanto los avisos creados como los recibidos
-    creados = Aviso.objects.filter(autor=request.user)
-    recibidos = Aviso.objects.filter(destinatarios=request.user)
-    lista = (creados | recibidos).distinct().order_by('-fecha_publicacion')
-    return render(request, 'dashboard/avisos.html', {'avisos': lista})
+    lista, siguiente = _pagina_avisos(request)
+    # ?fragmento=1: solo las tarjetas de la página (scroll infinito)
+    plantilla = 'dashboard/avisos_pagina.html' if request.GET.get("fragmento") else 'dashboard/avisos.html'
+    return render(request, plantilla, {'avisos': lista, 'siguiente': siguiente})
+
+
+@login_required
+def avisos_feed(request):
+    """Feed de avisos en JSON (?cursor=...&n=...). `siguiente` es null en la última página."""
+    lista, siguiente = _pagina_avisos(request)
+    return JsonResponse({
+        "avisos": [
+            {
+                "id": a.id,
+                "titulo": a.titulo,
+                "contenido": a.contenido,
+                "fecha_publicacion": a.fecha_publicacion.isoformat(),
+                "autor_id": a.autor_id,
+                "url": reverse("dashboard:detalle_aviso", args=[a.id]),
+            }
+            for a in lista
+        ],
+        "siguiente": siguiente,
+    })
 
 
 
+@adjuntos.subida_de_adjuntos
 @login_required
 def crear_aviso(request):
     if request.method == 'POST':
-        form = AvisoForm(request.POST)
+        form = AvisoForm(request.POST, request.FILES, rechazados=adjuntos.rechazados(request))
         if form.is_valid():
             aviso = form.save(commit=False)
             aviso.autor = request.user
             aviso.save()
             form.save_m2m()  # 🔑 guarda los destinatarios seleccionados
+            adjuntos.guardar_adjuntos(form.cleaned_data["adjuntos"], request.user, aviso=aviso)
             messages.success(request, "✅ Aviso creado correctamente.")
             return redirect('dashboard:avisos')
     else:
@@ -327,19 +189,21 @@ def crear_aviso(request):
 
 @login_required
 def detalle_aviso(request, aviso_id):
-    aviso = get_object_or_404(Aviso, id=aviso_id)
+    aviso = get_object_or_404(Aviso.objects.prefetch_related("adjuntos"), id=aviso_id)
     return render(request, 'dashboard/detalle_aviso.html', {'aviso': aviso})
 
 
+@adjuntos.subida_de_adjuntos
 @login_required
 def editar_aviso(request, aviso_id):
     aviso = get_object_or_404(Aviso, id=aviso_id)
     if request.user != aviso.autor and not request.user.is_staff:
         return redirect('dashboard:avisos')
     if request.method == 'POST':
-        form = AvisoForm(request.POST, instance=aviso)
+        form = AvisoForm(request.POST, request.FILES, instance=aviso, rechazados=adjuntos.rechazados(request))
         if form.is_valid():
             form.save()
+            adjuntos.guardar_adjuntos(form.cleaned_data["adjuntos"], request.user, aviso=aviso)
             messages.success(request, "✅ Aviso modificado.")
             return redirect('dashboard:avisos')
     else:
@@ -551,47 +415,142 @@ def mensajes(request):
 def inbox(request):
     mensajes = PrivateMessage.objects.filter(
         receiver=request.user,
-        is_read=False
-    ).order_by("-created_at")
+        is_read=False,
+        archivado=False,
+    ).select_related("sender").order_by("-created_at")
     return render(request, "dashboard/inbox.html", {"mensajes": mensajes})
 
 
 
 @login_required
 def outbox(request):
-    mensajes_qs = PrivateMessage.objects.filter(sender=request.user).order_by("-created_at")
-    paginator = Paginator(mensajes_qs, 20)
-    page = request.GET.get('page')
-    mensajes_page = paginator.get_page(page)
-    return render(request, "dashboard/outbox.html", {"mensajes": mensajes_page})
+    # Por cursor sobre la tabla caliente y el archivo (?cursor=… para los anteriores)
+    mensajes, siguiente = pagina_keyset_combinada(archivo.enviados(request.user), "created_at", request.GET.get("cursor"))
+    return render(request, "dashboard/outbox.html", {"mensajes": mensajes, "siguiente": siguiente})
+
+
+@login_required
+def buscar_mensajes(request):
+    """Búsqueda de texto completo en los mensajes enviados y recibidos del usuario."""
+    consulta = request.GET.get("q", "").strip()
+    try:
+        pagina = int(request.GET.get("pagina", 1))
+    except ValueError:
+        pagina = 1
+    pagina = min(max(pagina, 1), busqueda.MAX_PAGINAS)
+    resultados, hay_siguiente = busqueda.buscar_mensajes(request.user, consulta, pagina)
+    return render(request, "dashboard/buscar_mensajes.html", {
+        "consulta": consulta,
+        "resultados": resultados,
+        "pagina": pagina,
+        "hay_siguiente": hay_siguiente,
+    })
+
+
+MENSAJES_POR_PAGINA = 30
+CONTACTOS_RECIENTES = 20
+CONTACTOS_POR_PAGINA = 20
+
+
+def _contactos_recientes(user, incluir=None):
+    """
+    Usuarios con los que `user` ha hablado últimamente, con sus no leídos (el
+    resto se busca en el directorio), más `incluir` si no está entre ellos.
+    """
+    contactos = []
+    for participante in conversaciones_de(user).exclude(otro=user)[:CONTACTOS_RECIENTES]:
+        contacto = participante.otro
+        contacto.no_leidos = participante.no_leidos
+        contacto.ultimo_mensaje = participante.conversacion.ultimo_mensaje
+        contactos.append(contacto)
+    if incluir and incluir.id != user.id and all(c.id != incluir.id for c in contactos):
+        contactos.insert(0, incluir)
+    return contactos
 
 
 @login_required
 def chat(request, usuario_id):
     other_user = get_object_or_404(CustomUser, id=usuario_id)
-    contacts = CustomUser.objects.exclude(id=request.user.id)
     if request.method == "POST":
         content = request.POST.get("message")
         if content:
-            PrivateMessage.objects.create(
+            msg = PrivateMessage.objects.create(
                 sender=request.user,
                 receiver=other_user,
                 content=content,
                 subject="(chat directo)",
                 is_read=False
             )
+            # Envío desde JS: sin recargar; el resto de pestañas lo reciben por WebSocket
+            if request.headers.get("Accept") == "application/json":
+                return JsonResponse(dict(datos_mensaje(msg), propio=True), status=201)
             return redirect("dashboard:chat", usuario_id=usuario_id)
-    messages_qs = PrivateMessage.objects.filter(
-        sender__in=[request.user, other_user],
-        receiver__in=[request.user, other_user]
-    ).order_by("created_at")
+    # Abrir el chat es leer lo que ha enviado el otro
+    marcar_conversacion_leida(request.user, other_user)
+    contacts = _contactos_recientes(request.user, incluir=other_user)
+    # Solo los últimos mensajes; los anteriores se piden a conversacion_api al subir
+    ultimos, anteriores = pagina_keyset_combinada(
+        archivo.conversacion(request.user, other_user), "created_at", tamano=MENSAJES_POR_PAGINA,
+    )
     return render(request, "dashboard/chat.html", {
         "contacts": contacts,
-        "messages": messages_qs,
+        "messages": ultimos[::-1],
+        "anteriores": anteriores,
+        "ultimo": codificar_cursor(ultimos[0].created_at, ultimos[0].pk) if ultimos else "",
         "other_user": other_user
     })
 
 
+@login_required
+def conversacion_api(request, usuario_id):
+    """
+    Historial con `usuario_id` en JSON, en orden cronológico:
+    - sin parámetros: los últimos N mensajes
+    - ?antes=<cursor>: la página anterior (cursor `anteriores` de la respuesta)
+    - ?despues=<cursor>: los nuevos desde ese punto (cursor `ultimo` de la respuesta)
+    """
+    otro = get_object_or_404(CustomUser, id=usuario_id)
+    try:
+        n = min(max(int(request.GET.get("n", MENSAJES_POR_PAGINA)), 1), 100)
+    except ValueError:
+        n = MENSAJES_POR_PAGINA
+    caliente, archivado = archivo.conversacion(request.user, otro)
+    despues = request.GET.get("despues")
+    if despues:
+        # Lo nuevo siempre está en la tabla caliente
+        mensajes, _ = pagina_keyset(caliente, "created_at", despues, n, descendente=False)
+        anteriores = None
+    else:
+        mensajes, anteriores = pagina_keyset_combinada([caliente, archivado], "created_at", request.GET.get("antes"), n)
+        mensajes.reverse()
+    ultimo = codificar_cursor(mensajes[-1].created_at, mensajes[-1].pk) if mensajes else despues
+    return JsonResponse({
+        "mensajes": [dict(datos_mensaje(m), propio=m.sender_id == request.user.id) for m in mensajes],
+        "anteriores": anteriores,
+        "ultimo": ultimo,
+    })
+
+
+@login_required
+def directorio_api(request):
+    """
+    Autocompletado de contactos: ?q=<prefijos> sobre usuario, nombre y rol,
+    paginado con ?pagina=N (&n=tamaño). Se resuelve en el índice en memoria.
+    """
+    try:
+        pagina = max(int(request.GET.get("pagina", 1)), 1)
+        n = min(max(int(request.GET.get("n", CONTACTOS_POR_PAGINA)), 1), 50)
+    except ValueError:
+        pagina, n = 1, CONTACTOS_POR_PAGINA
+    resultados = obtener_directorio().buscar(request.GET.get("q", ""), excluir={request.user.id})
+    inicio = (pagina - 1) * n
+    return JsonResponse({
+        "resultados": resultados[inicio:inicio + n],
+        "pagina": pagina,
+        "siguiente": pagina + 1 if len(resultados) > inicio + n else None,
+    })
+
+
 @login_required
 def send_message(request):
     if request.method == "POST":
@@ -643,7 +602,7 @@ def export_announcements_excel(request):
 
 @login_required
 def latest_notifications(request):
-    notifs = Notification.objects.filter(user=request.user).order_by("-creado")[:20]
+    notifs = archivo.ultimas_notificaciones(request.user)
     data = [
         {
             "id": n.id,
@@ -651,7 +610,7 @@ def latest_notifications(request):
             "titulo": n.titulo,
             "contenido": n.contenido,
             "url": n.url,
-            "leido": n.leido,
+            "leido": n.leida,
             "creado": n.creado.strftime("%d/%m/%Y %H:%M")
         }
         for n in notifs
@@ -662,32 +621,50 @@ def latest_notifications(request):
 @require_POST
 def marcar_notificaciones_leidas(request):
     Notification.objects.filter(user=request.user, leida=False).update(leida=True)
+    # update() no emite post_save: invalidamos a mano
+    invalidar_dashboard(request.user.id)
+    invalidar_contadores([request.user.id], "notificaciones")
     return JsonResponse({"success": True})
 
 
+@login_required
+def notificaciones_stream(request):
+    """
+    Server-Sent Events con las notificaciones nuevas del usuario. EventSource
+    reenvía Last-Event-ID al reconectar y se continúa desde ahí. Con ASGI
+    cada conexión es una corrutina dormida; con WSGI se responde con lo
+    pendiente y se cierra (sin ocupar un hilo por cliente).
+    """
+    try:
+        desde = int(request.headers.get("Last-Event-ID") or request.GET["desde"])
+    except (KeyError, ValueError):
+        desde = None
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(flujo_notificaciones(request.user.id, desde), content_type="text/event-stream")
+    else:
+        response = HttpResponse(lote_notificaciones(request.user.id, desde), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Sin buffer en nginx: cada evento sale en cuanto se genera
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 @login_required
 def configuracion(request):
     return render(request, "dashboard/configuracion.html")
 
 
+@adjuntos.subida_de_adjuntos
 @login_required
 def compose_message(request):
     if request.method == "POST":
-        form = PrivateMessageForm(request.POST)
+        form = PrivateMessageForm(request.POST, request.FILES, rechazados=adjuntos.rechazados(request))
         if form.is_valid():
             msg = form.save(commit=False)
             msg.sender = request.user
             msg.save()
-
-            Notification.objects.create(
-                user=msg.receiver,
-                tipo="info",
-                titulo="Nuevo mensaje privado",
-                contenido=f"Has recibido un mensaje de {request.user.username}: {msg.subject}",
-                url = reverse("dashboard:mensaje_detalle", args=[msg.id]),
-                mensaje=msg
-            )
-
+            # La notificación la crea el post_save del mensaje (notificar_mensaje)
+            adjuntos.guardar_adjuntos(form.cleaned_data["adjuntos"], request.user, mensaje=msg)
             messages.success(request, "Mensaje enviado correctamente ✅")
             return redirect("dashboard:outbox")
     else:
@@ -697,24 +674,73 @@ def compose_message(request):
 
 @login_required
 def mensaje_detalle(request, pk):
-    mensaje = get_object_or_404(PrivateMessage, pk=pk, receiver=request.user)
+    mensaje = archivo.obtener_mensaje(pk=pk, receiver=request.user)
     return render(request, "dashboard/mensaje_detalle.html", {"mensaje": mensaje})
 
 
+@login_required
+def descargar_adjunto(request, pk):
+    """
+    Envía un adjunto a quien puede verlo (partes del mensaje, o destinatarios
+    y autor del aviso); al resto, 404. ?descargar=1 fuerza la descarga.
+    """
+    adjunto = get_object_or_404(Adjunto.objects.select_related("mensaje", "aviso"), pk=pk)
+    if not adjuntos.puede_ver(request.user, adjunto):
+        raise Http404
+    return adjuntos.respuesta_descarga(request, adjunto, descargar=bool(request.GET.get("descargar")))
+
+
 @require_POST
 @login_required
 def toggle_read(request, mensaje_id):
     msg = get_object_or_404(PrivateMessage, id=mensaje_id)
     if msg.receiver_id != request.user.id:
         return HttpResponseForbidden("Not allowed")
-    msg.is_read = not msg.is_read
-    msg.save(update_fields=["is_read"])
+    marcar_leido(msg, not msg.is_read)
     return HttpResponse(status=204)
 
 
+@require_POST
+@login_required
+def operacion_mensajes(request):
+    """
+    Operación masiva sobre los mensajes recibidos (ver operaciones.py). Acepta
+    un formulario o JSON ({"accion": "leer", "ids": [1, 2]} o con "remitente"
+    / "antes") y responde con los afectados y los contadores ya actualizados.
+    """
+    es_json = request.content_type == "application/json"
+    if es_json:
+        try:
+            datos = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"errores": {"__all__": ["JSON no válido."]}}, status=400)
+        if not isinstance(datos, dict):
+            return JsonResponse({"errores": {"__all__": ["Se esperaba un objeto JSON."]}}, status=400)
+    else:
+        datos = request.POST
+    form = OperacionMensajesForm(datos)
+    if not form.is_valid():
+        if es_json:
+            return JsonResponse({"errores": form.errors}, status=400)
+        messages.error(request, " ".join(e for errores in form.errors.values() for e in errores))
+        return redirect("dashboard:inbox")
+
+    d = form.cleaned_data
+    qs = operaciones.seleccion(request.user, d["ids"], d["remitente"], d["antes"])
+    total = operaciones.aplicar(request.user, d["accion"], qs)
+    if es_json or request.headers.get("Accept") == "application/json":
+        return JsonResponse({
+            "accion": d["accion"],
+            "afectados": total,
+            "contadores": obtener_contadores(request.user.id),
+        })
+    messages.success(request, f"{operaciones.ACCIONES[d['accion']]}: {total} mensaje(s).")
+    return redirect("dashboard:inbox")
+
+
 @login_required
 def reply(request, pk):
-    mensaje = get_object_or_404(PrivateMessage, pk=pk, receiver=request.user)
+    mensaje = archivo.obtener_mensaje(pk=pk, receiver=request.user)
     if request.method == "POST":
         content = (request.POST.get("content") or "").strip()
         if content:
@@ -725,8 +751,7 @@ def reply(request, pk):
                 content=content,
             )
             # Opcional: marcar el original como leído
-            mensaje.is_read = True
-            mensaje.save()
+            marcar_leido(mensaje)
         return redirect("dashboard:mensaje_detalle", pk=pk)
     # En GET, vuelve al detalle (no necesitas renderizar reply.html)
     return redirect("dashboard:mensaje_detalle", pk=pk)
@@ -743,16 +768,63 @@ def debug_dashboard_context(request):
     Devuelve una snapshot JSON del contexto del dashboard para debugging.
     WARNING: solo staff.
     """
-    user = request.user
-    tareas_qs = Tarea.objects.filter(autor=user)
-    context = {
-        "total_tareas": tareas_qs.count(),
-        "tareas_completadas": tareas_qs.filter(completada=True).count(),
+    context = obtener_resumen(request.user).as_dict()
+    context.update({
         "hoy": date.today().isoformat(),
         "es_lectivo": es_dia_lectivo(date.today())[0],
-    }
+    })
     return JsonResponse(context)
 
 
+@login_required
+@user_passes_test(lambda u: u.is_staff)
+def cache_dashboard(request):
+    """Aciertos/fallos del snapshot cacheado del dashboard. Solo staff."""
+    return JsonResponse(estadisticas_cache())
+
+
+def _parametros_serie(request):
+    try:
+        n = min(max(int(request.GET.get("dias", 7)), 1), 200)
+    except ValueError:
+        n = 7
+    try:
+        hasta = date.fromisoformat(request.GET["hasta"]) if request.GET.get("hasta") else date.today()
+    except ValueError:
+        hasta = date.today()
+    return n, hasta
+
+
+def _etag_serie(request):
+    if not request.user.is_authenticated:
+        return None
+    n, hasta = _parametros_serie(request)
+    return f"{version_datos(request.user.id)}-{n}-{hasta.isoformat()}"
+
+
+@login_required
+@cache_control(private=True, max_age=60)
+@etag(_etag_serie)
+def serie_tareas_completadas(request):
+    """
+    Tareas completadas por día lectivo (?dias=N&hasta=AAAA-MM-DD) en JSON.
+    Determinista: se cachea por versión de datos del usuario y responde 304
+    si el navegador ya tiene la misma versión.
+    """
+    n, hasta = _parametros_serie(request)
+    clave = f"dashboard:serie:{request.user.id}:{_etag_serie(request)}"
+    serie = cache.get(clave)
+    if serie is None:
+        serie = serie_completadas(request.user, n, hasta)
+        cache.set(clave, serie, timeout=settings.DASHBOARD_CACHE_TIMEOUT)
+    return JsonResponse(serie)
+
+
+@login_required
+def resumen_dashboard(request):
+    """Contadores del dashboard en JSON (mismo cálculo que la vista HTML)."""
+    return JsonResponse(obtener_resumen(request.user).as_dict())
+
+
 def test_calendario(request):
     return render(request, "dashboard/calendario_test.html")
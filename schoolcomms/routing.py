@@ -0,0 +1,22 @@
+# schoolcomms/routing.py
+"""
+Aplicación ASGI (ASGI_APPLICATION): HTTP (las vistas async como
+dashboard_home_async se sirven sin hilos por petición) y WebSockets con la
+sesión de Django (mensajes y notificaciones en vivo, ver dashboard/consumers.py).
+
+    gunicorn schoolcomms.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+from channels.auth import AuthMiddlewareStack
+from channels.routing import ProtocolTypeRouter, URLRouter
+from channels.security.websocket import AllowedHostsOriginValidator
+from django.core.asgi import get_asgi_application
+
+# Antes de importar consumidores/modelos: carga las apps
+django_asgi_app = get_asgi_application()
+
+from schoolcomms.dashboard.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": AllowedHostsOriginValidator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns))),
+})
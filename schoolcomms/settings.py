@@ -19,6 +19,8 @@ environ.Env.read_env(BASE_DIR / ".env")  # Load variables from .env
 SECRET_KEY = env("SECRET_KEY", default="django-insecure-replace-me")
 DEBUG = env.bool("DEBUG", default=True)
 ALLOWED_HOSTS = ["127.0.0.1", "localhost", "[::1]", "colegio-a5bg.onrender.com"]
+# URL pública, para los enlaces absolutos de los correos
+SITE_URL = env("SITE_URL", default="http://localhost:8000").rstrip("/")
 
 # --------------------------------------------------------------------------------------
 # Applications
@@ -82,6 +84,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "schoolcomms.dashboard.context_processors.contadores",
             ],
         },
     },
@@ -103,6 +106,44 @@ DATABASES = {
     }
 }
 
+# --------------------------------------------------------------------------------------
+# Cache (locmem en desarrollo; "redis" en producción)
+# --------------------------------------------------------------------------------------
+# Contadores de no leídos y versiones del snapshot se comparten entre procesos
+# (workers, Celery, comandos): con locmem cada proceso tendría los suyos
+CACHE_BACKEND = env("CACHE_BACKEND", default="locmem" if DEBUG else "redis")
+
+_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "schoolcomms",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": env("CACHE_LOCATION", default=str(BASE_DIR / ".cache")),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "redis": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": env("CACHE_URL", default=env("REDIS_URL", default="redis://localhost:6379")),
+    },
+}
+
+CACHES = {"default": _CACHE_BACKENDS[CACHE_BACKEND]}
+
+# Segundos que vive el snapshot del dashboard (las señales lo invalidan antes)
+DASHBOARD_CACHE_TIMEOUT = env.int("DASHBOARD_CACHE_TIMEOUT", default=300)
+
+# Cada cuántos segundos comprueba un proceso si el calendario escolar ha cambiado
+CALENDARIO_INTERVALO_VERSION = env.int("CALENDARIO_INTERVALO_VERSION", default=5)
+
+# Cada cuántos segundos comprueba un proceso si el directorio de contactos ha cambiado
+DIRECTORIO_INTERVALO_VERSION = env.int("DIRECTORIO_INTERVALO_VERSION", default=5)
+
+# Hilos (por proceso) con los que la vista asíncrona calcula las tarjetas del dashboard
+DASHBOARD_ASYNC_WORKERS = env.int("DASHBOARD_ASYNC_WORKERS", default=8)
+
 # --------------------------------------------------------------------------------------
 # Authentication
 # --------------------------------------------------------------------------------------
@@ -140,6 +181,27 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# --------------------------------------------------------------------------------------
+# Adjuntos (mensajes privados y avisos)
+# --------------------------------------------------------------------------------------
+# Fuera de MEDIA_ROOT: solo se descargan por la vista, que comprueba permisos
+ADJUNTOS_ROOT = Path(env("ADJUNTOS_ROOT", default=str(BASE_DIR / "adjuntos")))
+ADJUNTO_TAMANO_MAXIMO = env.int("ADJUNTO_TAMANO_MAXIMO", default=20 * 1024 * 1024)
+ADJUNTOS_POR_ENVIO = 10
+ADJUNTOS_EXTENSIONES = ["pdf", "jpg", "jpeg", "png", "gif", "webp", "heic", "doc", "docx", "odt", "xls", "xlsx", "txt"]
+
+# Quién envía el fichero: "django" (FileResponse con rangos), "nginx" (X-Accel-Redirect)
+# o "apache" (X-Sendfile). Con nginx, ADJUNTOS_URL_INTERNA debe ser una location `internal`
+# cuyo alias apunte a ADJUNTOS_ROOT.
+ADJUNTOS_SERVIDOR = env("ADJUNTOS_SERVIDOR", default="django")
+ADJUNTOS_URL_INTERNA = "/adjuntos-internos/"
+
+# --------------------------------------------------------------------------------------
+# Archivo de mensajes y notificaciones (ver dashboard/archivo.py)
+# --------------------------------------------------------------------------------------
+# Lo leído y más antiguo que esto pasa a las tablas de archivo
+ARCHIVO_ANTIGUEDAD_DIAS = env.int("ARCHIVO_ANTIGUEDAD_DIAS", default=365)
+
 # --------------------------------------------------------------------------------------
 # Email (SMTP realista)
 # --------------------------------------------------------------------------------------
@@ -151,6 +213,17 @@ EMAIL_HOST_USER = "elvarrna@gmail.com"
 EMAIL_HOST_PASSWORD = "xbfe cxzi ptds ndjl"
 DEFAULT_FROM_EMAIL = "SchoolComms <elvarrna@gmail.com>"
 
+# Correo en bloque por SendGrid (ver schoolcomms/utils/email.py). Sin API key
+# no sale nada: "memoria" para tests, "archivo" para revisar los envíos en local
+SENDGRID_API_KEY = env("SENDGRID_API_KEY", default="")
+CORREO_BACKEND = env("CORREO_BACKEND", default="sendgrid" if SENDGRID_API_KEY else "archivo")
+CORREO_ARCHIVO_DIR = Path(env("CORREO_ARCHIVO_DIR", default=str(BASE_DIR / ".correos")))
+# Máximo de personalizations por petición que admite la API v3
+CORREO_DESTINATARIOS_POR_LLAMADA = 1000
+CORREO_REINTENTOS = env.int("CORREO_REINTENTOS", default=4)
+CORREO_ESPERA_INICIAL = 1.0  # segundos; se dobla en cada reintento
+CORREO_TIMEOUT = 30
+
 # --------------------------------------------------------------------------------------
 # Celery
 # --------------------------------------------------------------------------------------
@@ -158,23 +231,47 @@ CELERY_BROKER_URL = env("REDIS_URL", default="redis://localhost:6379")
 CELERY_RESULT_BACKEND = "django-db"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
+# En local, sin broker: las tareas (y sus subtareas) se ejecutan en el propio proceso
+CELERY_TASK_ALWAYS_EAGER = env.bool("CELERY_EAGER", default=False)
+CELERY_TASK_EAGER_PROPAGATES = CELERY_TASK_ALWAYS_EAGER
+
+# --------------------------------------------------------------------------------------
+# Entrega de notificaciones por canal (ver notifications/entrega.py)
+# --------------------------------------------------------------------------------------
+# Pendientes que reclama cada pasada y destinatarios por llamada al backend de un canal
+NOTIFICACIONES_LOTE = env.int("NOTIFICACIONES_LOTE", default=500)
+NOTIFICACIONES_TANDA = env.int("NOTIFICACIONES_TANDA", default=100)
+# Un lote reclamado que no se ha cerrado en este tiempo (worker caído) se vuelve a reclamar
+NOTIFICACIONES_RECLAMO_CADUCA = env.int("NOTIFICACIONES_RECLAMO_CADUCA", default=15 * 60)
+
+# Con los canales falsos nada sale fuera (CanalFalso.enviados guarda lo "enviado").
+# Un canal que no está aquí no se planifica ni se apunta en el log. SMS y push no
+# tienen proveedor todavía: su backend se pone aquí cuando lo haya
+_CANAL_FALSO = "notifications.canales.CanalFalso"
+NOTIFICACIONES_CANALES_FALSOS = env.bool("NOTIFICACIONES_CANALES_FALSOS", default=DEBUG or CELERY_TASK_ALWAYS_EAGER)
+if NOTIFICACIONES_CANALES_FALSOS:
+    NOTIFICACIONES_CANALES = {"email": _CANAL_FALSO, "sms": _CANAL_FALSO, "push": _CANAL_FALSO}
+else:
+    NOTIFICACIONES_CANALES = {"email": "notifications.canales.CanalCorreo"}
 
 # --------------------------------------------------------------------------------------
 # Channels
 # --------------------------------------------------------------------------------------
-CHANNEL_LAYERS = {
-    "default": (
-        {
-            "BACKEND": "channels.layers.InMemoryChannelLayer",
-        }
-        if DEBUG
-        else {
-            "BACKEND": "channels_redis.core.RedisChannelLayer",
-            "CONFIG": {"hosts": [env("REDIS_URL", default="redis://localhost:6379")]},
-        }
-    )
+# "memory" solo sirve con un proceso (desarrollo y tests); con varios workers, "redis"
+CHANNEL_LAYER_BACKEND = env("CHANNEL_LAYER_BACKEND", default="memory" if DEBUG else "redis")
+
+_CHANNEL_LAYER_BACKENDS = {
+    "memory": {
+        "BACKEND": "channels.layers.InMemoryChannelLayer",
+    },
+    "redis": {
+        "BACKEND": "channels_redis.core.RedisChannelLayer",
+        "CONFIG": {"hosts": [env("REDIS_URL", default="redis://localhost:6379")]},
+    },
 }
 
+CHANNEL_LAYERS = {"default": _CHANNEL_LAYER_BACKENDS[CHANNEL_LAYER_BACKEND]}
+
 # --------------------------------------------------------------------------------------
 # Django REST framework
 # --------------------------------------------------------------------------------------
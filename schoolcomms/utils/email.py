@@ -1,19 +1,167 @@
-import sendgrid
-from sendgrid.helpers.mail import Mail
+# schoolcomms/utils/email.py
+"""
+Envío de correo por SendGrid en bloque.
+
+enviar_correos() reparte los destinatarios en llamadas de hasta
+CORREO_DESTINATARIOS_POR_LLAMADA (el límite de personalizations de la API v3):
+cada destinatario va en su propia personalization, así que nadie ve a los
+demás, y puede llevar sus sustituciones (nombre, enlaces…) sobre un cuerpo
+común. Un aviso a 5.000 familias son 5 peticiones, no 5.000.
+
+Las peticiones salen por una requests.Session por proceso (la conexión TLS
+se reutiliza; el cliente de SendGrid abre una nueva en cada envío) y se
+reintentan con espera exponencial ante 429, 5xx o errores de red.
+
+CORREO_BACKEND elige dónde van: "sendgrid", "archivo" (un JSON por petición
+en CORREO_ARCHIVO_DIR) o "memoria" (BackendMemoria.enviados, para tests).
+"""
+import json
+import logging
+import random
+import time
+import uuid
+from email.utils import parseaddr
+from pathlib import Path
+
+import requests
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+URL_SENDGRID = "https://api.sendgrid.com/v3/mail/send"
+REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class ErrorCorreo(Exception):
+    pass
+
+
+def _remitente():
+    nombre, email = parseaddr(settings.DEFAULT_FROM_EMAIL)
+    return {"email": email, "name": nombre} if nombre else {"email": email}
+
+
+def _destinatario(destinatario):
+    # "a@b.es" o ("a@b.es", {"-nombre-": "Ana"})
+    if isinstance(destinatario, str):
+        return destinatario, None
+    return destinatario
+
+
+def peticiones(asunto, html, destinatarios, limite=None):
+    """Cuerpos JSON de la API v3 con hasta `limite` destinatarios cada uno."""
+    limite = limite or settings.CORREO_DESTINATARIOS_POR_LLAMADA
+    comun = {"from": _remitente(), "subject": asunto, "content": [{"type": "text/html", "value": html}]}
+    personalizaciones = []
+    for destinatario in destinatarios:
+        email, sustituciones = _destinatario(destinatario)
+        if not email:
+            continue
+        personalizacion = {"to": [{"email": email}]}
+        if sustituciones:
+            personalizacion["substitutions"] = {k: str(v) for k, v in sustituciones.items()}
+        personalizaciones.append(personalizacion)
+        if len(personalizaciones) == limite:
+            yield dict(comun, personalizations=personalizaciones)
+            personalizaciones = []
+    if personalizaciones:
+        yield dict(comun, personalizations=personalizaciones)
+
+
+# ---------------------- BACKENDS ----------------------
+
+
+class BackendSendGrid:
+    _sesion = None
+
+    @classmethod
+    def sesion(cls):
+        # Una por proceso (cada worker de Celery tiene la suya)
+        if cls._sesion is None:
+            sesion = requests.Session()
+            sesion.headers.update({
+                "Authorization": f"Bearer {settings.SENDGRID_API_KEY}",
+                "Content-Type": "application/json",
+            })
+            cls._sesion = sesion
+        return cls._sesion
+
+    def enviar(self, cuerpo):
+        respuesta = self.sesion().post(URL_SENDGRID, data=json.dumps(cuerpo), timeout=settings.CORREO_TIMEOUT)
+        return respuesta.status_code, respuesta.headers.get("Retry-After"), respuesta.text
+
+
+class BackendMemoria:
+    enviados = []
+
+    def enviar(self, cuerpo):
+        self.enviados.append(cuerpo)
+        return 202, None, ""
+
+
+class BackendArchivo:
+    def enviar(self, cuerpo):
+        carpeta = Path(settings.CORREO_ARCHIVO_DIR)
+        carpeta.mkdir(parents=True, exist_ok=True)
+        fichero = carpeta / f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.json"
+        fichero.write_text(json.dumps(cuerpo, ensure_ascii=False, indent=2), encoding="utf-8")
+        return 202, None, ""
+
+
+BACKENDS = {
+    "sendgrid": BackendSendGrid,
+    "memoria": BackendMemoria,
+    "archivo": BackendArchivo,
+}
+
+
+# ---------------------- ENVÍO ----------------------
+
+
+def _espera(intento, retry_after=None):
+    if retry_after and retry_after.isdigit():
+        return int(retry_after)
+    base = settings.CORREO_ESPERA_INICIAL * 2 ** intento
+    return base + random.uniform(0, base)
+
+
+def _enviar_peticion(backend, cuerpo):
+    """Una petición con reintentos. Devuelve el código de estado o lanza ErrorCorreo."""
+    for intento in range(settings.CORREO_REINTENTOS + 1):
+        retry_after = detalle = None
+        try:
+            estado, retry_after, detalle = backend.enviar(cuerpo)
+        except requests.RequestException as exc:
+            estado, detalle = None, str(exc)
+        if estado is not None and estado < 300:
+            return estado
+        if estado is not None and estado not in REINTENTABLES:
+            raise ErrorCorreo(f"SendGrid respondió {estado}: {detalle[:500]}")
+        if intento < settings.CORREO_REINTENTOS:
+            espera = _espera(intento, retry_after)
+            logger.warning("Envío de correo fallido (%s), reintento en %.1fs", estado or detalle, espera)
+            time.sleep(espera)
+    raise ErrorCorreo(f"Sin respuesta válida tras {settings.CORREO_REINTENTOS} reintentos: {estado or detalle}")
+
+
+def enviar_correos(asunto, html, destinatarios):
+    """
+    Envía `html` a `destinatarios` (emails o (email, sustituciones)) en el
+    mínimo de peticiones. Devuelve cuántas peticiones ha hecho; si una falla
+    del todo lanza ErrorCorreo (las anteriores ya han salido).
+    """
+    backend = BACKENDS[settings.CORREO_BACKEND]()
+    total = 0
+    for cuerpo in peticiones(asunto, html, destinatarios):
+        _enviar_peticion(backend, cuerpo)
+        total += 1
+    return total
+
 
 def send_announcement_email(to_email, subject, html_content):
-    sg = sendgrid.SendGridAPIClient(api_key=settings.SENDGRID_API_KEY)
-    message = Mail(
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to_emails=to_email,
-        subject=subject,
-        html_content=html_content
-    )
+    """Un solo correo (pruebas, avisos sueltos): no corta la petición si falla."""
     try:
-        response = sg.send(message)
-        return response.status_code
-    except Exception as e:
-        print("Error al enviar correo:", e)
+        return 202 if enviar_correos(subject, html_content, [to_email]) else None
+    except ErrorCorreo:
+        logger.exception("Error al enviar correo a %s", to_email)
         return None
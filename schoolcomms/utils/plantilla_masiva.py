@@ -0,0 +1,64 @@
+# schoolcomms/utils/plantilla_masiva.py
+"""
+Render de correos masivos: la plantilla pasa una sola vez por el motor.
+
+PlantillaMasiva renderiza la plantilla con una marca en lugar de cada campo
+por destinatario ({{ destinatario.nombre }}, {{ destinatario.baja_url }}) y
+la trocea por esas marcas en un str.format ya preparado. Cada correo es
+después un format_map con los valores escapados del destinatario: sin motor
+de plantillas ni contexto por familia. Del mismo troceado sale el cuerpo con
+etiquetas de sustitución de SendGrid ("-dest_nombre-"), que rellena el propio
+proveedor (ver utils/email.py).
+
+Los campos por destinatario se imprimen tal cual en la plantilla: un filtro
+sobre ellos ({{ destinatario.nombre|upper }}) se aplicaría a la marca, no al
+valor.
+"""
+import re
+from html import escape
+
+from django.template.loader import render_to_string
+
+# Separador de unidad ASCII: no sale en un HTML normal y el autoescape no lo toca
+_SEPARADOR = "\x1f"
+_MARCA = re.compile(f"{_SEPARADOR}(\\w+){_SEPARADOR}")
+
+
+def _escapar(valor):
+    # Lo mismo que conditional_escape (Django escapa con html.escape) sin crear un SafeString por valor
+    if hasattr(valor, "__html__"):
+        return valor.__html__()
+    return escape(str(valor))
+
+
+def etiqueta(campo):
+    return f"-dest_{campo}-"
+
+
+class PlantillaMasiva:
+    def __init__(self, plantilla, contexto, campos):
+        self.campos = tuple(campos)
+        marcas = {campo: f"{_SEPARADOR}{campo}{_SEPARADOR}" for campo in self.campos}
+        html = render_to_string(plantilla, dict(contexto, destinatario=marcas))
+        partes = _MARCA.split(html)
+        literales, huecos = partes[0::2], partes[1::2]
+        self.usados = frozenset(huecos)
+        formato = [literales[0].replace("{", "{{").replace("}", "}}")]
+        for hueco, literal in zip(huecos, literales[1:]):
+            formato += ["{", hueco, "}", literal.replace("{", "{{").replace("}", "}}")]
+        self._formato = "".join(formato)
+
+    def _escapados(self, valores):
+        return {campo: _escapar(valores.get(campo, "")) for campo in self.usados}
+
+    def render(self, **valores):
+        """El HTML de un destinatario con sus `valores` (se escapan como en la plantilla)."""
+        return self._formato.format_map(self._escapados(valores))
+
+    def con_etiquetas(self):
+        """El cuerpo común con las etiquetas de sustitución de SendGrid en cada hueco."""
+        return self._formato.format_map({campo: etiqueta(campo) for campo in self.usados})
+
+    def sustituciones(self, **valores):
+        """{etiqueta: valor escapado} de un destinatario, para su personalization."""
+        return {etiqueta(campo): str(valor) for campo, valor in self._escapados(valores).items()}
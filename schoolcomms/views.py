@@ -13,9 +13,9 @@ User = get_user_model()
 def test_sendgrid_email(request):
     html = render_to_string("emails/aviso.html", {
         "aviso": {
-            "title": "Reunión general de padres",
-            "content": "Estimadas familias, les invitamos a la reunión general el próximo jueves a las 18:00.",
-            "created_at": "09/09/2025 15:30"
+            "titulo": "Reunión general de padres",
+            "contenido": "Estimadas familias, les invitamos a la reunión general el próximo jueves a las 18:00.",
+            "fecha_publicacion": "09/09/2025 15:30"
         },
         "usuario": {
             "email": "familia@ejemplo.com"